@@ -0,0 +1,102 @@
+"""Measures throughput of the BaseRepository bulk helpers.
+
+Runs bulk_create, bulk_update and upsert against the database in DB_URL and
+prints rows/sec for each size. Everything happens in one transaction that is
+rolled back at the end, so the database is left untouched.
+
+    python scripts/bench_bulk.py --sizes 10000 100000 --chunk-size 1000
+"""
+import argparse
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.db.repositories.events import EventRepository  # noqa: E402
+from app.db.repositories.loyalty import ClientRepository  # noqa: E402
+from app.db.session import SessionLocal, get_engine  # noqa: E402
+
+TG_ID_BASE = 9_000_000_000_000
+
+
+def timed(label: str, rows: int, fn):
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {rows:>8} rows {elapsed:>8.2f}s {rows / elapsed:>10.0f} rows/s")
+
+
+def run(size: int, chunk_size: int):
+    events = EventRepository()
+    clients = ClientRepository()
+    db = SessionLocal(bind=get_engine())
+    try:
+        timed(
+            "bulk_create (no returning)",
+            size,
+            lambda: events.bulk_create(
+                db,
+                objs_in=({"name": "bench", "payload": {"n": n}} for n in range(size)),
+                chunk_size=chunk_size,
+                returning=False,
+            ),
+        )
+        created = []
+        timed(
+            "bulk_create (returning)",
+            size,
+            lambda: created.extend(
+                events.bulk_create(
+                    db,
+                    objs_in=({"name": "bench", "payload": {"n": n}} for n in range(size)),
+                    chunk_size=chunk_size,
+                )
+            ),
+        )
+        ids = [event.id for event in created]
+        db.expunge_all()
+        timed(
+            "bulk_update",
+            size,
+            lambda: events.bulk_update(
+                db,
+                objs_in=({"id": id, "name": "bench-updated"} for id in ids),
+                chunk_size=chunk_size,
+            ),
+        )
+        rows = [
+            {"tg_id": TG_ID_BASE + n, "first_name": "Бенч", "last_name": "Тест"}
+            for n in range(size)
+        ]
+        timed(
+            "upsert (insert)",
+            size,
+            lambda: clients.upsert(
+                db, objs_in=rows, index_elements=["tg_id"], chunk_size=chunk_size
+            ),
+        )
+        db.expunge_all()
+        timed(
+            "upsert (conflict update)",
+            size,
+            lambda: clients.upsert(
+                db, objs_in=rows, index_elements=["tg_id"], chunk_size=chunk_size
+            ),
+        )
+    finally:
+        db.rollback()
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Counts database commits issued per API request.
+
+Drives the main write paths through the FastAPI app against the database in
+DB_URL (a migrated, disposable one) and reports how many COMMITs and SQL
+statements each request produced. Exits non-zero when a request exceeds the
+commit budget.
+
+    python scripts/bench_commits.py --budget 1
+"""
+import argparse
+import random
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.db.session import get_engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+counters = {"commits": 0, "statements": 0}
+
+
+@event.listens_for(get_engine(), "commit")
+def _count_commit(conn):
+    counters["commits"] += 1
+
+
+@event.listens_for(get_engine(), "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counters["statements"] += 1
+
+
+def call(client: TestClient, results: list, method: str, path: str, **kwargs):
+    counters["commits"] = counters["statements"] = 0
+    response = client.request(method, f"/api/v1{path}", **kwargs)
+    results.append(
+        (f"{method} {path}", response.status_code, counters["commits"], counters["statements"])
+    )
+    return response.json() if response.status_code < 400 else None
+
+
+def run() -> list:
+    suffix = random.randint(0, 10**6)
+    results: list = []
+    with TestClient(app) as client:
+        call(
+            client,
+            results,
+            "POST",
+            "/levels/",
+            json={"name": f"Bench {suffix}", "threshold_amount": 0, "order": suffix},
+        )
+        template = call(
+            client,
+            results,
+            "POST",
+            "/coupon-templates/",
+            json={
+                "name": f"Bench {suffix}",
+                "code_pattern": "БН-00000",
+                "discount_type": "percent",
+                "discount_value": 10,
+            },
+        )
+        new_client = call(
+            client,
+            results,
+            "POST",
+            "/clients/",
+            json={"first_name": "Бенч", "last_name": "Нагрузка"},
+        )
+        if not template or not new_client:
+            return results
+
+        coupon = call(
+            client,
+            results,
+            "POST",
+            "/coupons/issue",
+            json={"client_ref": new_client["identifier"], "template_id": template["id"]},
+        )
+        if coupon:
+            call(
+                client,
+                results,
+                "POST",
+                "/coupons/redeem",
+                json={
+                    "code": coupon["code"],
+                    "client_ref": new_client["identifier"],
+                    "amount": 1000,
+                    "employee_id": 1,
+                },
+            )
+        call(
+            client,
+            results,
+            "POST",
+            "/purchases/",
+            json={"client_ref": new_client["identifier"], "amount": 500, "employee_id": 1},
+        )
+        call(client, results, "GET", f"/clients/{new_client['id']}")
+        call(client, results, "DELETE", f"/clients/{new_client['id']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=int, default=1, help="max commits per request")
+    args = parser.parse_args()
+
+    over_budget = False
+    print(f"{'request':<40} {'status':>6} {'commits':>8} {'queries':>8}")
+    for name, status, commits, statements in run():
+        print(f"{name:<40} {status:>6} {commits:>8} {statements:>8}")
+        over_budget |= commits > args.budget
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
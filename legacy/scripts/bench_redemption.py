@@ -0,0 +1,276 @@
+"""Measures coupon redemption throughput and row-lock contention.
+
+Runs each scenario with --workers threads against the database in DB_URL (a
+migrated, disposable one: fixtures and results are committed and left
+behind). Every operation is one unit of work calling the same service the
+API endpoint calls, so timings include the commit. Scenarios:
+
+    issue      POST /coupons/issue, one coupon per fresh client
+    single     POST /coupons/redeem of the coupons issued above
+    hot        POST /coupons/redeem of one multi-use coupon by every worker
+    purchase   POST /purchases/ without a coupon
+
+For each scenario it prints ops/sec, p50/p95/p99 latency, the time spent in
+SELECT ... FOR UPDATE (lock wait plus execution) and SQL statements per
+operation. Keep --workers within the engine's pool (15 connections).
+
+    python scripts/bench_redemption.py --workers 10 --ops 2000
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import event  # noqa: E402
+
+import app.main  # noqa: E402,F401  (registers every model)
+from app.db.models.hr import Employee  # noqa: E402
+from app.db.models.promotions import Coupon  # noqa: E402
+from app.db.repositories.events import (  # noqa: E402
+    CampaignEventRepository,
+    EventRepository,
+)
+from app.db.repositories.loyalty import ClientRepository, LevelRepository  # noqa: E402
+from app.db.repositories.promotions import (  # noqa: E402
+    CouponRepository,
+    CouponTemplateRepository,
+)
+from app.db.session import get_engine, unit_of_work  # noqa: E402
+from app.schemas.enums import CouponStatusEnum, EmployeeRoleEnum  # noqa: E402
+from app.schemas.promotions import (  # noqa: E402
+    CouponIssueRequest,
+    CouponRedeemRequest,
+    CouponTemplateCreate,
+)
+from app.schemas.purchases import PurchaseCreate  # noqa: E402
+from app.services.coupons import CouponService  # noqa: E402
+from app.services.events import EventService  # noqa: E402
+from app.services.loyalty import LoyaltyService  # noqa: E402
+from app.services.purchases import PurchaseService  # noqa: E402
+from app.services.redemption import RedemptionService  # noqa: E402
+
+# Letters allowed in client identifiers and coupon codes.
+LETTERS = "АБВГДЕЖЗИКЛМНОПРСТУФХЦЧШЭЮЯ"
+TG_ID_BASE = 8_000_000_000_000
+
+client_repository = ClientRepository()
+coupon_service = CouponService(
+    CouponRepository(), CouponTemplateRepository(), client_repository
+)
+redemption_service = RedemptionService(
+    coupon_repository=CouponRepository(),
+    client_repository=client_repository,
+    campaign_event_repository=CampaignEventRepository(),
+    loyalty_service=LoyaltyService(LevelRepository()),
+)
+purchase_service = PurchaseService(
+    client_repository=client_repository,
+    loyalty_service=LoyaltyService(LevelRepository()),
+)
+event_service = EventService(EventRepository())
+
+# Per-thread counters of the operation currently running.
+current = threading.local()
+
+
+@event.listens_for(get_engine(), "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    context._bench_started = time.perf_counter()
+
+
+@event.listens_for(get_engine(), "after_cursor_execute")
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    if not hasattr(current, "statements"):
+        return
+    current.statements += 1
+    if "FOR UPDATE" in statement:
+        current.lock_wait += time.perf_counter() - context._bench_started
+
+
+def measure(operation) -> tuple[float, int, float, str | None]:
+    """Run ``operation(db)`` in its own unit of work; returns (seconds,
+    statements, seconds in FOR UPDATE, error class or None)."""
+    current.statements = 0
+    current.lock_wait = 0.0
+    error = None
+    started = time.perf_counter()
+    try:
+        with unit_of_work() as db:
+            operation(db)
+    except Exception as e:
+        error = type(e).__name__
+    return time.perf_counter() - started, current.statements, current.lock_wait, error
+
+
+def run_scenario(name: str, operations: list, workers: int) -> None:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        samples = list(pool.map(measure, operations))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(sample[0] * 1000 for sample in samples)
+    percentiles = statistics.quantiles(latencies, n=100)
+    errors: dict[str, int] = {}
+    for sample in samples:
+        if sample[3]:
+            errors[sample[3]] = errors.get(sample[3], 0) + 1
+    print(
+        f"{name:<9} {len(samples):>6} {len(samples) / elapsed:>9.1f} "
+        f"{percentiles[49]:>8.1f} {percentiles[94]:>8.1f} {percentiles[98]:>8.1f} "
+        f"{statistics.mean(sample[2] for sample in samples) * 1000:>10.2f} "
+        f"{statistics.mean(sample[1] for sample in samples):>8.1f}  "
+        + (", ".join(f"{error} x{count}" for error, count in errors.items()) or "-")
+    )
+
+
+def free_identifiers(db, count: int) -> list[str]:
+    prefixes = [first + second for first in LETTERS for second in LETTERS]
+    random.shuffle(prefixes)
+    free: list[str] = []
+    for prefix in prefixes:
+        taken = client_repository.get_identifiers_by_prefix(db, prefixes=[prefix])
+        free.extend(
+            identifier
+            for identifier in (f"{prefix}-{number:03d}" for number in range(1000))
+            if identifier not in taken
+        )
+        if len(free) >= count:
+            return free[:count]
+    raise SystemExit("No free client identifiers left in this database.")
+
+
+def create_fixtures(ops: int, usage_limit: int) -> dict:
+    suffix = random.randint(0, 10**6)
+    with unit_of_work() as db:
+        employee = Employee(
+            full_name=f"Bench {suffix}",
+            tg_id=TG_ID_BASE + suffix,
+            role=EmployeeRoleEnum.support,
+            hourly_rate=0,
+        )
+        db.add(employee)
+        templates = CouponTemplateRepository()
+        single_use = templates.create(
+            db,
+            obj_in=CouponTemplateCreate(
+                name=f"Bench single {suffix}",
+                code_pattern="БН-00000",
+                discount_type="percent",
+                discount_value=10,
+            ),
+        )
+        multi_use = templates.create(
+            db,
+            obj_in=CouponTemplateCreate(
+                name=f"Bench multi {suffix}",
+                code_pattern="БМ-00000",
+                discount_type="fixed",
+                discount_value=50,
+                usage_limit=usage_limit,
+            ),
+        )
+        identifiers = free_identifiers(db, ops)
+        client_repository.bulk_create(
+            db,
+            objs_in=(
+                {"first_name": "Бенч", "last_name": "Нагрузка", "identifier": identifier}
+                for identifier in identifiers
+            ),
+            returning=False,
+        )
+        hot_coupon = Coupon(
+            code=coupon_service._generate_unique_code(db, multi_use.code_pattern),
+            template_id=multi_use.id,
+            status=CouponStatusEnum.issued,
+        )
+        db.add(hot_coupon)
+        db.flush()
+    return {
+        "employee_id": employee.id,
+        "template_id": single_use.id,
+        "hot_code": hot_coupon.code,
+        "identifiers": identifiers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=10, help="concurrent tills")
+    parser.add_argument("--ops", type=int, default=1000, help="operations per scenario")
+    args = parser.parse_args()
+    if args.ops < 2:
+        parser.error("--ops must be at least 2")
+
+    fixtures = create_fixtures(args.ops, usage_limit=args.ops * 10)
+    employee_id = fixtures["employee_id"]
+    identifiers = fixtures["identifiers"]
+    issued: list[tuple[str, str]] = []
+    issued_lock = threading.Lock()
+
+    def issue(identifier):
+        def operation(db):
+            coupon = coupon_service.issue_coupon(
+                db,
+                issue_request=CouponIssueRequest(
+                    client_ref=identifier, template_id=fixtures["template_id"]
+                ),
+                event_service=event_service,
+            )
+            with issued_lock:
+                issued.append((coupon.code, identifier))
+
+        return operation
+
+    def redeem(code, identifier):
+        def operation(db):
+            redemption_service.redeem_coupon(
+                db,
+                redeem_request=CouponRedeemRequest(
+                    code=code,
+                    client_ref=identifier,
+                    amount=1000,
+                    employee_id=employee_id,
+                ),
+                event_service=event_service,
+            )
+
+        return operation
+
+    def purchase(identifier):
+        def operation(db):
+            purchase_service.record_purchase(
+                db,
+                purchase_in=PurchaseCreate(
+                    client_ref=identifier, amount=500, employee_id=employee_id
+                ),
+                event_service=event_service,
+            )
+
+        return operation
+
+    print(
+        f"{'scenario':<9} {'ops':>6} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'lock ms':>10} {'queries':>8}  errors"
+    )
+    run_scenario("issue", [issue(identifier) for identifier in identifiers], args.workers)
+    run_scenario(
+        "single", [redeem(code, identifier) for code, identifier in issued], args.workers
+    )
+    run_scenario(
+        "hot",
+        [redeem(fixtures["hot_code"], identifier) for identifier in identifiers],
+        args.workers,
+    )
+    run_scenario(
+        "purchase", [purchase(identifier) for identifier in identifiers], args.workers
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Measures import-time startup cost of the API and the Celery worker.
+
+Runs each role's imports in a fresh interpreter under ``python -X importtime``
+(after one unmeasured run that compiles bytecode) and keeps the fastest of
+--runs. Roles:
+
+    api      import app.main, as uvicorn does
+    worker   import app.celery_app and the task modules the worker includes
+
+For each role it prints the total import time and the packages that spend
+the most of it, and exits non-zero when a role is over its budget. Nothing
+touches the database, Redis or Telegram.
+
+    python scripts/bench_startup.py --api-budget-ms 2500 --worker-budget-ms 1500
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+ROLES = {
+    "api": "import app.main",
+    "worker": (
+        "from app.celery_app import celery_app; "
+        "celery_app.loader.import_default_modules()"
+    ),
+}
+
+
+def import_times(code: str) -> tuple[float, Counter]:
+    """Total import time in ms and self time in ms per top-level package."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC), env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0.0
+    packages: Counter = Counter()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not name[1:].startswith(" "):
+            total += int(cumulative_us) / 1000
+        packages[name.strip().split(".")[0]] += int(self_us) / 1000
+    return total, packages
+
+
+def measure(code: str, runs: int) -> tuple[float, Counter]:
+    import_times(code)
+    return min((import_times(code) for _ in range(runs)), key=lambda r: r[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="packages listed per role")
+    parser.add_argument("--api-budget-ms", type=float, default=2500)
+    parser.add_argument("--worker-budget-ms", type=float, default=1500)
+    args = parser.parse_args()
+    budgets = {"api": args.api_budget_ms, "worker": args.worker_budget_ms}
+
+    over_budget = False
+    for role, code in ROLES.items():
+        total, packages = measure(code, args.runs)
+        verdict = "ok" if total <= budgets[role] else "OVER BUDGET"
+        print(f"{role:<8} {total:8.0f} ms  (budget {budgets[role]:.0f} ms)  {verdict}")
+        for package, ms in packages.most_common(args.top):
+            print(f"    {package:<28} {ms:8.1f} ms")
+        over_budget |= total > budgets[role]
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
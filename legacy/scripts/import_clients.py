@@ -0,0 +1,53 @@
+"""Imports clients from a POS export CSV into the database in DB_URL.
+
+The whole file is loaded in one transaction; rejected and duplicate rows are
+written to a side CSV (``<input>.errors.csv`` by default) with their line
+numbers.
+
+    python scripts/import_clients.py members.csv --chunk-size 5000
+"""
+import argparse
+import csv
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.db.repositories.loyalty import ClientRepository  # noqa: E402
+from app.db.session import unit_of_work  # noqa: E402
+from app.services.client_import import ClientImportService  # noqa: E402
+
+
+def import_clients(path: str, errors_path: str, chunk_size: int):
+    service = ClientImportService(ClientRepository(), chunk_size=chunk_size)
+    started = time.perf_counter()
+    with open(path, newline="", encoding="utf-8-sig") as source, unit_of_work() as db:
+        report = service.import_csv(db, source=source)
+    elapsed = time.perf_counter() - started
+
+    with open(errors_path, "w", newline="", encoding="utf-8") as errors_file:
+        writer = csv.writer(errors_file)
+        writer.writerow(["line", "error"])
+        writer.writerows((error.line, error.error) for error in report.errors)
+
+    print(
+        f"total={report.total} imported={report.imported} "
+        f"duplicates={report.duplicates} failed={report.failed} "
+        f"elapsed={elapsed:.2f}s rate={report.total / elapsed:.0f} rows/s"
+    )
+    if report.errors:
+        print(f"Row errors written to {errors_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("--errors", help="side file for per-row errors")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+    import_clients(args.path, args.errors or f"{args.path}.errors.csv", args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,17 @@
 import os
 
 from sqlalchemy import create_engine, select
-from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
-from app.db.models.loyalty import Level
-from app.db.models.hr import Employee
-from app.schemas.enums import EmployeeRoleEnum
-
 load_dotenv()
 
+from app.db.models.loyalty import Level  # noqa: E402
+from app.db.models.hr import Employee  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+from app.schemas.enums import EmployeeRoleEnum  # noqa: E402
+# Its commit hook tells running API processes about the seeded admin.
+import app.services.employee_directory  # noqa: E402,F401
+
 def seed_data():
     """Seeds the database with initial data."""
     db_url = os.getenv("DB_URL")
@@ -17,9 +19,7 @@ def seed_data():
         raise ValueError("DB_URL environment variable is not set.")
 
     engine = create_engine(db_url, echo=True)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-    with SessionLocal() as session:
+    with SessionLocal(bind=engine) as session:
         # Seed default loyalty level
         if not session.execute(select(Level).where(Level.name == "Bronze")).scalar_one_or_none():
             default_level = Level(
@@ -1,16 +1,14 @@
 from sqlalchemy.orm import Session
 from fastapi import Depends
-from app.db.session import SessionLocal
+from app.db.session import unit_of_work
 from app.services.events import AuditService
 from app.db.repositories.events import AuditLogRepository
 
 
 def get_db():
-    db = SessionLocal()
-    try:
+    # One transaction per request: repositories flush, the commit happens here.
+    with unit_of_work() as db:
         yield db
-    finally:
-        db.close()
 
 
 from app.db.repositories.events import EventRepository
@@ -0,0 +1,95 @@
+import logging
+import os
+import time
+
+from fastapi import Request
+from opentelemetry.propagate import extract
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from app.core import metrics
+from app.core.tracing import tracer
+from app.db.instrumentation import QueryStats, current_query_stats
+
+logger = logging.getLogger(__name__)
+
+# Requests over either budget, or repeating a statement this often, are logged.
+SQL_QUERY_BUDGET = int(os.getenv("SQL_QUERY_BUDGET", "20"))
+SQL_TIME_BUDGET_MS = float(os.getenv("SQL_TIME_BUDGET_MS", "200"))
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))
+# Statement text in log lines is cut to this many characters.
+LOGGED_STATEMENT_LENGTH = 300
+DEBUG_HEADERS = os.getenv("APP_ENV", "development") == "development"
+
+
+def _shorten(statement: str | None) -> str:
+    statement = " ".join((statement or "").split())
+    if len(statement) > LOGGED_STATEMENT_LENGTH:
+        return statement[:LOGGED_STATEMENT_LENGTH] + "..."
+    return statement
+
+
+async def instrument_request(request: Request, call_next):
+    """Trace and time each request and count its SQL work.
+
+    Continues the caller's trace from its W3C traceparent header. Records
+    latency, query count, DB time and commits in Prometheus
+    histograms per route, adds the SQL figures as X-DB-* response headers in
+    development, and logs requests that exceed the query or time budget or
+    repeat a statement SQL_REPEAT_THRESHOLD times (the usual sign of an N+1
+    loop).
+    """
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    started = time.perf_counter()
+    with tracer.start_as_current_span(
+        request.method,
+        context=extract(request.headers),
+        kind=SpanKind.SERVER,
+        attributes={"http.method": request.method, "http.target": request.url.path},
+    ) as span:
+        try:
+            response = await call_next(request)
+        finally:
+            current_query_stats.reset(token)
+        elapsed = time.perf_counter() - started
+
+        route = request.scope.get("route")
+        labels = (request.method, route.path if route else "unmatched")
+        span.update_name(" ".join(labels))
+        span.set_attribute("http.route", labels[1])
+        span.set_attribute("http.status_code", response.status_code)
+        span.set_attribute("db.queries", stats.queries)
+        if response.status_code >= 500:
+            span.set_status(Status(StatusCode.ERROR))
+    metrics.REQUEST_DURATION.labels(*labels, response.status_code).observe(elapsed)
+    metrics.DB_QUERIES.labels(*labels).observe(stats.queries)
+    metrics.DB_TIME.labels(*labels).observe(stats.db_time)
+    metrics.DB_COMMITS.labels(*labels).observe(stats.commits)
+    repeated = stats.repeated(SQL_REPEAT_THRESHOLD)
+    if repeated:
+        metrics.REPEATED_STATEMENT_REQUESTS.labels(*labels).inc()
+
+    if DEBUG_HEADERS:
+        response.headers["X-DB-Queries"] = str(stats.queries)
+        response.headers["X-DB-Time-Ms"] = f"{stats.db_time * 1000:.1f}"
+        response.headers["X-DB-Slowest-Ms"] = f"{stats.slowest_time * 1000:.1f}"
+        response.headers["X-DB-Commits"] = str(stats.commits)
+        response.headers["X-DB-Max-Repeats"] = str(stats.max_repeats)
+
+    if (
+        stats.queries > SQL_QUERY_BUDGET
+        or stats.db_time * 1000 > SQL_TIME_BUDGET_MS
+        or repeated
+    ):
+        logger.warning(
+            f"{request.method} {request.url.path} -> {response.status_code} "
+            f"in {elapsed * 1000:.0f}ms: {stats.queries} queries, "
+            f"{stats.db_time * 1000:.0f}ms in SQL, {stats.commits} commits; "
+            f"slowest {stats.slowest_time * 1000:.0f}ms: "
+            f"{_shorten(stats.slowest_statement)}"
+            + "".join(
+                f"; repeated x{count}: {_shorten(statement)}"
+                for statement, count in repeated
+            )
+        )
+    return response
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db
-from app.db.repositories.broadcasts import BroadcastRepository
+from app.db.repositories.events import BroadcastRepository
 from app.schemas.broadcasts import Broadcast, BroadcastCreate, BroadcastUpdate
 from app.services.broadcasts import BroadcastService
 
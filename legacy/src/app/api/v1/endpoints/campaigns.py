@@ -1,22 +1,92 @@
+from datetime import date
+
 from fastapi import APIRouter, Depends, HTTPException
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_db, get_audit_service
-from app.db.repositories.promotions import CampaignRepository
-from app.schemas.promotions import Campaign, CampaignCreate, CampaignUpdate
+from app.api.deps import get_db, get_audit_service, get_event_service
+from app.db.cache import hot_cache
+from app.db.repositories.events import CampaignEventRepository
+from app.db.repositories.loyalty import ClientRepository
+from app.db.repositories.promotions import (
+    CampaignRepository,
+    CouponRepository,
+    CouponTemplateRepository,
+)
+from app.schemas.promotions import (
+    Campaign,
+    CampaignCreate,
+    CampaignReport,
+    CampaignStartRequest,
+    CampaignStartResponse,
+    CampaignUpdate,
+)
 from app.schemas.events import AuditLogCreate
 from app.schemas.enums import ActorTypeEnum
+from app.services.attribution import AttributionService
+from app.services.campaign_analytics import (
+    CampaignAnalyticsService,
+    campaign_analytics_service,
+)
 from app.services.campaigns import CampaignService
-from app.services.events import AuditService
+from app.services.coupons import CouponService
+from app.services.events import AuditService, EventService
 
 router = APIRouter()
 
+cached_campaign = TypeAdapter(Campaign | None)
+
 
 def get_campaign_service(db: Session = Depends(get_db)) -> CampaignService:
     campaign_repository = CampaignRepository()
     return CampaignService(campaign_repository)
 
 
+def get_attribution_service(db: Session = Depends(get_db)) -> AttributionService:
+    campaign_event_repository = CampaignEventRepository()
+    client_repository = ClientRepository()
+    return AttributionService(campaign_event_repository, client_repository)
+
+
+def get_campaign_analytics_service() -> CampaignAnalyticsService:
+    # Shared instance: it caches the reports of finished campaigns.
+    return campaign_analytics_service
+
+
+def get_coupon_service(db: Session = Depends(get_db)) -> CouponService:
+    return CouponService(
+        CouponRepository(), CouponTemplateRepository(), ClientRepository()
+    )
+
+
+@router.post(
+    "/start",
+    response_model=CampaignStartResponse,
+    summary="Handle a campaign deep link",
+    description="Resolves a /start deep-link ref (campaign ref_code, or legacy cmp_<id>), records a click for attribution and, for a registered client of an active campaign, issues the campaign coupon. Answers 404 when the ref is not a campaign ref. Replaces three separate calls from the client bot.",
+)
+def start_campaign(
+    *,
+    start_in: CampaignStartRequest,
+    attribution_service: AttributionService = Depends(get_attribution_service),
+    coupon_service: CouponService = Depends(get_coupon_service),
+    event_service: EventService = Depends(get_event_service),
+    db: Session = Depends(get_db),
+):
+    try:
+        response = attribution_service.start_campaign(
+            db,
+            start_in=start_in,
+            coupon_service=coupon_service,
+            event_service=event_service,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not response:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return response
+
+
 @router.post(
     "/",
     response_model=Campaign,
@@ -44,6 +114,48 @@ def create_campaign(
     return campaign
 
 
+@router.get(
+    "/report",
+    response_model=list[CampaignReport],
+    summary="Get the performance report of all campaigns",
+    description="Funnel per campaign (clicks, issued coupons, attributed redemptions, revenue, average discount and conversion rates) with a per-day breakdown, optionally limited to a date range.",
+)
+def read_campaigns_report(
+    *,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    analytics_service: CampaignAnalyticsService = Depends(
+        get_campaign_analytics_service
+    ),
+    db: Session = Depends(get_db),
+):
+    return analytics_service.get_reports(db, start_date=start_date, end_date=end_date)
+
+
+@router.get(
+    "/{campaign_id}/report",
+    response_model=CampaignReport,
+    summary="Get the performance report of a campaign",
+    description="Funnel of one campaign with a per-day breakdown, optionally limited to a date range.",
+)
+def read_campaign_report(
+    *,
+    campaign_id: int,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    analytics_service: CampaignAnalyticsService = Depends(
+        get_campaign_analytics_service
+    ),
+    db: Session = Depends(get_db),
+):
+    reports = analytics_service.get_reports(
+        db, campaign_ids=[campaign_id], start_date=start_date, end_date=end_date
+    )
+    if not reports:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return reports[0]
+
+
 @router.get(
     "/{campaign_id}",
     response_model=Campaign,
@@ -56,7 +168,12 @@ def read_campaign(
     campaign_service: CampaignService = Depends(get_campaign_service),
     db: Session = Depends(get_db),
 ):
-    campaign = campaign_service.get_campaign(db, campaign_id=campaign_id)
+    campaign = hot_cache.get_or_load(
+        "campaigns",
+        campaign_id,
+        cached_campaign,
+        lambda: campaign_service.get_campaign(db, campaign_id=campaign_id),
+    )
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
     return campaign
@@ -1,18 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+import codecs
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db
+from app.db.cache import hot_cache
 from app.db.repositories.loyalty import ClientRepository
-from app.schemas.loyalty import Client, ClientCreate, ClientUpdate
-from app.schemas.promotions import Coupon
+from app.db.repositories.promotions import CouponRepository
+from app.schemas.loyalty import Client, ClientCreate, ClientImportReport, ClientUpdate
+from app.schemas.promotions import Coupon, CouponSummary
+from app.services.client_import import ClientImportService
 
 router = APIRouter()
 
+# Row errors returned by /import; the report counts the rest.
+IMPORT_MAX_ERRORS = 1000
+
+cached_client = TypeAdapter(Client | None)
+
 
 def get_client_repository(db: Session = Depends(get_db)) -> ClientRepository:
     return ClientRepository()
 
 
+def get_coupon_repository(db: Session = Depends(get_db)) -> CouponRepository:
+    return CouponRepository()
+
+
+def get_client_import_service(db: Session = Depends(get_db)) -> ClientImportService:
+    client_repository = ClientRepository()
+    return ClientImportService(client_repository, max_errors=IMPORT_MAX_ERRORS)
+
+
 @router.get(
     "/by-tg-id/{tg_id}",
     response_model=Client,
@@ -25,22 +45,56 @@ def read_client_by_tg_id(
     client_repo: ClientRepository = Depends(get_client_repository),
     db: Session = Depends(get_db),
 ):
-    client = client_repo.get_by_tg_id(db, tg_id=tg_id)
+    client = hot_cache.get_or_load(
+        "clients", tg_id, cached_client, lambda: client_repo.get_by_tg_id(db, tg_id=tg_id)
+    )
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     return client
 
 
-@router.get("/{client_id}/coupons", response_model=list[Coupon])
+@router.get(
+    "/by-tg-id/{tg_id}/coupons",
+    response_model=list[CouponSummary],
+    summary="Get active coupons of a client by Telegram ID",
+    description="Returns the client's redeemable, unexpired coupons ordered by expiry, in a compact shape, with a single query.",
+)
+def read_client_coupons_by_tg_id(
+    *,
+    tg_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    client_repo: ClientRepository = Depends(get_client_repository),
+    coupon_repo: CouponRepository = Depends(get_coupon_repository),
+    db: Session = Depends(get_db),
+):
+    coupons = coupon_repo.get_active_for_client(db, tg_id=tg_id, skip=skip, limit=limit)
+    if not coupons and not client_repo.get_by_tg_id(db, tg_id=tg_id):
+        raise HTTPException(status_code=404, detail="Client not found")
+    return coupons
+
+
+@router.get(
+    "/{client_id}/coupons",
+    response_model=list[Coupon],
+    summary="Get active coupons of a client",
+    description="Returns the client's redeemable, unexpired coupons ordered by expiry, with pagination.",
+)
 def read_client_coupons(
     *,
     client_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    client_repo: ClientRepository = Depends(get_client_repository),
+    coupon_repo: CouponRepository = Depends(get_coupon_repository),
     db: Session = Depends(get_db),
 ):
-    client = db.query(Client).filter(Client.id == client_id).first()
-    if not client:
+    coupons = coupon_repo.get_active_for_client(
+        db, client_id=client_id, skip=skip, limit=limit
+    )
+    if not coupons and not client_repo.get(db, id=client_id):
         raise HTTPException(status_code=404, detail="Client not found")
-    return client.coupons
+    return coupons
 
 
 @router.post(
@@ -58,6 +112,29 @@ def create_client(
     return client_repo.create(db, obj_in=client_in)
 
 
+@router.post(
+    "/import",
+    response_model=ClientImportReport,
+    summary="Import clients from CSV",
+    description="Streams a CSV file with a header row of client fields, skips clients already known by tg_id or identifier, allocates identifiers and inserts the rest in bulk. Per-row errors are returned in the report, the first 1000 of them; errors_omitted counts the rest. A file that is not UTF-8 or not valid CSV is rejected with 400 and nothing is imported.",
+)
+def import_clients(
+    *,
+    file: UploadFile = File(...),
+    import_service: ClientImportService = Depends(get_client_import_service),
+    db: Session = Depends(get_db),
+):
+    source = codecs.iterdecode(file.file, "utf-8-sig")
+    # Decoding and CSV errors are raised mid-stream; the request's
+    # transaction drops the rows already inserted.
+    try:
+        return import_service.import_csv(db, source=source)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File is not valid UTF-8")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.put(
     "/{client_id}",
     response_model=Client,
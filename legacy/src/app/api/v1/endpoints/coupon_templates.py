@@ -5,6 +5,7 @@ from app.api.deps import get_db
 from app.db.repositories.promotions import CouponTemplateRepository
 from app.schemas.promotions import (
     CouponTemplate,
+    CouponTemplateCacheStats,
     CouponTemplateCreate,
     CouponTemplateUpdate,
 )
@@ -39,6 +40,20 @@ def create_coupon_template(
     )
 
 
+@router.get(
+    "/cache-stats",
+    response_model=CouponTemplateCacheStats,
+    summary="Get coupon template cache statistics",
+    description="Returns size, hit/miss, eviction and invalidation counters of this process's coupon template cache.",
+)
+def read_coupon_template_cache_stats(
+    coupon_template_service: CouponTemplateService = Depends(
+        get_coupon_template_service
+    ),
+):
+    return coupon_template_service.get_cache_stats()
+
+
 @router.get(
     "/{coupon_template_id}",
     response_model=CouponTemplate,
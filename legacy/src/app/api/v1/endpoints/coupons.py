@@ -1,25 +1,40 @@
 from fastapi import APIRouter, Depends, HTTPException
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, get_event_service
-from app.db.models.promotions import Coupon
+from app.core import metrics
+from app.core.exceptions import AppException, ClientNotFoundException
+from app.db.cache import hot_cache
 from app.db.repositories.promotions import (
     CouponRepository,
     CouponTemplateRepository,
 )
+from app.db.repositories.events import CampaignEventRepository
 from app.db.repositories.loyalty import ClientRepository, LevelRepository
 from app.schemas.promotions import (
+    CheckoutQuote,
+    CheckoutQuoteRequest,
     Coupon,
+    CouponBulkIssueRequest,
+    CouponBulkIssueResult,
     CouponIssueRequest,
     CouponRedeemRequest,
     CouponRedeemResponse,
 )
 from app.services.coupons import CouponService
+from app.services.events import EventService
 from app.services.loyalty import LoyaltyService
 from app.services.redemption import RedemptionService
 
 router = APIRouter()
 
+cached_coupon = TypeAdapter(Coupon | None)
+
+
+def get_coupon_repository(db: Session = Depends(get_db)) -> CouponRepository:
+    return CouponRepository()
+
 
 def get_coupon_service(db: Session = Depends(get_db)) -> CouponService:
     coupon_repository = CouponRepository()
@@ -33,11 +48,13 @@ def get_coupon_service(db: Session = Depends(get_db)) -> CouponService:
 def get_redemption_service(db: Session = Depends(get_db)) -> RedemptionService:
     coupon_repository = CouponRepository()
     client_repository = ClientRepository()
+    campaign_event_repository = CampaignEventRepository()
     level_repository = LevelRepository()
     loyalty_service = LoyaltyService(level_repository)
     return RedemptionService(
         coupon_repository=coupon_repository,
         client_repository=client_repository,
+        campaign_event_repository=campaign_event_repository,
         loyalty_service=loyalty_service,
     )
 
@@ -55,9 +72,33 @@ def issue_coupon(
     event_service: EventService = Depends(get_event_service),
     db: Session = Depends(get_db),
 ):
-    return coupon_service.issue_coupon(
-        db, issue_request=issue_request, event_service=event_service
-    )
+    try:
+        return coupon_service.issue_coupon(
+            db, issue_request=issue_request, event_service=event_service
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post(
+    "/issue-bulk",
+    response_model=CouponBulkIssueResult,
+    summary="Issue a coupon to every eligible client",
+    description="Issues the template's coupon to all clients that meet its conditions and do not already hold one; eligibility is evaluated in the database and coupons are inserted in bulk.",
+)
+def issue_coupons_bulk(
+    *,
+    bulk_request: CouponBulkIssueRequest,
+    coupon_service: CouponService = Depends(get_coupon_service),
+    event_service: EventService = Depends(get_event_service),
+    db: Session = Depends(get_db),
+):
+    try:
+        return coupon_service.issue_bulk(
+            db, bulk_request=bulk_request, event_service=event_service
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post(
@@ -74,9 +115,35 @@ def redeem_coupon(
     db: Session = Depends(get_db),
 ):
     try:
-        return redemption_service.redeem_coupon(
+        response = redemption_service.redeem_coupon(
             db, redeem_request=redeem_request, event_service=event_service
         )
+    except AppException as e:
+        metrics.REDEMPTIONS.labels(e.code).inc()
+        raise
+    except ValueError as e:
+        metrics.REDEMPTIONS.labels("invalid").inc()
+        raise HTTPException(status_code=400, detail=str(e))
+    metrics.REDEMPTIONS.labels("ok").inc()
+    return response
+
+
+@router.post(
+    "/quote",
+    response_model=CheckoutQuote,
+    summary="Quote a purchase against coupons",
+    description="Evaluates one or more coupon codes against a purchase amount, each priced as `POST /coupons/redeem` would price it, and recommends the one with the largest discount together with the payable amount. Nothing is redeemed, locked or recorded.",
+)
+def quote_checkout(
+    *,
+    quote_request: CheckoutQuoteRequest,
+    redemption_service: RedemptionService = Depends(get_redemption_service),
+    db: Session = Depends(get_db),
+):
+    try:
+        return redemption_service.quote(db, quote_request=quote_request)
+    except ClientNotFoundException as e:
+        raise HTTPException(status_code=404, detail=e.message)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -90,9 +157,12 @@ def redeem_coupon(
 def read_coupon_by_code(
     *,
     code: str,
+    coupon_repo: CouponRepository = Depends(get_coupon_repository),
     db: Session = Depends(get_db),
 ):
-    coupon = db.query(Coupon).filter(Coupon.code == code).first()
+    coupon = hot_cache.get_or_load(
+        "coupons", code, cached_coupon, lambda: coupon_repo.get_by_code(db, code=code)
+    )
     if not coupon:
         raise HTTPException(status_code=404, detail="Coupon not found")
     return coupon
@@ -1,21 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, get_audit_service
-from app.db.repositories.hr import EmployeeRepository
-from app.schemas.hr import Employee, Shift, EmployeeCreate, EmployeeUpdate
+from app.db.repositories.hr import EmployeeRepository, ShiftRepository
+from app.schemas.hr import (
+    Employee,
+    EmployeeDirectorySnapshot,
+    Shift,
+    ShiftSummary,
+    EmployeeCreate,
+    EmployeeUpdate,
+)
 from app.schemas.events import AuditLogCreate
 from app.schemas.enums import ActorTypeEnum
+from app.services.employee_directory import EmployeeDirectory, employee_directory
 from app.services.events import AuditService
 
 router = APIRouter()
 
+# Default length of the schedule window when no end_date is given.
+SCHEDULE_WEEKS = 4
 
 def get_employee_repository(db: Session = Depends(get_db)) -> EmployeeRepository:
     # This is a bit of a hack to reuse the same repository instance
     # within the same request.
     # A better approach would be to use a dependency injection container.
-    return EmployeeRepository(db=db)
+    return EmployeeRepository()
+
+
+def get_shift_repository(db: Session = Depends(get_db)) -> ShiftRepository:
+    return ShiftRepository()
+
+
+def get_employee_directory() -> EmployeeDirectory:
+    return employee_directory
+
+
+def schedule_window(
+    start_date: date | None = None,
+    end_date: date | None = None,
+    weeks: int = Query(SCHEDULE_WEEKS, ge=1, le=52),
+) -> tuple[date, date]:
+    start_date = start_date or date.today()
+    return start_date, end_date or start_date + timedelta(weeks=weeks)
+
+
+@router.get(
+    "/directory",
+    response_model=EmployeeDirectorySnapshot,
+    summary="Get the employee directory",
+    description="Returns this process's directory of employees (id, Telegram ID, role, active) and its version, which grows with every reload after an employee change.",
+)
+def read_employee_directory(
+    directory: EmployeeDirectory = Depends(get_employee_directory),
+    db: Session = Depends(get_db),
+):
+    return directory.snapshot(db)
 
 
 @router.get(
@@ -28,14 +70,40 @@ def read_employee_by_tg_id(
     *,
     tg_id: int,
     employee_repo: EmployeeRepository = Depends(get_employee_repository),
+    directory: EmployeeDirectory = Depends(get_employee_directory),
     db: Session = Depends(get_db),
 ):
-    employee = employee_repo.get_by_tg_id(db, tg_id=tg_id)
+    # Unknown Telegram ids are answered from the directory alone.
+    identity = directory.get(db, tg_id)
+    employee = employee_repo.get(db, id=identity.id) if identity else None
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     return employee
 
 
+@router.get(
+    "/by-tg-id/{tg_id}/shifts",
+    response_model=list[ShiftSummary],
+    summary="Get upcoming shifts of an employee by Telegram ID",
+    description="Returns the employee's shifts in a date range (default: from today, 4 weeks ahead) ordered by date, in a compact shape, with a single query.",
+)
+def read_employee_shifts_by_tg_id(
+    *,
+    tg_id: int,
+    window: tuple[date, date] = Depends(schedule_window),
+    directory: EmployeeDirectory = Depends(get_employee_directory),
+    shift_repo: ShiftRepository = Depends(get_shift_repository),
+    db: Session = Depends(get_db),
+):
+    start_date, end_date = window
+    shifts = shift_repo.get_for_employee(
+        db, tg_id=tg_id, start_date=start_date, end_date=end_date
+    )
+    if not shifts and not directory.get(db, tg_id):
+        raise HTTPException(status_code=404, detail="Employee not found")
+    return shifts
+
+
 @router.post(
     "/",
     response_model=Employee,
@@ -127,14 +195,20 @@ def delete_employee(
     "/{employee_id}/shifts",
     response_model=list[Shift],
     summary="Get shifts for an employee",
-    description="Retrieves a list of all shifts for a specific employee.",
+    description="Retrieves the employee's shifts in a date range (default: from today, 4 weeks ahead), ordered by date.",
 )
 def read_employee_shifts(
     *,
     employee_id: int,
+    window: tuple[date, date] = Depends(schedule_window),
+    employee_repo: EmployeeRepository = Depends(get_employee_repository),
+    shift_repo: ShiftRepository = Depends(get_shift_repository),
     db: Session = Depends(get_db),
 ):
-    employee = db.query(Employee).filter(Employee.id == employee_id).first()
-    if not employee:
+    start_date, end_date = window
+    shifts = shift_repo.get_for_employee(
+        db, employee_id=employee_id, start_date=start_date, end_date=end_date
+    )
+    if not shifts and not employee_repo.get(db, id=employee_id):
         raise HTTPException(status_code=404, detail="Employee not found")
-    return employee.shifts
+    return shifts
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, get_audit_service
+from app.db.cache import hot_cache
 from app.db.repositories.loyalty import LevelRepository
 from app.schemas.loyalty import Level, LevelCreate, LevelUpdate
 from app.schemas.events import AuditLogCreate
@@ -11,6 +13,8 @@ from app.services.events import AuditService
 
 router = APIRouter()
 
+cached_levels = TypeAdapter(list[Level])
+
 
 def get_level_service(db: Session = Depends(get_db)) -> LoyaltyService:
     level_repository = LevelRepository()
@@ -72,7 +76,9 @@ def read_levels(
     level_service: LoyaltyService = Depends(get_level_service),
     db: Session = Depends(get_db),
 ):
-    return level_service.get_all_levels(db)
+    return hot_cache.get_or_load(
+        "levels", "all", cached_levels, lambda: level_service.get_all_levels(db)
+    )
 
 
 @router.put(
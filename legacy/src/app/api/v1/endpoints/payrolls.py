@@ -7,7 +7,7 @@ from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, get_audit_service
 from app.db.repositories.hr import EmployeeRepository
-from app.schemas.hr import Payroll
+from app.schemas.hr import Payroll, PayrollAccrual
 from app.schemas.events import AuditLogCreate
 from app.schemas.enums import ActorTypeEnum
 from app.services.payroll import PayrollService
@@ -16,12 +16,19 @@ from app.services.events import AuditService
 router = APIRouter()
 
 
-from app.db.repositories.hr import PayrollRepository, ShiftRepository
+from app.db.repositories.hr import (
+    PayrollAccrualRepository,
+    PayrollRepository,
+    ShiftRepository,
+)
 
 def get_payroll_service(db: Session = Depends(get_db)) -> PayrollService:
     payroll_repository = PayrollRepository()
     shift_repository = ShiftRepository()
-    return PayrollService(payroll_repository, shift_repository)
+    payroll_accrual_repository = PayrollAccrualRepository()
+    return PayrollService(
+        payroll_repository, shift_repository, payroll_accrual_repository
+    )
 
 
 @router.post(
@@ -56,6 +63,40 @@ def calculate_payroll(
     return payroll
 
 
+@router.post(
+    "/run",
+    response_model=list[Payroll],
+    summary="Run payroll for all active employees",
+    description="Calculates (or recalculates) the given month for every active employee in one pass and records a single audit entry for the run.",
+)
+def run_payroll(
+    *,
+    month: date,
+    payroll_service: PayrollService = Depends(get_payroll_service),
+    audit_service: AuditService = Depends(get_audit_service),
+    db: Session = Depends(get_db),
+):
+    return payroll_service.run_payroll(db, month=month, audit_service=audit_service)
+
+
+@router.get(
+    "/accruals",
+    response_model=list[PayrollAccrual],
+    summary="Get running payroll accruals",
+    description="Returns the month-to-date hours and estimated pay per employee from the accrual ledger that is updated on every shift change. Defaults to the current month.",
+)
+def read_accruals(
+    *,
+    month: date | None = None,
+    employee_id: int | None = None,
+    payroll_service: PayrollService = Depends(get_payroll_service),
+    db: Session = Depends(get_db),
+):
+    return payroll_service.get_accruals(
+        db, month=month or date.today(), employee_id=employee_id
+    )
+
+
 @router.get(
     "/",
     response_model=list[Payroll],
@@ -2,8 +2,14 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db, get_audit_service
-from app.db.repositories.hr import ShiftRepository
-from app.schemas.hr import Shift, ShiftCreate, ShiftUpdate
+from app.db.repositories.hr import PayrollAccrualRepository, ShiftRepository
+from app.schemas.hr import (
+    Shift,
+    ShiftCreate,
+    ShiftScheduleCreate,
+    ShiftScheduleReport,
+    ShiftUpdate,
+)
 from app.schemas.events import AuditLogCreate
 from app.schemas.enums import ActorTypeEnum
 from app.services.shifts import ShiftService
@@ -14,7 +20,8 @@ router = APIRouter()
 
 def get_shift_service(db: Session = Depends(get_db)) -> ShiftService:
     shift_repository = ShiftRepository()
-    return ShiftService(shift_repository)
+    payroll_accrual_repository = PayrollAccrualRepository()
+    return ShiftService(shift_repository, payroll_accrual_repository)
 
 
 @router.post(
@@ -44,6 +51,39 @@ def create_shift(
     return shift
 
 
+@router.post(
+    "/schedule",
+    response_model=ShiftScheduleReport,
+    summary="Schedule shifts from a rota",
+    description="Expands a rota (employees x date range x weekdays with fixed hours) into shifts, creates all that do not clash with existing ones in one statement, and reports every skipped employee/date with the reason.",
+)
+def schedule_shifts(
+    *,
+    schedule_in: ShiftScheduleCreate,
+    shift_service: ShiftService = Depends(get_shift_service),
+    audit_service: AuditService = Depends(get_audit_service),
+    db: Session = Depends(get_db),
+):
+    try:
+        report = shift_service.schedule_shifts(db, schedule_in=schedule_in)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    audit_service.log_action(
+        db,
+        log_in=AuditLogCreate(
+            actor_type=ActorTypeEnum.admin,
+            action="schedule_shifts",
+            entity_type="shift",
+            payload={
+                "requested": report.requested,
+                "created": report.created,
+                "conflicts": len(report.conflicts),
+            },
+        ),
+    )
+    return report
+
+
 @router.get(
     "/{shift_id}",
     response_model=Shift,
@@ -89,7 +129,7 @@ def update_shift(
     audit_service: AuditService = Depends(get_audit_service),
     db: Session = Depends(get_db),
 ):
-    shift = shift_service.get_shift(db, shift_id=shift_id)
+    shift = shift_service.get_shift(db, shift_id=shift_id, for_update=True)
     if not shift:
         raise HTTPException(status_code=404, detail="Shift not found")
 
@@ -107,6 +147,36 @@ def update_shift(
     return updated_shift
 
 
+@router.post(
+    "/{shift_id}/approve",
+    response_model=Shift,
+    summary="Approve a shift",
+    description="Marks a shift as approved; its hours move into the approved total of the payroll accrual.",
+)
+def approve_shift(
+    *,
+    shift_id: int,
+    shift_service: ShiftService = Depends(get_shift_service),
+    audit_service: AuditService = Depends(get_audit_service),
+    db: Session = Depends(get_db),
+):
+    shift = shift_service.get_shift(db, shift_id=shift_id, for_update=True)
+    if not shift:
+        raise HTTPException(status_code=404, detail="Shift not found")
+
+    approved_shift = shift_service.approve_shift(db, shift=shift)
+    audit_service.log_action(
+        db,
+        log_in=AuditLogCreate(
+            actor_type=ActorTypeEnum.admin,
+            action="approve_shift",
+            entity_type="shift",
+            entity_id=shift_id,
+        ),
+    )
+    return approved_shift
+
+
 @router.delete(
     "/{shift_id}",
     response_model=Shift,
@@ -120,11 +190,10 @@ def delete_shift(
     audit_service: AuditService = Depends(get_audit_service),
     db: Session = Depends(get_db),
 ):
-    shift = shift_service.get_shift(db, shift_id=shift_id)
-    if not shift:
+    deleted_shift = shift_service.remove_shift(db, shift_id=shift_id)
+    if not deleted_shift:
         raise HTTPException(status_code=404, detail="Shift not found")
 
-    deleted_shift = shift_service.remove_shift(db, shift_id=shift_id)
     audit_service.log_action(
         db,
         log_in=AuditLogCreate(
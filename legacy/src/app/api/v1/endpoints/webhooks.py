@@ -1,37 +1,95 @@
+import asyncio
+import json
+import os
+
 from fastapi import APIRouter, Request, Header, HTTPException
-from aiogram import types
 
-from app.core.security import verify_hmac_signature
-from bots.bot import client_bot, client_dp, worker_bot, worker_dp
+from app.core import metrics
+from app.core.security import bot_signer, webhook_replays
+from app.core.tracing import tracer
+from app.services.update_dedup import ACCEPTED, update_windows
 
 router = APIRouter()
 
+BOT_TOKEN_VARIABLES = {
+    "client": "TELEGRAM_MAIN_BOT_TOKEN",
+    "worker": "TELEGRAM_AUTH_BOT_TOKEN",
+}
+
+
+def bot_runtime(name: str):
+    """Bot and dispatcher of the ``name`` bot. aiogram is imported on first
+    use; :func:`load_bots` does that at startup where the bots are served."""
+    from bots import bot
+
+    if name == "client":
+        return bot.get_client_bot(), bot.client_dp
+    return bot.get_worker_bot(), bot.worker_dp
+
+
+def load_bots() -> None:
+    """Build the bots whose token is configured, so their first webhook does
+    not pay for importing aiogram."""
+    for name, variable in BOT_TOKEN_VARIABLES.items():
+        if os.getenv(variable):
+            bot_runtime(name)
+
+
+async def feed_signed_update(name: str, request: Request, signature: str | None) -> dict:
+    """Verify the signature and freshness of a delivery, drop it if the same
+    signed delivery or the same update_id was already handled, and feed the
+    update to ``dp``.
+
+    Duplicates are acknowledged so that Telegram stops redelivering them. A
+    delivery whose handling fails is forgotten, so a retry is processed.
+    The checks may wait on Redis, so they run in a thread, off the event
+    loop.
+    """
+    body = await request.body()
+    if not bot_signer.verify(signature, body):
+        metrics.WEBHOOK_DELIVERIES.labels(name, "unauthorized").inc()
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if await asyncio.to_thread(webhook_replays.seen, signature):
+        metrics.WEBHOOK_DELIVERIES.labels(name, "replayed").inc()
+        return {"status": "duplicate"}
+
+    try:
+        update = json.loads(body)
+        update_id = int(update["update_id"])
+    except (ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=422, detail="Invalid update")
+    window = update_windows[name]
+    outcome = await asyncio.to_thread(window.check, update_id)
+    metrics.WEBHOOK_DELIVERIES.labels(name, outcome).inc()
+    if outcome != ACCEPTED:
+        return {"status": "duplicate"}
+    bot, dp = bot_runtime(name)
+    try:
+        with metrics.BOT_UPDATE_DURATION.labels(name).time():
+            with tracer.start_as_current_span(
+                f"bot.{name} update", attributes={"telegram.update_id": update_id}
+            ):
+                await dp.feed_raw_update(bot, update)
+    except Exception:
+        await asyncio.to_thread(webhook_replays.forget, signature)
+        await asyncio.to_thread(window.forget, update_id)
+        raise
+    return {"status": "ok"}
+
 
 @router.post(
     "/client",
     summary="Webhook for the client Telegram bot",
-    description="Receives updates from the client Telegram bot. Requests must be signed with an HMAC signature in the `X-Signature` header.",
+    description="Receives updates from the client Telegram bot. Requests must be signed with a fresh HMAC signature in the `X-Signature` header; a repeated delivery, or one whose `update_id` was already handled, is acknowledged with `duplicate` and not processed again.",
 )
 async def client_webhook(request: Request, x_signature: str | None = Header(None)):
-    body = await request.body()
-    if not verify_hmac_signature(x_signature, body):
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-    update = types.Update(**await request.json())
-    await client_dp.feed_update(client_bot, update)
-    return {"status": "ok"}
+    return await feed_signed_update("client", request, x_signature)
 
 
 @router.post(
     "/worker",
     summary="Webhook for the worker Telegram bot",
-    description="Receives updates from the worker Telegram bot. Requests must be signed with an HMAC signature in the `X-Signature` header.",
+    description="Receives updates from the worker Telegram bot. Requests must be signed with a fresh HMAC signature in the `X-Signature` header; a repeated delivery, or one whose `update_id` was already handled, is acknowledged with `duplicate` and not processed again.",
 )
 async def worker_webhook(request: Request, x_signature: str | None = Header(None)):
-    body = await request.body()
-    if not verify_hmac_signature(x_signature, body):
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-    update = types.Update(**await request.json())
-    await worker_dp.feed_update(worker_bot, update)
-    return {"status": "ok"}
+    return await feed_signed_update("worker", request, x_signature)
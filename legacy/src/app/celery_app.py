@@ -1,12 +1,62 @@
+import os
+
 from celery import Celery
 
+# Broadcasts get their own queue so their backlog is visible apart from the
+# periodic tasks; workers consume both.
+DEFAULT_QUEUE = "celery"
+BROADCAST_QUEUE = "broadcasts"
+CELERY_QUEUES = [DEFAULT_QUEUE, BROADCAST_QUEUE]
+
+# Broker and result backend; the Redis that docker-compose runs by default.
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+# Seconds a task may run before the Redis broker hands its unacked message to
+# another worker. Broadcast chunks are sized to finish well within it.
+BROKER_VISIBILITY_TIMEOUT = int(os.getenv("CELERY_VISIBILITY_TIMEOUT_SECONDS", "3600"))
+
 celery_app = Celery(
     "worker",
-    broker="redis://redis:6379/0",
-    backend="redis://redis:6379/0",
-    include=["app.workers.broadcast"],
+    broker=REDIS_URL,
+    backend=REDIS_URL,
+    include=[
+        "app.workers.broadcast",
+        "app.workers.campaigns",
+        "app.workers.coupons",
+        "app.workers.payroll",
+    ],
 )
 
 celery_app.conf.update(
     task_track_started=True,
+    # A worker reserves one message per process, so queued chunks wait on the
+    # broker rather than unacked behind a long-running one.
+    worker_prefetch_multiplier=1,
+    broker_transport_options={"visibility_timeout": BROKER_VISIBILITY_TIMEOUT},
+    task_default_queue=DEFAULT_QUEUE,
+    task_routes={"app.workers.broadcast.*": {"queue": BROADCAST_QUEUE}},
+    beat_schedule={
+        "expire-coupons": {
+            "task": "app.workers.coupons.expire_coupons",
+            "schedule": float(os.getenv("COUPON_EXPIRY_INTERVAL_SECONDS", "300")),
+        },
+        "transition-campaigns": {
+            "task": "app.workers.campaigns.transition_campaigns",
+            "schedule": float(os.getenv("CAMPAIGN_SCHEDULER_INTERVAL_SECONDS", "60")),
+        },
+        "attribute-redemptions": {
+            "task": "app.workers.campaigns.attribute_redemptions",
+            "schedule": float(
+                os.getenv("CAMPAIGN_ATTRIBUTION_INTERVAL_SECONDS", "900")
+            ),
+        },
+        "reconcile-payroll-accruals": {
+            "task": "app.workers.payroll.reconcile_payroll_accruals",
+            "schedule": float(
+                os.getenv("PAYROLL_RECONCILE_INTERVAL_SECONDS", "86400")
+            ),
+        },
+    },
 )
+
+# Task metrics and trace propagation, for publishers and workers alike.
+import app.workers.monitoring  # noqa: E402,F401
@@ -0,0 +1,161 @@
+import logging
+import os
+
+import redis
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# With several uvicorn or Celery worker processes, every process writes its
+# samples under this directory and a scrape aggregates them. The directory
+# must be emptied before the processes start.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+# Queue lengths are skipped rather than stalling a scrape on a slow broker.
+REDIS_TIMEOUT_SECONDS = 1.0
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# API
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Request latency.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per request.",
+    ["method", "route"],
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Time spent in SQL statements per request.",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_COMMITS = Histogram(
+    "http_request_db_commits",
+    "Commits per request.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10),
+)
+REPEATED_STATEMENT_REQUESTS = Counter(
+    "http_request_repeated_statements",
+    "Requests that ran one statement at least SQL_REPEAT_THRESHOLD times.",
+    ["method", "route"],
+)
+REDEMPTIONS = Counter(
+    "coupon_redemptions",
+    "Coupon redemption attempts by outcome: ok or the E-* error code.",
+    ["outcome"],
+)
+HOT_CACHE_LOOKUPS = Counter(
+    "hot_cache_lookups",
+    "Hot lookup cache reads by region and result: hit, miss or error.",
+    ["region", "result"],
+)
+
+# Database pool, summed over live processes.
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Configured pool size.", multiprocess_mode="livesum"
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Open database connections.", multiprocess_mode="livesum"
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool.",
+    multiprocess_mode="livesum",
+)
+
+# Celery
+TASK_DURATION = Histogram(
+    "celery_task_duration_seconds",
+    "Celery task run time by final state.",
+    ["task", "state"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600),
+)
+BROADCAST_MESSAGES = Counter(
+    "broadcast_messages",
+    "Broadcast messages by outcome: sent, failed or throttled (Telegram "
+    "asked to retry later).",
+    ["outcome"],
+)
+
+# Telegram bots
+WEBHOOK_DELIVERIES = Counter(
+    "bot_webhook_deliveries",
+    "Webhook deliveries by outcome: accepted, unauthorized, replayed (same "
+    "signature) or duplicate (update_id already seen).",
+    ["bot", "outcome"],
+)
+BOT_UPDATE_DURATION = Histogram(
+    "bot_update_duration_seconds",
+    "Time to process one Telegram update in the webhook.",
+    ["bot"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class QueueLengthCollector:
+    """celery_queue_length per queue, read from the Redis broker at scrape
+    time, so it is the same whichever process serves the scrape."""
+
+    def __init__(self, broker_url: str, queues: list[str]):
+        self.broker_url = broker_url
+        self.queues = queues
+        self._redis: redis.Redis | None = None
+
+    def collect(self):
+        family = GaugeMetricFamily(
+            "celery_queue_length", "Messages waiting in a Celery queue.", labels=["queue"]
+        )
+        if self._redis is None:
+            self._redis = redis.Redis.from_url(
+                self.broker_url, socket_timeout=REDIS_TIMEOUT_SECONDS
+            )
+        try:
+            for queue in self.queues:
+                family.add_metric([queue], self._redis.llen(queue))
+        except redis.RedisError as e:
+            logger.warning(f"Could not read Celery queue lengths: {e}")
+            return
+        yield family
+
+
+def scrape_registry() -> CollectorRegistry:
+    """Every process's samples under PROMETHEUS_MULTIPROC_DIR, else this
+    process's."""
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def exposition(*collectors) -> bytes:
+    """Text exposition of :func:`scrape_registry` followed by ``collectors``."""
+    output = generate_latest(scrape_registry())
+    if collectors:
+        extra = CollectorRegistry()
+        for collector in collectors:
+            extra.register(collector)
+        output += generate_latest(extra)
+    return output
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop a stopped process's live gauges from the aggregate."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -1,27 +1,122 @@
 import hashlib
 import hmac
+import logging
 import os
+import threading
 import time
+from collections import OrderedDict
 
+import redis
 
-def create_hmac_signature(body: bytes) -> str:
-    secret = os.getenv("BOT_HMAC_SECRET", "")
-    timestamp = str(int(time.time()))
-    message = timestamp.encode() + b"." + body
-    signature = hmac.new(
-        secret.encode(), msg=message, digestmod=hashlib.sha256
-    ).hexdigest()
-    return f"{timestamp}.{signature}"
-
-
-def verify_hmac_signature(signature: str, body: bytes) -> bool:
-    secret = os.getenv("BOT_HMAC_SECRET", "")
-    try:
-        timestamp, sig = signature.split(".")
-        message = timestamp.encode() + b"." + body
-        expected_signature = hmac.new(
-            secret.encode(), msg=message, digestmod=hashlib.sha256
-        ).hexdigest()
-        return hmac.compare_digest(expected_signature, sig)
-    except (ValueError, IndexError):
-        return False
+logger = logging.getLogger(__name__)
+
+
+class HmacSigner:
+    """Signs and verifies bodies as ``<unix time>.<hex HMAC-SHA256>`` of
+    ``b"<unix time>." + body``.
+
+    The keyed hash is set up once and copied per call, so neither the secret
+    nor the HMAC pads are derived again per request. Signatures older than
+    ``max_age`` seconds, or more than ``max_skew`` seconds in the future, do
+    not verify.
+    """
+
+    def __init__(self, secret: str, max_age: float = 300.0, max_skew: float = 30.0):
+        self._keyed = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+        self.max_age = max_age
+        self.max_skew = max_skew
+
+    def _digest(self, timestamp: bytes, body: bytes) -> str:
+        mac = self._keyed.copy()
+        mac.update(timestamp)
+        mac.update(b".")
+        mac.update(body)
+        return mac.hexdigest()
+
+    def sign(self, body: bytes, timestamp: int | None = None) -> str:
+        timestamp = str(int(time.time()) if timestamp is None else timestamp)
+        return f"{timestamp}.{self._digest(timestamp.encode(), body)}"
+
+    def verify(self, signature: str | None, body: bytes) -> bool:
+        if not signature:
+            return False
+        timestamp, _, sig = signature.partition(".")
+        try:
+            age = time.time() - int(timestamp)
+        except ValueError:
+            return False
+        if age > self.max_age or age < -self.max_skew:
+            return False
+        expected = self._digest(timestamp.encode(), body)
+        return hmac.compare_digest(expected.encode(), sig.encode())
+
+
+class ReplayCache:
+    """Remembers keys for ``ttl`` seconds so that a repeat is recognised.
+
+    A bounded LRU answers repeats within this process in O(1); with a Redis
+    URL, first sightings are also claimed with ``SET NX`` so repeats
+    delivered to another process are caught too. While Redis is unreachable
+    only the local check applies.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_size: int = 10000,
+        redis_url: str | None = None,
+        prefix: str = "replay:",
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.prefix = prefix
+        self._redis = (
+            redis.Redis.from_url(redis_url, socket_timeout=0.5) if redis_url else None
+        )
+        self._keys: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def seen(self, key: str) -> bool:
+        """Whether ``key`` was seen within ``ttl``; records it if not."""
+        now = time.monotonic()
+        with self._lock:
+            expires_at = self._keys.get(key)
+            if expires_at is not None and expires_at > now:
+                return True
+            self._keys[key] = now + self.ttl
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.max_size:
+                self._keys.popitem(last=False)
+        if self._redis is None:
+            return False
+        try:
+            return not self._redis.set(
+                self.prefix + key, b"1", px=int(self.ttl * 1000), nx=True
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Replay cache could not reach Redis: {e}")
+            return False
+
+    def forget(self, key: str) -> None:
+        """Let ``key`` through again, e.g. after its processing failed."""
+        with self._lock:
+            self._keys.pop(key, None)
+        if self._redis is not None:
+            try:
+                self._redis.delete(self.prefix + key)
+            except redis.RedisError as e:
+                logger.warning(f"Replay cache could not reach Redis: {e}")
+
+
+bot_signer = HmacSigner(
+    os.getenv("BOT_HMAC_SECRET", ""),
+    max_age=float(os.getenv("BOT_HMAC_MAX_AGE_SECONDS", "300")),
+)
+# Signatures older than the freshness window fail verification anyway, so
+# they need not be remembered longer than that.
+webhook_replays = ReplayCache(
+    ttl=bot_signer.max_age + bot_signer.max_skew,
+    max_size=int(os.getenv("WEBHOOK_REPLAY_CACHE_SIZE", "10000")),
+    redis_url=os.getenv("REDIS_URL"),
+    prefix="webhook_replay:",
+)
@@ -0,0 +1,40 @@
+import os
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+# Spans are appended to this file as JSON lines; unset leaves tracing off,
+# and every span below is then a no-op.
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE")
+# Share of new traces recorded; requests joining a trace follow its caller.
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "0.01"))
+# db.statement attributes are cut to this many characters.
+TRACED_STATEMENT_LENGTH = 1000
+
+tracer = trace.get_tracer("app")
+
+
+def setup_tracing(service_name: str) -> None:
+    """Install this process's tracer provider. Call it after forking."""
+    if not TRACE_EXPORT_FILE:
+        return
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name}),
+        sampler=ParentBased(TraceIdRatioBased(TRACE_SAMPLE_RATIO)),
+    )
+    exporter = ConsoleSpanExporter(
+        out=open(TRACE_EXPORT_FILE, "a", buffering=1),
+        formatter=lambda span: span.to_json(indent=None) + "\n",
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+
+def shutdown_tracing() -> None:
+    """Export spans still queued in this process."""
+    provider = trace.get_tracer_provider()
+    if isinstance(provider, TracerProvider):
+        provider.shutdown()
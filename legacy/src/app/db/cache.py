@@ -0,0 +1,329 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Collection, Iterable, TypeVar
+
+import redis
+from pydantic import TypeAdapter
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core import metrics
+from app.db.models.loyalty import Client, Level
+from app.db.models.promotions import Campaign, Coupon
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# A process filling a missing key holds "<key>:filling" this long; other
+# processes poll for its result meanwhile instead of querying too.
+FILL_LOCK_SECONDS = 2.0
+FILL_POLL_SECONDS = 0.025
+# Invalidated keys hold a tombstone this long, so a fill that read the row
+# before the write committed cannot store the old value afterwards.
+TOMBSTONE = b"\x00"
+TOMBSTONE_SECONDS = 2.0
+REDIS_TIMEOUT_SECONDS = 0.5
+# session.info entry collecting (region, key) pairs until the commit; a key
+# of None stands for the whole region.
+PENDING = "hot_cache_pending"
+# session.info entry collecting the subscribed models written before the commit.
+CHANGED = "hot_cache_changed"
+
+
+class MemoryBackend:
+    """In-process stand-in for Redis, for local runs and tests. Nothing is
+    shared between processes."""
+
+    def __init__(self):
+        self._entries: dict[str, tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str, now: float) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= now:
+            return None
+        return entry[1]
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            return self._live(key, time.monotonic())
+
+    def set(self, key: str, value: bytes, ttl: float, *, only_new: bool = False) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if only_new and self._live(key, now) is not None:
+                return False
+            self._entries[key] = (now + ttl, value)
+            return True
+
+    def set_many(self, keys: Iterable[str], value: bytes, ttl: float) -> None:
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            for key in keys:
+                self._entries[key] = (expires_at, value)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+
+class RedisBackend:
+    def __init__(self, url: str):
+        self._redis = redis.Redis.from_url(url, socket_timeout=REDIS_TIMEOUT_SECONDS)
+
+    def get(self, key: str) -> bytes | None:
+        return self._redis.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float, *, only_new: bool = False) -> bool:
+        return bool(self._redis.set(key, value, px=int(ttl * 1000), nx=only_new))
+
+    def set_many(self, keys: Iterable[str], value: bytes, ttl: float) -> None:
+        pipeline = self._redis.pipeline(transaction=False)
+        for key in keys:
+            pipeline.set(key, value, px=int(ttl * 1000))
+        pipeline.execute()
+
+    def delete(self, key: str) -> None:
+        self._redis.delete(key)
+
+    def delete_prefix(self, prefix: str) -> None:
+        batch = []
+        for key in self._redis.scan_iter(match=f"{prefix}*", count=1000):
+            batch.append(key)
+            if len(batch) == 1000:
+                self._redis.delete(*batch)
+                batch = []
+        if batch:
+            self._redis.delete(*batch)
+
+
+class _Flight:
+    """A fill in progress in this process; other threads wait on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.raw: bytes | None = None
+
+
+def _load_json(adapter: TypeAdapter, load: Callable[[], Any]) -> bytes:
+    return adapter.dump_json(adapter.validate_python(load(), from_attributes=True))
+
+
+class HotCache:
+    """Read-through cache of hot lookups, shared by every process in Redis.
+
+    Values are stored as the JSON of their response schema, per region
+    (clients, levels, ...) with the region's TTL; lookups that found
+    nothing are cached too. Concurrent misses on one key run the query
+    once: threads of a process wait for the thread filling it, processes
+    wait for the one holding the fill lock.
+
+    Changes to tracked models invalidate their keys when the transaction
+    commits: ORM writes are picked up at flush by :meth:`watch`, bulk and
+    core statements are reported by the repositories through
+    :meth:`forget_rows`. If the backend is unreachable lookups go to the
+    database and stale entries live at most their TTL. The same tracking
+    drives :meth:`subscribe`, for in-process caches kept elsewhere.
+    """
+
+    def __init__(self, backend, ttls: dict[str, float], prefix: str = "hot:"):
+        self.backend = backend
+        self.ttls = ttls
+        self.prefix = prefix
+        self._tracked: dict[type, list[tuple[str, str | None]]] = {}
+        self._subscribers: dict[type, list[Callable[[], None]]] = {}
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def track(self, model: type, region: str, attr: str | None = None) -> None:
+        """Invalidate the ``region`` entry keyed by ``attr`` of a changed
+        ``model`` row, or the whole region when ``attr`` is None."""
+        self._tracked.setdefault(model, []).append((region, attr))
+
+    def subscribe(self, model: type, callback: Callable[[], None]) -> None:
+        """Call ``callback`` after every commit that wrote ``model`` rows,
+        through the ORM or the repositories' bulk statements."""
+        self._subscribers.setdefault(model, []).append(callback)
+
+    def watch(self, session_factory: sessionmaker) -> None:
+        event.listen(session_factory, "after_flush", self._collect)
+        event.listen(session_factory, "after_commit", self._invalidate_pending)
+        event.listen(session_factory, "after_rollback", self._drop_pending)
+
+    def get_or_load(
+        self, region: str, key: Any, adapter: TypeAdapter[T], load: Callable[[], Any]
+    ) -> T:
+        """The cached value, else ``load()`` validated with ``adapter``."""
+        if self.backend is None:
+            return adapter.validate_python(load(), from_attributes=True)
+        cache_key = f"{self.prefix}{region}:{key}"
+        try:
+            raw = self.backend.get(cache_key)
+        except redis.RedisError as e:
+            logger.warning(f"Hot cache unavailable, loading {cache_key}: {e}")
+            metrics.HOT_CACHE_LOOKUPS.labels(region, "error").inc()
+            return adapter.validate_python(load(), from_attributes=True)
+        if raw is not None and raw != TOMBSTONE:
+            metrics.HOT_CACHE_LOOKUPS.labels(region, "hit").inc()
+            return adapter.validate_json(raw)
+        metrics.HOT_CACHE_LOOKUPS.labels(region, "miss").inc()
+        return adapter.validate_json(self._fill(region, cache_key, adapter, load))
+
+    def forget_rows(
+        self,
+        db: Session,
+        model: type,
+        rows: Iterable[dict],
+        *,
+        stable: Collection[str] | None = None,
+    ) -> None:
+        """Invalidate, once ``db`` commits, entries for rows a bulk or core
+        statement wrote.
+
+        ``stable`` names the columns whose value in ``rows`` is the row's
+        value both before and after the write (conflict or where-clause
+        keys); None means the rows are new. Regions keyed by anything else
+        are invalidated whole.
+        """
+        if model in self._subscribers:
+            db.info.setdefault(CHANGED, set()).add(model)
+        regions = self._tracked.get(model)
+        if not regions:
+            return
+        rows = list(rows)
+        pending = db.info.setdefault(PENDING, set())
+        for region, attr in regions:
+            if attr is not None and (stable is None or attr in stable):
+                pending.update(
+                    (region, row[attr]) for row in rows if row.get(attr) is not None
+                )
+            else:
+                pending.add((region, None))
+
+    def invalidate(self, keys: Iterable[tuple[str, Any]]) -> None:
+        keys = set(keys)
+        regions = {region for region, key in keys if key is None}
+        try:
+            for region in regions:
+                self.backend.delete_prefix(f"{self.prefix}{region}:")
+            self.backend.set_many(
+                (
+                    f"{self.prefix}{region}:{key}"
+                    for region, key in keys
+                    if region not in regions
+                ),
+                TOMBSTONE,
+                TOMBSTONE_SECONDS,
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Could not invalidate hot cache entries: {e}")
+
+    def _fill(
+        self, region: str, cache_key: str, adapter: TypeAdapter, load: Callable[[], Any]
+    ) -> bytes:
+        with self._lock:
+            flight = self._flights.get(cache_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[cache_key] = _Flight()
+        if not leader:
+            if flight.done.wait(FILL_LOCK_SECONDS) and flight.raw is not None:
+                return flight.raw
+            return _load_json(adapter, load)
+        try:
+            flight.raw = self._fill_shared(region, cache_key, adapter, load)
+            return flight.raw
+        finally:
+            with self._lock:
+                del self._flights[cache_key]
+            flight.done.set()
+
+    def _fill_shared(
+        self, region: str, cache_key: str, adapter: TypeAdapter, load: Callable[[], Any]
+    ) -> bytes:
+        lock_key = f"{cache_key}:filling"
+        try:
+            locked = self.backend.set(lock_key, b"1", FILL_LOCK_SECONDS, only_new=True)
+            if not locked:
+                deadline = time.monotonic() + FILL_LOCK_SECONDS
+                while time.monotonic() < deadline:
+                    time.sleep(FILL_POLL_SECONDS)
+                    raw = self.backend.get(cache_key)
+                    if raw is not None and raw != TOMBSTONE:
+                        return raw
+        except redis.RedisError as e:
+            logger.warning(f"Hot cache unavailable, loading {cache_key}: {e}")
+            locked = False
+
+        raw = _load_json(adapter, load)
+        try:
+            # Not over a tombstone: the write behind it may postdate our read.
+            self.backend.set(cache_key, raw, self.ttls[region], only_new=True)
+            if locked:
+                self.backend.delete(lock_key)
+        except redis.RedisError as e:
+            logger.warning(f"Could not store hot cache entry {cache_key}: {e}")
+        return raw
+
+    def _collect(self, session: Session, flush_context) -> None:
+        pending = session.info.setdefault(PENDING, set())
+        changed = session.info.setdefault(CHANGED, set())
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if type(obj) in self._subscribers:
+                changed.add(type(obj))
+            for region, attr in self._tracked.get(type(obj), ()):
+                if attr is None:
+                    pending.add((region, None))
+                    continue
+                history = inspect(obj).attrs[attr].history
+                for value in (getattr(obj, attr), *history.deleted):
+                    if value is not None:
+                        pending.add((region, value))
+
+    def _invalidate_pending(self, session: Session) -> None:
+        pending = session.info.pop(PENDING, None)
+        if pending and self.backend is not None:
+            self.invalidate(pending)
+        for model in session.info.pop(CHANGED, ()):
+            for callback in self._subscribers[model]:
+                try:
+                    callback()
+                except Exception:
+                    logger.exception(f"Commit callback for {model.__name__} failed.")
+
+    def _drop_pending(self, session: Session) -> None:
+        session.info.pop(PENDING, None)
+        session.info.pop(CHANGED, None)
+
+
+def _backend(url: str | None) -> MemoryBackend | RedisBackend | None:
+    if not url or url == "off":
+        return None
+    if url == "memory://":
+        return MemoryBackend()
+    return RedisBackend(url)
+
+
+hot_cache = HotCache(
+    _backend(os.getenv("HOT_CACHE_URL") or os.getenv("REDIS_URL")),
+    ttls={
+        "clients": float(os.getenv("HOT_CACHE_CLIENT_TTL_SECONDS", "60")),
+        "levels": float(os.getenv("HOT_CACHE_LEVEL_TTL_SECONDS", "3600")),
+        "campaigns": float(os.getenv("HOT_CACHE_CAMPAIGN_TTL_SECONDS", "300")),
+        "coupons": float(os.getenv("HOT_CACHE_COUPON_TTL_SECONDS", "30")),
+    },
+)
+hot_cache.track(Client, "clients", "tg_id")
+# Clients are served with their level embedded.
+hot_cache.track(Level, "clients")
+hot_cache.track(Level, "levels")
+hot_cache.track(Campaign, "campaigns", "id")
+hot_cache.track(Coupon, "coupons", "code")
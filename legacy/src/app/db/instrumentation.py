@@ -0,0 +1,109 @@
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.core import metrics
+from app.core.tracing import TRACED_STATEMENT_LENGTH, tracer
+
+
+class QueryStats:
+    """SQL statements, their time and commits seen during one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.commits = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: str | None = None
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.db_time += elapsed
+        self.statements[statement] += 1
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    @property
+    def max_repeats(self) -> int:
+        return max(self.statements.values(), default=0)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements run at least ``threshold`` times: likely N+1 loops."""
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+# Set by the request middleware; None outside requests (workers, threads).
+current_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Feed every statement and commit on ``engine`` into the current
+    request's QueryStats, trace each statement as a child of the current
+    span, and keep the pool gauges up to date."""
+    # Only QueuePool has a fixed size; NullPool, StaticPool and SQLite's
+    # SingletonThreadPool leave the gauge unset.
+    if isinstance(engine.pool, QueuePool):
+        metrics.DB_POOL_SIZE.set(engine.pool.size())
+
+    @event.listens_for(engine, "connect")
+    def _connection_opened(dbapi_connection, connection_record):
+        metrics.DB_POOL_CONNECTIONS.inc()
+
+    @event.listens_for(engine, "close")
+    def _connection_closed(dbapi_connection, connection_record):
+        metrics.DB_POOL_CONNECTIONS.dec()
+
+    @event.listens_for(engine, "checkout")
+    def _checked_out(dbapi_connection, connection_record, connection_proxy):
+        metrics.DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _checked_in(dbapi_connection, connection_record):
+        metrics.DB_POOL_CHECKED_OUT.dec()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        context._query_span = tracer.start_span(
+            f"SQL {statement.split(None, 1)[0].upper()}",
+            kind=SpanKind.CLIENT,
+            attributes={
+                "db.system": engine.dialect.name,
+                "db.statement": statement[:TRACED_STATEMENT_LENGTH],
+            },
+        )
+        context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _record_query(conn, cursor, statement, parameters, context, executemany):
+        context._query_span.end()
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.record(statement, time.perf_counter() - context._query_started)
+
+    @event.listens_for(engine, "handle_error")
+    def _record_error(exception_context):
+        span = getattr(exception_context.execution_context, "_query_span", None)
+        if span is not None:
+            span.set_status(
+                Status(StatusCode.ERROR, str(exception_context.original_exception))
+            )
+            span.end()
+
+    @event.listens_for(engine, "commit")
+    def _record_commit(conn):
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.commits += 1
@@ -4,9 +4,11 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     Text,
+    UniqueConstraint,
 )
 from sqlalchemy.dialects.postgresql import INET, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -32,8 +34,9 @@ class CampaignEvent(Base):
         Enum(CampaignEventTypeEnum, name="campaign_event_type_enum", create_type=False),
         nullable=False,
     )
+    # Empty on redemption usage rows of coupons issued outside a campaign.
     campaign_id: Mapped[int] = mapped_column(
-        BigInteger, ForeignKey("campaigns.id", ondelete="CASCADE"), nullable=False
+        BigInteger, ForeignKey("campaigns.id", ondelete="CASCADE"), nullable=True
     )
     client_id: Mapped[int] = mapped_column(
         BigInteger, ForeignKey("clients.id", ondelete="SET NULL"), nullable=True
@@ -43,6 +46,11 @@ class CampaignEvent(Base):
     )
     amount: Mapped[float] = mapped_column(Numeric(12, 2), nullable=True)
     meta: Mapped[dict] = mapped_column(JSONB, nullable=False, server_default="{}")
+    # The events row an attributed redeem was derived from. Redeem rows
+    # without it are the usage records that redemption writes itself.
+    source_event_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("events.id", ondelete="SET NULL"), nullable=True
+    )
 
     campaign: Mapped["Campaign"] = relationship(backref="events")
     client: Mapped["Client"] = relationship(backref="campaign_events")
@@ -50,6 +58,10 @@ class CampaignEvent(Base):
 
     __table_args__ = (
         CheckConstraint("amount IS NULL OR amount >= 0", name="campaign_events_amount_check"),
+        UniqueConstraint("source_event_id", name="campaign_events_source_event_id_uc"),
+        Index("campaign_events_client_id_type_ts_idx", "client_id", "type", "ts"),
+        Index("campaign_events_campaign_id_type_ts_idx", "campaign_id", "type", "ts"),
+        Index("campaign_events_coupon_id_type_idx", "coupon_id", "type"),
     )
 
 
@@ -127,3 +139,5 @@ class Event(Base):
     entity_type: Mapped[str] = mapped_column(Text, nullable=True)
     entity_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
     payload: Mapped[dict] = mapped_column(JSONB, nullable=False, server_default="{}")
+
+    __table_args__ = (Index("events_name_ts_idx", "name", "ts"),)
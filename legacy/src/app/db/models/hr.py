@@ -5,6 +5,7 @@ from sqlalchemy import (
     Date,
     Enum,
     ForeignKey,
+    Integer,
     Numeric,
     Text,
     UniqueConstraint,
@@ -96,3 +97,31 @@ class Payroll(Base):
         CheckConstraint("taxes >= 0", name="payroll_taxes_check"),
         CheckConstraint("net >= 0", name="payroll_net_check"),
     )
+
+
+class PayrollAccrual(Base):
+    """Model for running per-month payroll totals maintained from shifts."""
+
+    __tablename__ = "payroll_accruals"
+
+    employee_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("employees.id", ondelete="CASCADE"), nullable=False
+    )
+    month: Mapped[Date] = mapped_column(Date, nullable=False)
+    shifts_count: Mapped[int] = mapped_column(
+        Integer, nullable=False, server_default="0"
+    )
+    hours: Mapped[float] = mapped_column(
+        Numeric(8, 2), nullable=False, server_default="0"
+    )
+    approved_hours: Mapped[float] = mapped_column(
+        Numeric(8, 2), nullable=False, server_default="0"
+    )
+
+    employee: Mapped["Employee"] = relationship(backref="payroll_accruals")
+
+    __table_args__ = (
+        UniqueConstraint(
+            "employee_id", "month", name="payroll_accruals_employee_id_month_uc"
+        ),
+    )
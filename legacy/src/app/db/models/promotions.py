@@ -5,6 +5,7 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     Text,
@@ -49,6 +50,8 @@ class Campaign(Base):
             "attribution_window_days BETWEEN 1 AND 90",
             name="campaigns_attribution_window_days_check",
         ),
+        Index("campaigns_status_start_at_idx", "status", "start_at"),
+        Index("campaigns_status_end_at_idx", "status", "end_at"),
     )
 
 
@@ -137,4 +140,12 @@ class Coupon(Base):
             "redemption_amount IS NULL OR redemption_amount >= 0",
             name="coupons_redemption_amount_check",
         ),
+        Index("coupons_status_expires_at_idx", "status", "expires_at"),
+        Index(
+            "coupons_client_id_status_expires_at_idx",
+            "client_id",
+            "status",
+            "expires_at",
+        ),
+        Index("coupons_campaign_id_created_at_idx", "campaign_id", "created_at"),
     )
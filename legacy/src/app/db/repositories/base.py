@@ -1,9 +1,12 @@
-from typing import Generic, Type, TypeVar
+from itertools import islice
+from typing import Any, Generic, Iterable, Iterator, Sequence, Type, TypeVar
 
 from pydantic import BaseModel
-from sqlalchemy import select, update
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
+from app.db.cache import hot_cache
 from app.db.models.base import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
@@ -12,10 +15,41 @@ UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
 class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    # Rows per multi-row statement in the bulk_* helpers.
+    chunk_size: int = 1000
+
     def __init__(self, model: Type[ModelType]):
         self.model = model
 
-    def get(self, db: Session, id: int) -> ModelType | None:
+    @staticmethod
+    def _as_dict(obj: BaseModel | dict, *, exclude_unset: bool = False) -> dict:
+        if isinstance(obj, dict):
+            return obj
+        return obj.model_dump(exclude_unset=exclude_unset)
+
+    def _chunks(
+        self,
+        objs: Iterable[BaseModel | dict],
+        chunk_size: int | None,
+        *,
+        exclude_unset: bool = False,
+    ) -> Iterator[list[dict]]:
+        size = chunk_size or self.chunk_size
+        it = iter(objs)
+        while chunk := [
+            self._as_dict(obj, exclude_unset=exclude_unset) for obj in islice(it, size)
+        ]:
+            yield chunk
+
+    def get(
+        self, db: Session, id: int, *, for_update: bool = False
+    ) -> ModelType | None:
+        """Row by primary key; ``for_update`` locks it (SELECT ... FOR UPDATE)
+        and re-reads it even if the session already holds it."""
+        if for_update:
+            return db.get(
+                self.model, id, with_for_update=True, populate_existing=True
+            )
         return db.get(self.model, id)
 
     def get_all(self, db: Session, *, skip: int = 0, limit: int = 100) -> list[ModelType]:
@@ -25,8 +59,7 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         obj_in_data = obj_in.model_dump()
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        db.flush()
         return db_obj
 
     def update(
@@ -36,12 +69,98 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         for field, value in update_data.items():
             setattr(db_obj, field, value)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        db.flush()
         return db_obj
 
     def remove(self, db: Session, *, id: int) -> ModelType:
         obj = db.get(self.model, id)
         db.delete(obj)
-        db.commit()
+        db.flush()
         return obj
+
+    def bulk_create(
+        self,
+        db: Session,
+        *,
+        objs_in: Iterable[CreateSchemaType | dict],
+        chunk_size: int | None = None,
+        returning: bool = True,
+    ) -> list[ModelType]:
+        """Insert rows with one multi-row INSERT per chunk.
+
+        With ``returning=False`` nothing is loaded back, which is the fastest
+        path for imports that do not need the created objects.
+        """
+        created: list[ModelType] = []
+        for chunk in self._chunks(objs_in, chunk_size):
+            hot_cache.forget_rows(db, self.model, chunk)
+            if returning:
+                created.extend(
+                    db.scalars(insert(self.model).returning(self.model), chunk).all()
+                )
+            else:
+                db.execute(insert(self.model), chunk)
+        return created
+
+    def bulk_update(
+        self,
+        db: Session,
+        *,
+        objs_in: Iterable[UpdateSchemaType | dict],
+        chunk_size: int | None = None,
+    ) -> int:
+        """Update rows by primary key; every item must carry an ``id``.
+
+        Only the fields that are set on a schema (or present in a dict) are
+        written. Returns the number of rows sent to the database.
+        """
+        count = 0
+        for chunk in self._chunks(objs_in, chunk_size, exclude_unset=True):
+            hot_cache.forget_rows(db, self.model, chunk, stable=("id",))
+            db.execute(update(self.model), chunk)
+            count += len(chunk)
+        return count
+
+    def upsert(
+        self,
+        db: Session,
+        *,
+        objs_in: Iterable[CreateSchemaType | dict],
+        index_elements: Sequence[str] | None = None,
+        constraint: str | None = None,
+        update_fields: Sequence[str] | None = None,
+        chunk_size: int | None = None,
+    ) -> list[ModelType]:
+        """``INSERT ... ON CONFLICT DO UPDATE ... RETURNING`` per chunk.
+
+        The conflict target is either ``index_elements`` (column names) or a
+        named unique ``constraint``. ``update_fields`` defaults to every
+        supplied field except the conflict columns; with an empty list the
+        conflicting rows are left untouched and not returned. Items within one
+        chunk must not share a conflict key.
+        """
+        upserted: list[ModelType] = []
+        for chunk in self._chunks(objs_in, chunk_size):
+            hot_cache.forget_rows(db, self.model, chunk, stable=index_elements or ())
+            stmt = pg_insert(self.model).values(chunk)
+            fields = update_fields
+            if fields is None:
+                skip = {"id", "created_at", *(index_elements or ())}
+                fields = [key for key in chunk[0] if key not in skip]
+            if fields:
+                set_: dict[str, Any] = {field: stmt.excluded[field] for field in fields}
+                set_["updated_at"] = func.now()
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=index_elements, constraint=constraint, set_=set_
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(
+                    index_elements=index_elements, constraint=constraint
+                )
+            upserted.extend(
+                db.scalars(
+                    stmt.returning(self.model),
+                    execution_options={"populate_existing": True},
+                ).all()
+            )
+        return upserted
@@ -1,10 +1,30 @@
-from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    Numeric,
+    Row,
+    and_,
+    cast,
+    func,
+    literal,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, aliased
 
 from app.db.models.events import AuditLog, Broadcast, CampaignEvent, Event, Subscription
-from app.db.models.promotions import Coupon
+from app.db.models.promotions import Campaign, Coupon
 from app.db.repositories.base import BaseRepository
 from app.schemas.broadcasts import BroadcastCreate, BroadcastUpdate
-from app.schemas.enums import CampaignEventTypeEnum
+from app.schemas.enums import (
+    BroadcastStatusEnum,
+    CampaignEventTypeEnum,
+    EventNameEnum,
+)
 from app.schemas.events import (
     AuditLogCreate,
     EventCreate,
@@ -17,6 +37,29 @@ class BroadcastRepository(BaseRepository[Broadcast, BroadcastCreate, BroadcastUp
     def __init__(self):
         super().__init__(Broadcast)
 
+    def claim_for_sending(self, db: Session, *, id: int) -> Broadcast | None:
+        """Move a broadcast to sending and reset its counts in one statement.
+
+        Returns the broadcast only if it was not already sending, done or
+        canceled, so of two concurrent callers exactly one gets it.
+        """
+        return db.scalars(
+            update(self.model)
+            .where(
+                self.model.id == id,
+                self.model.status.not_in(
+                    (
+                        BroadcastStatusEnum.sending,
+                        BroadcastStatusEnum.done,
+                        BroadcastStatusEnum.canceled,
+                    )
+                ),
+            )
+            .values(status=BroadcastStatusEnum.sending, sent_count=0, fail_count=0)
+            .returning(self.model)
+            .execution_options(populate_existing=True)
+        ).first()
+
 
 class AuditLogRepository(BaseRepository[AuditLog, AuditLogCreate, AuditLogCreate]):
     def __init__(self):
@@ -32,12 +75,34 @@ class CampaignEventRepository(BaseRepository[CampaignEvent, EventCreate, EventCr
     def __init__(self):
         super().__init__(CampaignEvent)
 
+    def record_redemption(
+        self,
+        db: Session,
+        *,
+        coupon: Coupon,
+        client_id: int,
+        amount: float,
+        discount: float,
+    ) -> CampaignEvent:
+        """Add the usage record of one redemption, counted by usage limits."""
+        usage = self.model(
+            type=CampaignEventTypeEnum.redeem,
+            campaign_id=coupon.campaign_id,
+            client_id=client_id,
+            coupon_id=coupon.id,
+            amount=amount,
+            meta={"discount": discount},
+        )
+        db.add(usage)
+        return usage
+
     def get_redeem_count_for_coupon(self, db: Session, *, coupon_id: int) -> int:
         return (
             db.query(self.model)
             .filter(
                 self.model.coupon_id == coupon_id,
                 self.model.type == CampaignEventTypeEnum.redeem,
+                self.model.source_event_id.is_(None),
             )
             .count()
         )
@@ -53,10 +118,155 @@ class CampaignEventRepository(BaseRepository[CampaignEvent, EventCreate, EventCr
                 self.model.client_id == client_id,
                 Coupon.template_id == template_id,
                 self.model.type == CampaignEventTypeEnum.redeem,
+                self.model.source_event_id.is_(None),
             )
             .count()
         )
 
+    def attribute_redemptions(self, db: Session, *, since: datetime) -> int:
+        """Turn coupon redemptions since ``since`` into attributed campaign
+        redeem events, marked by ``source_event_id`` so that usage limits do
+        not count them.
+
+        Each redemption is credited to the client's latest click that falls
+        within the clicked campaign's attribution window (last-click model).
+        Redemptions already attributed are skipped by the unique
+        ``source_event_id``, so overlapping runs are harmless. Returns the
+        number of redeem events written.
+        """
+        click = aliased(self.model)
+        client_id = cast(Event.payload["client_id"].astext, BigInteger)
+        attributed = (
+            select(
+                Event.ts,
+                cast(CampaignEventTypeEnum.redeem, self.model.type.type),
+                click.campaign_id,
+                client_id,
+                Event.entity_id,
+                cast(Event.payload["amount"].astext, Numeric(12, 2)),
+                func.jsonb_build_object(
+                    "click_id",
+                    click.id,
+                    "click_ts",
+                    click.ts,
+                    "discount",
+                    Event.payload["discount"],
+                ),
+                Event.id,
+            )
+            .join(
+                click,
+                and_(
+                    click.client_id == client_id,
+                    click.type == CampaignEventTypeEnum.click,
+                    click.ts <= Event.ts,
+                ),
+            )
+            .join(Campaign, Campaign.id == click.campaign_id)
+            .where(
+                Event.name == EventNameEnum.COUPON_REDEEMED,
+                Event.ts >= since,
+                Event.ts
+                <= click.ts + func.make_interval(0, 0, 0, Campaign.attribution_window_days),
+            )
+            .distinct(Event.id)
+            .order_by(Event.id, click.ts.desc())
+        )
+        result = db.execute(
+            pg_insert(self.model)
+            .from_select(
+                [
+                    "ts",
+                    "type",
+                    "campaign_id",
+                    "client_id",
+                    "coupon_id",
+                    "amount",
+                    "meta",
+                    "source_event_id",
+                ],
+                attributed,
+            )
+            .on_conflict_do_nothing(constraint="campaign_events_source_event_id_uc")
+        )
+        return result.rowcount
+
+    def get_funnel_by_day(
+        self,
+        db: Session,
+        *,
+        campaign_ids: list[int],
+        start_date: date | None = None,
+        end_date: date | None = None,
+    ) -> list[Row]:
+        """Per campaign and day: clicks, issues, redemptions, revenue and
+        discount total, in one grouped query.
+
+        Clicks and attributed redemptions (not the usage rows written by
+        redemption itself) come from campaign_events, issues
+        from coupons; both sides are range scans on their
+        (campaign_id, time) indexes.
+        """
+        events_day = cast(self.model.ts, Date)
+        redeemed = and_(
+            self.model.type == CampaignEventTypeEnum.redeem,
+            self.model.source_event_id.is_not(None),
+        )
+        events = select(
+            self.model.campaign_id,
+            events_day.label("day"),
+            func.count().filter(self.model.type == CampaignEventTypeEnum.click).label(
+                "clicks"
+            ),
+            literal(0).label("issues"),
+            func.count().filter(redeemed).label("redemptions"),
+            func.coalesce(func.sum(self.model.amount).filter(redeemed), 0).label(
+                "revenue"
+            ),
+            func.coalesce(
+                func.sum(cast(self.model.meta["discount"].astext, Numeric)).filter(
+                    redeemed
+                ),
+                0,
+            ).label("discount"),
+        ).where(self.model.campaign_id.in_(campaign_ids))
+
+        coupons_day = cast(Coupon.created_at, Date)
+        issues = select(
+            Coupon.campaign_id,
+            coupons_day.label("day"),
+            literal(0).label("clicks"),
+            func.count().label("issues"),
+            literal(0).label("redemptions"),
+            literal(0).label("revenue"),
+            literal(0).label("discount"),
+        ).where(Coupon.campaign_id.in_(campaign_ids))
+
+        if start_date:
+            events = events.where(self.model.ts >= start_date)
+            issues = issues.where(Coupon.created_at >= start_date)
+        if end_date:
+            events = events.where(self.model.ts < end_date + timedelta(days=1))
+            issues = issues.where(Coupon.created_at < end_date + timedelta(days=1))
+
+        funnel = union_all(
+            events.group_by(self.model.campaign_id, events_day),
+            issues.group_by(Coupon.campaign_id, coupons_day),
+        ).subquery()
+        return db.execute(
+            select(
+                funnel.c.campaign_id,
+                funnel.c.day,
+                func.sum(funnel.c.clicks).label("clicks"),
+                func.sum(funnel.c.issues).label("issues"),
+                func.sum(funnel.c.redemptions).label("redemptions"),
+                func.sum(funnel.c.revenue).label("revenue"),
+                func.sum(funnel.c.discount).label("discount"),
+            )
+            .group_by(funnel.c.campaign_id, funnel.c.day)
+            .order_by(funnel.c.campaign_id, funnel.c.day)
+        ).all()
+
 
 class SubscriptionRepository(
     BaseRepository[Subscription, SubscriptionCreate, SubscriptionUpdate]
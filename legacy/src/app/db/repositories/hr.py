@@ -1,5 +1,13 @@
-from app.db.models.hr import Employee, Shift, Payroll
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import Row, and_, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.db.models.hr import Employee, Shift, Payroll, PayrollAccrual
 from app.db.repositories.base import BaseRepository
+from app.schemas.enums import ShiftStatusEnum
 from app.schemas.hr import (
     EmployeeCreate,
     EmployeeUpdate,
@@ -7,6 +15,8 @@ from app.schemas.hr import (
     ShiftUpdate,
     PayrollCreate,
     PayrollUpdate,
+    PayrollAccrualCreate,
+    PayrollAccrualUpdate,
 )
 
 
@@ -17,12 +27,183 @@ class EmployeeRepository(BaseRepository[Employee, EmployeeCreate, EmployeeUpdate
     def get_by_tg_id(self, db, *, tg_id: int) -> Employee | None:
         return db.query(self.model).filter(self.model.tg_id == tg_id).first()
 
+    def get_identities(self, db: Session) -> list[Row]:
+        """(id, tg_id, role, active) of every employee."""
+        return db.execute(
+            select(
+                self.model.id, self.model.tg_id, self.model.role, self.model.active
+            )
+        ).all()
+
 
 class ShiftRepository(BaseRepository[Shift, ShiftCreate, ShiftUpdate]):
     def __init__(self):
         super().__init__(Shift)
 
+    def get_totals_by_employee(
+        self, db: Session, *, start_date: date, end_date: date
+    ) -> list[Row]:
+        """(employee_id, hourly_rate, shifts_count, total_hours) for every
+        active employee over the period, zeros included, in one grouped query."""
+        return db.execute(
+            select(
+                Employee.id.label("employee_id"),
+                Employee.hourly_rate,
+                func.count(self.model.id).label("shifts_count"),
+                func.coalesce(func.sum(self.model.hours), 0).label("total_hours"),
+            )
+            .outerjoin(
+                self.model,
+                and_(
+                    self.model.employee_id == Employee.id,
+                    self.model.date.between(start_date, end_date),
+                ),
+            )
+            .where(Employee.active.is_(True))
+            .group_by(Employee.id)
+        ).all()
+
+    def get_for_employee(
+        self,
+        db: Session,
+        *,
+        employee_id: int | None = None,
+        tg_id: int | None = None,
+        start_date: date,
+        end_date: date,
+    ) -> list[Shift]:
+        """Shifts of one employee in a date range, ordered by date.
+
+        Served by the (employee_id, date) unique index; pass ``tg_id`` to look
+        the employee up in the same query.
+        """
+        query = select(self.model).where(self.model.date.between(start_date, end_date))
+        if tg_id is not None:
+            query = query.join(Employee, self.model.employee_id == Employee.id).where(
+                Employee.tg_id == tg_id
+            )
+        else:
+            query = query.where(self.model.employee_id == employee_id)
+        return db.scalars(query.order_by(self.model.date)).all()
+
+    def get_occupied_dates(
+        self,
+        db: Session,
+        *,
+        employee_ids: set[int],
+        start_date: date,
+        end_date: date,
+    ) -> dict[int, set[date]]:
+        """Dates already taken by a shift in the range, per employee.
+
+        One query; every existing employee among ``employee_ids`` is a key,
+        so ids missing from the result do not exist.
+        """
+        occupied: dict[int, set[date]] = {}
+        if not employee_ids:
+            return occupied
+        rows = db.execute(
+            select(Employee.id, self.model.date)
+            .outerjoin(
+                self.model,
+                and_(
+                    self.model.employee_id == Employee.id,
+                    self.model.date.between(start_date, end_date),
+                ),
+            )
+            .where(Employee.id.in_(employee_ids))
+        ).all()
+        for employee_id, shift_date in rows:
+            dates = occupied.setdefault(employee_id, set())
+            if shift_date is not None:
+                dates.add(shift_date)
+        return occupied
+
+    def get_accrual_totals(
+        self, db: Session, *, start_date: date, end_date: date
+    ) -> list[Row]:
+        """(employee_id, shifts_count, hours, approved_hours) per employee with
+        shifts in the period, computed from scratch."""
+        return db.execute(
+            select(
+                self.model.employee_id,
+                func.count(self.model.id).label("shifts_count"),
+                func.sum(self.model.hours).label("hours"),
+                func.coalesce(
+                    func.sum(self.model.hours).filter(
+                        self.model.status == ShiftStatusEnum.approved
+                    ),
+                    0,
+                ).label("approved_hours"),
+            )
+            .where(self.model.date.between(start_date, end_date))
+            .group_by(self.model.employee_id)
+        ).all()
+
 
 class PayrollRepository(BaseRepository[Payroll, PayrollCreate, PayrollUpdate]):
     def __init__(self):
         super().__init__(Payroll)
+
+
+class PayrollAccrualRepository(
+    BaseRepository[PayrollAccrual, PayrollAccrualCreate, PayrollAccrualUpdate]
+):
+    def __init__(self):
+        super().__init__(PayrollAccrual)
+
+    def apply_delta(
+        self,
+        db: Session,
+        *,
+        employee_id: int,
+        month: date,
+        shifts_count: int,
+        hours: Decimal,
+        approved_hours: Decimal,
+    ) -> None:
+        """Atomically add a delta to an employee's month, creating the row."""
+        self.apply_deltas(
+            db,
+            deltas=[
+                {
+                    "employee_id": employee_id,
+                    "month": month,
+                    "shifts_count": shifts_count,
+                    "hours": hours,
+                    "approved_hours": approved_hours,
+                }
+            ],
+        )
+
+    def apply_deltas(self, db: Session, *, deltas: list[dict]) -> None:
+        """Multi-row form of :meth:`apply_delta`; each (employee_id, month)
+        may appear only once."""
+        if not deltas:
+            return
+        stmt = pg_insert(self.model).values(deltas)
+        db.execute(
+            stmt.on_conflict_do_update(
+                constraint="payroll_accruals_employee_id_month_uc",
+                set_={
+                    "shifts_count": self.model.shifts_count + stmt.excluded.shifts_count,
+                    "hours": self.model.hours + stmt.excluded.hours,
+                    "approved_hours": self.model.approved_hours
+                    + stmt.excluded.approved_hours,
+                    "updated_at": func.now(),
+                },
+            )
+        )
+
+    def get_for_month(
+        self, db: Session, *, month: date, employee_id: int | None = None
+    ) -> list[Row]:
+        """Accrual rows of a month with each employee's current hourly rate."""
+        query = (
+            select(self.model, Employee.hourly_rate)
+            .join(Employee, self.model.employee_id == Employee.id)
+            .where(self.model.month == month)
+        )
+        if employee_id is not None:
+            query = query.where(self.model.employee_id == employee_id)
+        return db.execute(query.order_by(self.model.employee_id)).all()
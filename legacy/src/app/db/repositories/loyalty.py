@@ -1,8 +1,13 @@
 import random
 import string
+from typing import Iterable
+
+from sqlalchemy import ColumnElement, exists, func, select
 from sqlalchemy.orm import Session, joinedload
 from app.db.models.loyalty import Client, Level
+from app.db.models.promotions import Coupon
 from app.db.repositories.base import BaseRepository
+from app.schemas.enums import CouponStatusEnum
 from app.schemas.loyalty import ClientCreate, ClientUpdate, LevelCreate, LevelUpdate
 
 
@@ -21,6 +26,62 @@ class ClientRepository(BaseRepository[Client, ClientCreate, ClientUpdate]):
             .first()
         )
 
+    def get_eligible_ids(
+        self,
+        db: Session,
+        *,
+        where: ColumnElement[bool],
+        template_id: int,
+        campaign_id: int | None = None,
+    ) -> list[int]:
+        """Ids of clients matching ``where`` that do not already hold an
+        unredeemed coupon of the template (within the campaign, if given)."""
+        held = exists().where(
+            Coupon.client_id == self.model.id,
+            Coupon.template_id == template_id,
+            Coupon.campaign_id.is_not_distinct_from(campaign_id),
+            Coupon.status.in_((CouponStatusEnum.issued, CouponStatusEnum.active)),
+        )
+        return db.scalars(
+            select(self.model.id).where(where, ~held).order_by(self.model.id)
+        ).all()
+
+    def get_existing_tg_ids(self, db: Session, *, tg_ids: Iterable[int]) -> set[int]:
+        tg_ids = set(tg_ids)
+        if not tg_ids:
+            return set()
+        return set(
+            db.scalars(select(self.model.tg_id).where(self.model.tg_id.in_(tg_ids)))
+        )
+
+    def get_existing_identifiers(
+        self, db: Session, *, identifiers: Iterable[str]
+    ) -> set[str]:
+        identifiers = set(identifiers)
+        if not identifiers:
+            return set()
+        return set(
+            db.scalars(
+                select(self.model.identifier).where(
+                    self.model.identifier.in_(identifiers)
+                )
+            )
+        )
+
+    def get_identifiers_by_prefix(
+        self, db: Session, *, prefixes: Iterable[str]
+    ) -> set[str]:
+        prefixes = set(prefixes)
+        if not prefixes:
+            return set()
+        return set(
+            db.scalars(
+                select(self.model.identifier).where(
+                    func.left(self.model.identifier, 2).in_(prefixes)
+                )
+            )
+        )
+
     def create(self, db: Session, *, obj_in: ClientCreate) -> Client:
         initials = (obj_in.first_name[0] + obj_in.last_name[0]).upper()
         while True:
@@ -31,8 +92,7 @@ class ClientRepository(BaseRepository[Client, ClientCreate, ClientUpdate]):
 
         db_obj = self.model(**obj_in.model_dump(), identifier=identifier)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        db.flush()
         return db_obj
 
 
@@ -1,7 +1,16 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, and_, func, or_, select, update
+from sqlalchemy.orm import Session, aliased, joinedload
 
+from app.db.cache import hot_cache
+from app.db.models.events import CampaignEvent
+from app.db.models.loyalty import Client
 from app.db.models.promotions import Campaign, Coupon, CouponTemplate
 from app.db.repositories.base import BaseRepository
+from app.schemas.enums import (
+    CampaignEventTypeEnum,
+    CampaignStatusEnum,
+    CouponStatusEnum,
+)
 from app.schemas.promotions import (
     CampaignCreate,
     CampaignUpdate,
@@ -23,7 +32,189 @@ class CampaignRepository(BaseRepository[Campaign, CampaignCreate, CampaignUpdate
     def __init__(self):
         super().__init__(Campaign)
 
+    def get_by_ref_code(self, db: Session, *, ref_code: str) -> Campaign | None:
+        return db.scalars(select(self.model).where(self.model.ref_code == ref_code)).first()
+
+    def activate_due(self, db: Session) -> list[int]:
+        """Flip draft campaigns whose start_at has come (and whose end_at has
+        not) to active in one statement; returns their ids."""
+        now = func.now()
+        ids = db.scalars(
+            update(self.model)
+            .where(
+                self.model.status == CampaignStatusEnum.draft,
+                self.model.start_at <= now,
+                or_(self.model.end_at.is_(None), self.model.end_at > now),
+            )
+            .values(status=CampaignStatusEnum.active, updated_at=now)
+            .returning(self.model.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        hot_cache.forget_rows(
+            db, self.model, ({"id": campaign_id} for campaign_id in ids), stable=("id",)
+        )
+        return ids
+
+    def end_due(self, db: Session) -> list[int]:
+        """Flip campaigns past their end_at to ended in one statement;
+        returns their ids."""
+        now = func.now()
+        ids = db.scalars(
+            update(self.model)
+            .where(
+                self.model.status.in_(
+                    (
+                        CampaignStatusEnum.draft,
+                        CampaignStatusEnum.active,
+                        CampaignStatusEnum.paused,
+                    )
+                ),
+                self.model.end_at <= now,
+            )
+            .values(status=CampaignStatusEnum.ended, updated_at=now)
+            .returning(self.model.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        hot_cache.forget_rows(
+            db, self.model, ({"id": campaign_id} for campaign_id in ids), stable=("id",)
+        )
+        return ids
+
+    def get_active_windows(self, db: Session) -> list[Row]:
+        """(id, start_at, end_at) of every active campaign."""
+        return db.execute(
+            select(self.model.id, self.model.start_at, self.model.end_at).where(
+                self.model.status == CampaignStatusEnum.active
+            )
+        ).all()
+
+    def get_many(self, db: Session, *, ids: list[int] | None = None) -> list[Campaign]:
+        """Campaigns by id, or every campaign when ``ids`` is None."""
+        query = select(self.model).order_by(self.model.id)
+        if ids is not None:
+            query = query.where(self.model.id.in_(ids))
+        return db.scalars(query).all()
+
 
 class CouponRepository(BaseRepository[Coupon, CouponCreate, CouponUpdate]):
     def __init__(self):
         super().__init__(Coupon)
+
+    def get_by_code(self, db: Session, *, code: str) -> Coupon | None:
+        return db.scalars(select(self.model).where(self.model.code == code)).first()
+
+    def get_by_code_for_update(self, db: Session, *, code: str) -> Coupon | None:
+        return db.scalars(
+            select(self.model).where(self.model.code == code).with_for_update()
+        ).first()
+
+    def get_active_for_client(
+        self,
+        db: Session,
+        *,
+        client_id: int | None = None,
+        tg_id: int | None = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> list[Coupon]:
+        """Redeemable, unexpired coupons of a client, soonest expiry first.
+
+        The client is given by ``client_id`` or, to save the bot a lookup,
+        by Telegram ``tg_id``.
+        """
+        query = select(self.model).where(
+            self.model.status.in_((CouponStatusEnum.issued, CouponStatusEnum.active)),
+            or_(self.model.expires_at.is_(None), self.model.expires_at > func.now()),
+        )
+        if tg_id is not None:
+            query = query.join(Client, self.model.client_id == Client.id).where(
+                Client.tg_id == tg_id
+            )
+        else:
+            query = query.where(self.model.client_id == client_id)
+        return db.scalars(
+            query.order_by(self.model.expires_at.asc().nulls_last(), self.model.id)
+            .offset(skip)
+            .limit(limit)
+        ).all()
+
+    def expire_issued(self, db: Session, *, limit: int) -> list[Row]:
+        """Flip up to ``limit`` overdue issued coupons to expired.
+
+        Walks coupons_status_expires_at_idx and skips rows locked by a
+        concurrent redemption. Returns (id, code, client_id, campaign_id,
+        template_id) of the expired coupons.
+        """
+        overdue = (
+            select(self.model.id)
+            .where(
+                self.model.status == CouponStatusEnum.issued,
+                self.model.expires_at < func.now(),
+            )
+            .order_by(self.model.expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        expired = db.execute(
+            update(self.model)
+            .where(self.model.id.in_(overdue))
+            .values(status=CouponStatusEnum.expired, updated_at=func.now())
+            .returning(
+                self.model.id,
+                self.model.code,
+                self.model.client_id,
+                self.model.campaign_id,
+                self.model.template_id,
+            )
+            .execution_options(synchronize_session=False)
+        ).all()
+        hot_cache.forget_rows(
+            db, self.model, (row._asdict() for row in expired), stable=("code",)
+        )
+        return expired
+
+    def get_for_quote(
+        self, db: Session, *, client_ref: str, codes: list[str]
+    ) -> tuple[Client | None, list[Row]]:
+        """The client (with its level) and the coupons among ``codes`` in a
+        single read, without locks.
+
+        Each row is (coupon, coupon_uses, client_uses): redemptions of the
+        coupon, and of its template by this client, as counted for usage
+        limits. Unknown codes are simply absent.
+        """
+        redeemed = and_(
+            CampaignEvent.type == CampaignEventTypeEnum.redeem,
+            CampaignEvent.source_event_id.is_(None),
+        )
+        coupon_uses = (
+            select(func.count())
+            .where(CampaignEvent.coupon_id == self.model.id, redeemed)
+            .scalar_subquery()
+        )
+        used_coupon = aliased(self.model)
+        client_uses = (
+            select(func.count())
+            .select_from(CampaignEvent)
+            .join(used_coupon, CampaignEvent.coupon_id == used_coupon.id)
+            .where(
+                CampaignEvent.client_id == Client.id,
+                used_coupon.template_id == self.model.template_id,
+                redeemed,
+            )
+            .scalar_subquery()
+        )
+        rows = db.execute(
+            select(
+                Client,
+                self.model,
+                coupon_uses.label("coupon_uses"),
+                client_uses.label("client_uses"),
+            )
+            .outerjoin(self.model, self.model.code.in_(codes))
+            .options(joinedload(Client.level))
+            .where(Client.identifier == client_ref)
+        ).all()
+        if not rows:
+            return None, []
+        return rows[0][0], [row for row in rows if row[1] is not None]
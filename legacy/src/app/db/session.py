@@ -1,6 +1,45 @@
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
 import os
 
-engine = create_engine(os.getenv("DB_URL"), pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+from app.db.cache import hot_cache
+from app.db.instrumentation import instrument_engine
+
+# Objects stay usable after the single commit: server defaults are fetched
+# with RETURNING at flush time (eager_defaults), so nothing needs a refresh.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False)
+hot_cache.watch(SessionLocal)
+
+
+@lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    """The process's engine, created on first use.
+
+    Creating it lazily keeps imports free of DB_URL and the driver, and
+    gives every forked Celery worker process a pool of its own.
+    """
+    engine = create_engine(os.getenv("DB_URL"), pool_pre_ping=True)
+    instrument_engine(engine)
+    return engine
+
+
+@contextmanager
+def unit_of_work() -> Iterator[Session]:
+    """Open a session whose work is committed once, when the block exits.
+
+    Repositories only add and flush; any exception rolls the whole unit back.
+    """
+    db = SessionLocal(bind=get_engine())
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
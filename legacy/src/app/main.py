@@ -1,11 +1,58 @@
-from fastapi import FastAPI
+import os
 
+from fastapi import FastAPI, Response
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from app.api.middleware import instrument_request
 from app.api.v1.api import api_router
+from app.api.v1.endpoints.webhooks import load_bots
+from app.celery_app import celery_app, CELERY_QUEUES
+from app.core import metrics
+from app.core.tracing import setup_tracing, shutdown_tracing
+from app.db.session import get_engine
+from app.services.attribution import click_buffer
 
 app = FastAPI()
+app.middleware("http")(instrument_request)
 
 app.include_router(api_router, prefix="/api/v1")
 
+
+queue_lengths = metrics.QueueLengthCollector(celery_app.conf.broker_url, CELERY_QUEUES)
+
+
+@app.on_event("startup")
+def start_tracing():
+    setup_tracing("api")
+
+
+# The engine and the bots are built here rather than at import, so tools and
+# tests importing the app skip them and the first requests do not pay for them.
+@app.on_event("startup")
+def connect_database():
+    get_engine()
+
+
+@app.on_event("startup")
+def start_bots():
+    load_bots()
+
+
+@app.on_event("shutdown")
+def flush_click_buffer():
+    click_buffer.flush()
+
+
+@app.on_event("shutdown")
+def retire_metrics():
+    shutdown_tracing()
+    metrics.mark_process_dead(os.getpid())
+
 @app.get("/healthz")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    return Response(metrics.exposition(queue_lengths), media_type=CONTENT_TYPE_LATEST)
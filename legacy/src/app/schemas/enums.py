@@ -77,4 +77,7 @@ class SubscriptionStatusEnum(str, enum.Enum):
 class EventNameEnum(str, enum.Enum):
     COUPON_ISSUED = "coupon_issued"
     COUPON_REDEEMED = "coupon_redeemed"
+    COUPON_EXPIRED = "coupon_expired"
     PURCHASE_RECORDED = "purchase_recorded"
+    CAMPAIGN_ACTIVATED = "campaign_activated"
+    CAMPAIGN_ENDED = "campaign_ended"
@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import Optional
 
 from app.schemas.base import BaseSchema
-from app.schemas.enums import ActorTypeEnum
+from app.schemas.enums import ActorTypeEnum, SubscriptionStatusEnum
 
 
 class AuditLogBase(BaseSchema):
@@ -40,3 +40,22 @@ class EventCreate(EventBase):
 class Event(EventBase):
     id: int
     ts: datetime
+
+
+class SubscriptionBase(BaseSchema):
+    client_id: int
+    channel_id: str
+    status: SubscriptionStatusEnum = SubscriptionStatusEnum.unknown
+    checked_at: Optional[datetime] = None
+
+
+class SubscriptionCreate(SubscriptionBase):
+    pass
+
+
+class SubscriptionUpdate(SubscriptionBase):
+    pass
+
+
+class Subscription(SubscriptionBase):
+    id: int
@@ -1,7 +1,7 @@
 from typing import Optional
-from pydantic import Field
+from pydantic import ConfigDict, Field
 from app.schemas.base import BaseSchema
-from app.schemas.enums import EmployeeRoleEnum
+from app.schemas.enums import EmployeeRoleEnum, ShiftStatusEnum
 
 
 class EmployeeBase(BaseSchema):
@@ -26,6 +26,23 @@ class Employee(EmployeeBase):
     id: int
 
 
+class EmployeeIdentity(BaseSchema):
+    """What the bots need to act for an employee; frozen, so directory
+    entries can be handed out as they are."""
+
+    model_config = ConfigDict(frozen=True)
+
+    id: int
+    tg_id: int
+    role: EmployeeRoleEnum
+    active: bool
+
+
+class EmployeeDirectorySnapshot(BaseSchema):
+    version: int
+    employees: list[EmployeeIdentity] = []
+
+
 # Shift Schemas
 class ShiftBase(BaseSchema):
     employee_id: int
@@ -43,6 +60,40 @@ class ShiftUpdate(ShiftBase):
 
 class Shift(ShiftBase):
     id: int
+    status: ShiftStatusEnum = ShiftStatusEnum.planned
+
+
+class ShiftSummary(BaseSchema):
+    id: int
+    date: date
+    hours: float
+    status: ShiftStatusEnum
+
+
+# Shift schedule (rota) Schemas
+class RotaEntry(BaseSchema):
+    employee_ids: list[int] = Field(..., min_length=1)
+    start_date: date
+    end_date: date
+    hours: float = Field(..., gt=0)
+    # ISO weekdays the pattern applies to, Monday = 1.
+    weekdays: list[int] = Field(default=[1, 2, 3, 4, 5, 6, 7], min_length=1)
+
+
+class ShiftScheduleCreate(BaseSchema):
+    entries: list[RotaEntry] = Field(..., min_length=1)
+
+
+class ShiftConflict(BaseSchema):
+    employee_id: int
+    date: date
+    reason: str
+
+
+class ShiftScheduleReport(BaseSchema):
+    requested: int = 0
+    created: int = 0
+    conflicts: list[ShiftConflict] = []
 
 
 # Payroll Schemas
@@ -65,3 +116,26 @@ class PayrollUpdate(PayrollBase):
 
 class Payroll(PayrollBase):
     id: int
+
+
+# Payroll accrual Schemas
+class PayrollAccrualBase(BaseSchema):
+    employee_id: int
+    month: date
+    shifts_count: int = 0
+    hours: float = 0
+    approved_hours: float = 0
+
+
+class PayrollAccrualCreate(PayrollAccrualBase):
+    pass
+
+
+class PayrollAccrualUpdate(PayrollAccrualBase):
+    pass
+
+
+class PayrollAccrual(PayrollAccrualBase):
+    gross: float
+    taxes: float
+    net: float
@@ -6,6 +6,27 @@ from app.schemas.base import BaseSchema
 from app.schemas.enums import GenderEnum
 
 
+# Level Schemas
+class LevelBase(BaseSchema):
+    name: str
+    threshold_amount: float = Field(..., ge=0)
+    perks: dict = {}
+    order: int
+
+
+class LevelCreate(LevelBase):
+    pass
+
+
+class LevelUpdate(LevelBase):
+    pass
+
+
+class Level(LevelBase):
+    id: int
+
+
+# Client Schemas
 class ClientBase(BaseSchema):
     tg_id: Optional[int] = None
     first_name: str
@@ -33,21 +54,17 @@ class Client(ClientBase):
     level: Optional[Level] = None
 
 
-# Level Schemas
-class LevelBase(BaseSchema):
-    name: str
-    threshold_amount: float = Field(..., ge=0)
-    perks: dict = {}
-    order: int
-
-
-class LevelCreate(LevelBase):
-    pass
+# Client import Schemas
+class ClientImportError(BaseSchema):
+    line: int
+    error: str
 
 
-class LevelUpdate(LevelBase):
-    pass
-
-
-class Level(LevelBase):
-    id: int
+class ClientImportReport(BaseSchema):
+    total: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    errors: list[ClientImportError] = []
+    # Row errors left out of ``errors`` once it reached its limit.
+    errors_omitted: int = 0
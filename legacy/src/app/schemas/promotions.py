@@ -1,13 +1,44 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
-from pydantic import Field
+from pydantic import ConfigDict, Field, field_validator
 
 from app.schemas.base import BaseSchema
-from app.schemas.enums import CampaignStatusEnum, CouponStatusEnum, DiscountTypeEnum
+from app.schemas.enums import (
+    CampaignStatusEnum,
+    CouponStatusEnum,
+    DiscountTypeEnum,
+    GenderEnum,
+)
 from app.schemas.loyalty import Client
 
 
+# Coupon template rule Schemas
+class TemplateConditions(BaseSchema):
+    """Client eligibility rules stored in ``CouponTemplate.conditions``."""
+
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+    min_level: Optional[int] = Field(None, ge=0)
+    gender: Optional[GenderEnum | tuple[GenderEnum, ...]] = None
+    min_age: Optional[int] = Field(None, ge=0)
+    max_age: Optional[int] = Field(None, ge=0)
+    # Every listed tag / consent must be present on the client.
+    tags: tuple[str, ...] = ()
+    consents: tuple[str, ...] = ()
+    subscribed: Optional[bool] = None
+
+
+class StackingRules(BaseSchema):
+    """Discount stacking rules stored in ``CouponTemplate.stacking_rules``."""
+
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+    allow_sum: bool = False
+    min_level: Optional[int] = Field(None, ge=0)
+    max_total_discount_percent: Optional[float] = Field(None, ge=0, le=100)
+
+
 # CouponTemplate Schemas
 class CouponTemplateBase(BaseSchema):
     name: str
@@ -23,15 +54,60 @@ class CouponTemplateBase(BaseSchema):
 
 
 class CouponTemplateCreate(CouponTemplateBase):
+    # Rules are validated on write only, so templates stored before the
+    # rule schemas existed can still be read.
+    @field_validator("conditions")
+    @classmethod
+    def validate_conditions(cls, value: dict) -> dict:
+        TemplateConditions.model_validate(value)
+        return value
+
+    @field_validator("stacking_rules")
+    @classmethod
+    def validate_stacking_rules(cls, value: dict) -> dict:
+        StackingRules.model_validate(value)
+        return value
+
+
+class CouponTemplateUpdate(CouponTemplateCreate):
     pass
 
 
-class CouponTemplateUpdate(CouponTemplateBase):
-    pass
+class CouponTemplate(CouponTemplateBase):
+    id: int
 
 
-class CouponTemplate(CouponTemplateBase):
+class CouponTemplateSnapshot(BaseSchema):
+    """Read-only copy of a template shared by the template cache.
+
+    Frozen, with rules parsed into frozen schemas, so one instance can be
+    handed to any number of threads.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
     id: int
+    updated_at: datetime
+    name: str
+    code_pattern: str
+    discount_type: DiscountTypeEnum
+    discount_value: float
+    min_purchase: Optional[float] = None
+    per_user_limit: Optional[int] = None
+    usage_limit: Optional[int] = None
+    expiration_days: Optional[int] = None
+    stacking_rules: StackingRules
+    conditions: TemplateConditions
+
+
+class CouponTemplateCacheStats(BaseSchema):
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    hit_rate: Optional[float] = None
 
 
 # Campaign Schemas
@@ -60,6 +136,37 @@ class Campaign(CampaignBase):
     id: int
 
 
+class CampaignFunnel(BaseSchema):
+    clicks: int = 0
+    issues: int = 0
+    redemptions: int = 0
+    revenue: float = 0
+    avg_discount: Optional[float] = None
+    # Share of clicks that got a coupon, of coupons redeemed, of clicks redeemed.
+    issue_rate: Optional[float] = None
+    redemption_rate: Optional[float] = None
+    conversion_rate: Optional[float] = None
+
+
+class CampaignFunnelDay(CampaignFunnel):
+    day: date
+
+
+class CampaignReport(BaseSchema):
+    campaign_id: int
+    name: str
+    status: CampaignStatusEnum
+    totals: CampaignFunnel
+    days: list[CampaignFunnelDay] = []
+
+
+class CampaignRef(BaseSchema):
+    id: int
+    template_id: Optional[int] = None
+    status: CampaignStatusEnum
+    attribution_window_days: int
+
+
 # Coupon Schemas
 class CouponBase(BaseSchema):
     code: str
@@ -87,6 +194,23 @@ class Coupon(CouponBase):
     id: int
 
 
+class CouponSummary(BaseSchema):
+    id: int
+    code: str
+    status: CouponStatusEnum
+    expires_at: Optional[datetime] = None
+
+
+class CampaignStartRequest(BaseSchema):
+    ref: str
+    tg_id: int
+
+
+class CampaignStartResponse(BaseSchema):
+    campaign_id: int
+    coupon: Optional[CouponSummary] = None
+
+
 class CouponIssueRequest(BaseSchema):
     client_ref: str
     template_id: int
@@ -94,6 +218,18 @@ class CouponIssueRequest(BaseSchema):
     expires_at: Optional[datetime] = None
 
 
+class CouponBulkIssueRequest(BaseSchema):
+    template_id: int
+    campaign_id: Optional[int] = None
+    expires_at: Optional[datetime] = None
+
+
+class CouponBulkIssueResult(BaseSchema):
+    eligible: int = 0
+    issued: int = 0
+    failed: int = 0
+
+
 class CouponRedeemRequest(BaseSchema):
     code: str
     client_ref: str
@@ -113,3 +249,28 @@ class RedemptionResult(BaseSchema):
 class CouponRedeemResponse(BaseSchema):
     result: RedemptionResult
     client: Client
+
+
+class CheckoutQuoteRequest(BaseSchema):
+    client_ref: str
+    amount: float = Field(..., gt=0)
+    codes: list[str] = Field(..., min_length=1, max_length=10)
+
+
+class CouponQuote(BaseSchema):
+    code: str
+    applicable: bool
+    discount: Optional[float] = None
+    # Why the coupon cannot be used: an E-COUP-* code and its message.
+    error_code: Optional[str] = None
+    message: Optional[str] = None
+
+
+class CheckoutQuote(BaseSchema):
+    amount: float
+    discount: float
+    payable: float
+    # The coupon to redeem for the best price: one code, as a purchase
+    # redeems one coupon; empty when no coupon applies.
+    codes: list[str]
+    coupons: list[CouponQuote]
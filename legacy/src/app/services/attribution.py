@@ -0,0 +1,232 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.db.repositories.events import CampaignEventRepository
+from app.db.repositories.loyalty import ClientRepository
+from app.db.repositories.promotions import CampaignRepository
+from app.db.session import unit_of_work
+from app.schemas.enums import CampaignEventTypeEnum
+from app.schemas.promotions import (
+    CampaignRef,
+    CampaignStartRequest,
+    CampaignStartResponse,
+    CouponIssueRequest,
+    CouponSummary,
+)
+from app.services.campaign_index import active_campaign_index
+from app.services.coupons import CouponService
+from app.services.events import EventService
+from app.services.invalidation import InvalidationChannel
+
+logger = logging.getLogger(__name__)
+
+# Deep links from before ref codes were used carry the campaign id.
+LEGACY_REF_PREFIX = "cmp_"
+# Redis channel on which processes announce that campaign refs changed.
+REF_INVALIDATION_CHANNEL = "campaign_refs:invalidate"
+
+
+class CampaignRefCache:
+    """Per-process map of deep-link ref -> campaign snapshot with a TTL.
+
+    Unknown refs are cached too, so bursts of bad links do not reach the
+    database. A campaign write empties it once its transaction commits, in
+    this process at once and in the others through Redis; while Redis is
+    unreachable they see changes once the TTL runs out.
+    """
+
+    def __init__(
+        self,
+        campaign_repository: CampaignRepository,
+        ttl: float = 60.0,
+        redis_url: str | None = None,
+    ):
+        self.campaign_repository = campaign_repository
+        self.ttl = ttl
+        self._entries: dict[str, tuple[float, CampaignRef | None]] = {}
+        # Bumped by forget(); a lookup that overlapped one is not cached.
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._channel = InvalidationChannel(
+            REF_INVALIDATION_CHANNEL, redis_url, name="campaign-ref-cache"
+        )
+
+    def _load(self, db: Session, ref: str) -> CampaignRef | None:
+        campaign = self.campaign_repository.get_by_ref_code(db, ref_code=ref)
+        if not campaign and ref.startswith(LEGACY_REF_PREFIX):
+            campaign_id = ref[len(LEGACY_REF_PREFIX):]
+            if campaign_id.isdigit():
+                campaign = self.campaign_repository.get(db, id=int(campaign_id))
+        return CampaignRef.model_validate(campaign) if campaign else None
+
+    def get(self, db: Session, ref: str) -> CampaignRef | None:
+        self._channel.listen(lambda data: self.forget(), self.forget)
+        now = time.monotonic()
+        entry = self._entries.get(ref)
+        if entry and entry[0] > now:
+            return entry[1]
+        generation = self._generation
+        campaign = self._load(db, ref)
+        with self._lock:
+            if generation == self._generation:
+                self._entries[ref] = (now + self.ttl, campaign)
+        return campaign
+
+    def forget(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def invalidate(self, db: Session) -> None:
+        """Forget every ref now and again once ``db`` commits, at which
+        point other processes are told to forget them too."""
+        self.forget()
+
+        def announce(session: Session) -> None:
+            self.forget()
+            try:
+                self._channel.publish("*")
+            except redis.RedisError:
+                logger.exception(
+                    "Could not announce a campaign ref change; "
+                    f"other processes will see it within {self.ttl:.0f}s."
+                )
+
+        event.listen(db, "after_commit", announce, once=True)
+
+
+class ClickBuffer:
+    """Collects click rows and writes them with one multi-row INSERT.
+
+    The buffer is flushed when it reaches ``max_size`` rows, by a background
+    thread once the oldest row is ``max_age`` seconds old, and on shutdown.
+    Flushes run in their own transaction, so a failed request does not lose
+    its click and a failed flush does not fail a request.
+    """
+
+    def __init__(
+        self,
+        campaign_event_repository: CampaignEventRepository,
+        max_size: int = 500,
+        max_age: float = 2.0,
+    ):
+        self.campaign_event_repository = campaign_event_repository
+        self.max_size = max_size
+        self.max_age = max_age
+        self._rows: list[dict] = []
+        self._lock = threading.Lock()
+        self._flusher: threading.Thread | None = None
+
+    def add(self, row: dict) -> None:
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.max_size
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_periodically, name="click-buffer", daemon=True
+                )
+                self._flusher.start()
+        if full:
+            self.flush()
+
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(self.max_age)
+            self.flush()
+
+    def flush(self) -> int:
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        try:
+            with unit_of_work() as db:
+                self.campaign_event_repository.bulk_create(
+                    db, objs_in=rows, returning=False
+                )
+        except Exception:
+            logger.exception(f"Dropped {len(rows)} campaign clicks.")
+            return 0
+        return len(rows)
+
+
+campaign_ref_cache = CampaignRefCache(
+    CampaignRepository(),
+    ttl=float(os.getenv("CAMPAIGN_REF_CACHE_TTL_SECONDS", "60")),
+    redis_url=os.getenv("REDIS_URL"),
+)
+click_buffer = ClickBuffer(
+    CampaignEventRepository(),
+    max_size=int(os.getenv("CLICK_BUFFER_SIZE", "500")),
+    max_age=float(os.getenv("CLICK_BUFFER_MAX_AGE_SECONDS", "2")),
+)
+
+
+class AttributionService:
+    def __init__(
+        self,
+        campaign_event_repository: CampaignEventRepository,
+        client_repository: ClientRepository,
+        ref_cache: CampaignRefCache = campaign_ref_cache,
+        clicks: ClickBuffer = click_buffer,
+    ):
+        self.campaign_event_repository = campaign_event_repository
+        self.client_repository = client_repository
+        self.ref_cache = ref_cache
+        self.clicks = clicks
+
+    def start_campaign(
+        self,
+        db: Session,
+        *,
+        start_in: CampaignStartRequest,
+        coupon_service: CouponService,
+        event_service: EventService,
+    ) -> CampaignStartResponse | None:
+        """Handle a ``/start <ref>`` deep link: record the click and, for a
+        registered client of an active campaign, issue its coupon.
+
+        Returns None when ``ref`` is not a campaign ref.
+        """
+        campaign = self.ref_cache.get(db, start_in.ref)
+        if not campaign:
+            return None
+
+        client = self.client_repository.get_by_tg_id(db, tg_id=start_in.tg_id)
+        self.clicks.add(
+            {
+                "ts": datetime.now(timezone.utc),
+                "type": CampaignEventTypeEnum.click,
+                "campaign_id": campaign.id,
+                "client_id": client.id if client else None,
+                "meta": {"tg_id": start_in.tg_id, "ref": start_in.ref},
+            }
+        )
+
+        response = CampaignStartResponse(campaign_id=campaign.id)
+        if (
+            client
+            and campaign.template_id
+            and active_campaign_index.is_active(db, campaign.id)
+        ):
+            coupon = coupon_service.issue_coupon(
+                db,
+                issue_request=CouponIssueRequest(
+                    client_ref=client.identifier,
+                    campaign_id=campaign.id,
+                    template_id=campaign.template_id,
+                ),
+                event_service=event_service,
+            )
+            response.coupon = CouponSummary.model_validate(coupon)
+        return response
+
+    def attribute_redemptions(self, db: Session, *, since: datetime) -> int:
+        return self.campaign_event_repository.attribute_redemptions(db, since=since)
@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
 
 from app.db.models.events import Broadcast
-from app.db.repositories.broadcasts import BroadcastRepository
+from app.db.repositories.events import BroadcastRepository
 from app.schemas.broadcasts import BroadcastCreate, BroadcastUpdate
 from app.workers.broadcast import send_broadcast
 
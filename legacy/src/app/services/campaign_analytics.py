@@ -0,0 +1,134 @@
+import threading
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from sqlalchemy.orm import Session
+
+from app.db.models.promotions import Campaign
+from app.db.repositories.events import CampaignEventRepository
+from app.db.repositories.promotions import CampaignRepository
+from app.schemas.enums import CampaignStatusEnum
+from app.schemas.promotions import CampaignFunnel, CampaignFunnelDay, CampaignReport
+
+# Reports of finished campaigns kept per process.
+FINAL_REPORT_CACHE_SIZE = 256
+
+
+def _ratio(numerator, denominator) -> float | None:
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def _funnel(
+    clicks: int, issues: int, redemptions: int, revenue: Decimal, discount: Decimal
+) -> dict:
+    return {
+        "clicks": clicks,
+        "issues": issues,
+        "redemptions": redemptions,
+        "revenue": revenue,
+        "avg_discount": _ratio(discount, redemptions),
+        "issue_rate": _ratio(issues, clicks),
+        "redemption_rate": _ratio(redemptions, issues),
+        "conversion_rate": _ratio(redemptions, clicks),
+    }
+
+
+class CampaignAnalyticsService:
+    """Funnel reports (clicks -> issues -> redemptions -> revenue) per campaign.
+
+    Reports of campaigns that have ended and whose attribution window has
+    closed can no longer change, so they are cached in-process.
+    """
+
+    def __init__(
+        self,
+        campaign_repository: CampaignRepository,
+        campaign_event_repository: CampaignEventRepository,
+    ):
+        self.campaign_repository = campaign_repository
+        self.campaign_event_repository = campaign_event_repository
+        self._final_reports: dict[tuple, CampaignReport] = {}
+        self._lock = threading.Lock()
+
+    def _is_final(self, campaign: Campaign) -> bool:
+        if campaign.status != CampaignStatusEnum.ended:
+            return False
+        if campaign.end_at is None:
+            return True
+        closes_at = campaign.end_at + timedelta(days=campaign.attribution_window_days)
+        return closes_at < datetime.now(timezone.utc)
+
+    def _remember(self, key: tuple, report: CampaignReport) -> None:
+        with self._lock:
+            if len(self._final_reports) >= FINAL_REPORT_CACHE_SIZE:
+                self._final_reports.pop(next(iter(self._final_reports)))
+            self._final_reports[key] = report
+
+    def get_reports(
+        self,
+        db: Session,
+        *,
+        campaign_ids: list[int] | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+    ) -> list[CampaignReport]:
+        """Reports for the given campaigns (all when None), with per-day rows."""
+        campaigns = self.campaign_repository.get_many(db, ids=campaign_ids)
+        reports: dict[int, CampaignReport] = {}
+        pending: list[Campaign] = []
+        for campaign in campaigns:
+            cached = self._final_reports.get((campaign.id, start_date, end_date))
+            if cached:
+                reports[campaign.id] = cached
+            else:
+                pending.append(campaign)
+
+        if pending:
+            days: dict[int, list] = {campaign.id: [] for campaign in pending}
+            for row in self.campaign_event_repository.get_funnel_by_day(
+                db,
+                campaign_ids=list(days),
+                start_date=start_date,
+                end_date=end_date,
+            ):
+                days[row.campaign_id].append(row)
+
+            for campaign in pending:
+                rows = days[campaign.id]
+                report = CampaignReport(
+                    campaign_id=campaign.id,
+                    name=campaign.name,
+                    status=campaign.status,
+                    totals=CampaignFunnel(
+                        **_funnel(
+                            sum(row.clicks for row in rows),
+                            sum(row.issues for row in rows),
+                            sum(row.redemptions for row in rows),
+                            sum((row.revenue for row in rows), Decimal(0)),
+                            sum((row.discount for row in rows), Decimal(0)),
+                        )
+                    ),
+                    days=[
+                        CampaignFunnelDay(
+                            day=row.day,
+                            **_funnel(
+                                row.clicks,
+                                row.issues,
+                                row.redemptions,
+                                row.revenue,
+                                row.discount,
+                            ),
+                        )
+                        for row in rows
+                    ],
+                )
+                if self._is_final(campaign):
+                    self._remember((campaign.id, start_date, end_date), report)
+                reports[campaign.id] = report
+
+        return [reports[campaign.id] for campaign in campaigns]
+
+
+campaign_analytics_service = CampaignAnalyticsService(
+    CampaignRepository(), CampaignEventRepository()
+)
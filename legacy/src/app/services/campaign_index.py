@@ -0,0 +1,104 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.db.repositories.promotions import CampaignRepository
+from app.services.invalidation import InvalidationChannel
+
+logger = logging.getLogger(__name__)
+
+# Redis channel on which processes, the scheduler included, announce that
+# campaigns changed.
+INVALIDATION_CHANNEL = "campaigns:invalidate"
+
+
+class ActiveCampaignIndex:
+    """Per-process snapshot of active campaigns and their time windows.
+
+    Loaded with one query and reloaded after a campaign write commits, in
+    this process at once and in the others (the scheduler's transitions
+    included) through Redis, or as a fallback once it is ``ttl`` seconds
+    old. Windows are checked against the clock on every lookup, so a
+    campaign stops counting as active at its end_at even before the
+    scheduler has ended it.
+    """
+
+    def __init__(
+        self,
+        campaign_repository: CampaignRepository,
+        ttl: float = 60.0,
+        redis_url: str | None = None,
+    ):
+        self.campaign_repository = campaign_repository
+        self.ttl = ttl
+        self._windows: dict[int, tuple[datetime | None, datetime | None]] = {}
+        self._loaded_at: float | None = None
+        # Bumped by forget(); a reload that overlapped one is not trusted.
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._channel = InvalidationChannel(
+            INVALIDATION_CHANNEL, redis_url, name="active-campaign-index"
+        )
+
+    def _is_fresh(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at < self.ttl
+
+    def _ensure_loaded(self, db: Session) -> None:
+        self._channel.listen(lambda data: self.forget(), self.forget)
+        if self._is_fresh():
+            return
+        with self._lock:
+            if self._is_fresh():
+                return
+            loaded_at, generation = time.monotonic(), self._generation
+            self._windows = {
+                row.id: (row.start_at, row.end_at)
+                for row in self.campaign_repository.get_active_windows(db)
+            }
+            if generation == self._generation:
+                self._loaded_at = loaded_at
+
+    def is_active(self, db: Session, campaign_id: int) -> bool:
+        self._ensure_loaded(db)
+        window = self._windows.get(campaign_id)
+        if window is None:
+            return False
+        start_at, end_at = window
+        now = datetime.now(timezone.utc)
+        return (start_at is None or start_at <= now) and (end_at is None or now < end_at)
+
+    def forget(self) -> None:
+        """Reload on the next lookup."""
+        self._generation += 1
+        self._loaded_at = None
+
+    def invalidate(self, db: Session) -> None:
+        """Reload after a campaign write, now and again once ``db`` commits,
+        at which point other processes are told to reload too."""
+        self.forget()
+
+        def announce(session: Session) -> None:
+            self.forget()
+            try:
+                self._channel.publish("*")
+            except redis.RedisError:
+                logger.exception(
+                    "Could not announce a campaign change; "
+                    f"other processes will see it within {self.ttl:.0f}s."
+                )
+
+        event.listen(db, "after_commit", announce, once=True)
+
+
+active_campaign_index = ActiveCampaignIndex(
+    CampaignRepository(),
+    ttl=float(os.getenv("ACTIVE_CAMPAIGN_INDEX_TTL_SECONDS", "60")),
+    redis_url=os.getenv("REDIS_URL"),
+)
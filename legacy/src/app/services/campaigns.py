@@ -2,17 +2,28 @@ from sqlalchemy.orm import Session
 
 from app.db.models.promotions import Campaign
 from app.db.repositories.promotions import CampaignRepository
+from app.schemas.enums import ActorTypeEnum, EventNameEnum
+from app.schemas.events import EventCreate
 from app.schemas.promotions import CampaignCreate, CampaignUpdate
+from app.services.attribution import campaign_ref_cache
+from app.services.campaign_index import active_campaign_index
+from app.services.events import EventService
 
 
 class CampaignService:
     def __init__(self, campaign_repository: CampaignRepository):
         self.campaign_repository = campaign_repository
 
+    def _invalidate_caches(self, db: Session) -> None:
+        campaign_ref_cache.invalidate(db)
+        active_campaign_index.invalidate(db)
+
     def create_campaign(
         self, db: Session, *, campaign_in: CampaignCreate
     ) -> Campaign:
-        return self.campaign_repository.create(db, obj_in=campaign_in)
+        campaign = self.campaign_repository.create(db, obj_in=campaign_in)
+        self._invalidate_caches(db)
+        return campaign
 
     def get_campaign(self, db: Session, campaign_id: int) -> Campaign | None:
         return self.campaign_repository.get(db, id=campaign_id)
@@ -23,23 +34,62 @@ class CampaignService:
     def update_campaign(
         self, db: Session, *, campaign: Campaign, campaign_in: CampaignUpdate
     ) -> Campaign:
-        return self.campaign_repository.update(
+        campaign = self.campaign_repository.update(
             db, db_obj=campaign, obj_in=campaign_in
         )
+        self._invalidate_caches(db)
+        return campaign
 
     def remove_campaign(self, db: Session, *, campaign_id: int) -> Campaign:
-        return self.campaign_repository.remove(db, id=campaign_id)
+        campaign = self.campaign_repository.remove(db, id=campaign_id)
+        self._invalidate_caches(db)
+        return campaign
 
     def activate_campaign(self, db: Session, *, campaign: Campaign) -> Campaign:
         campaign.status = "active"
         db.add(campaign)
-        db.commit()
-        db.refresh(campaign)
+        db.flush()
+        self._invalidate_caches(db)
         return campaign
 
     def deactivate_campaign(self, db: Session, *, campaign: Campaign) -> Campaign:
         campaign.status = "paused"
         db.add(campaign)
-        db.commit()
-        db.refresh(campaign)
+        db.flush()
+        self._invalidate_caches(db)
         return campaign
+
+    def transition_due(self, db: Session, *, event_service: EventService) -> dict:
+        """Activate and end campaigns whose start_at/end_at has passed.
+
+        Two bulk UPDATEs regardless of how many campaigns change; each
+        transition is recorded as an event.
+        """
+        activated = self.campaign_repository.activate_due(db)
+        ended = self.campaign_repository.end_due(db)
+        event_service.record_events(
+            db,
+            events_in=[
+                *(
+                    EventCreate(
+                        name=EventNameEnum.CAMPAIGN_ACTIVATED,
+                        actor_type=ActorTypeEnum.bot,
+                        entity_type="campaign",
+                        entity_id=campaign_id,
+                    )
+                    for campaign_id in activated
+                ),
+                *(
+                    EventCreate(
+                        name=EventNameEnum.CAMPAIGN_ENDED,
+                        actor_type=ActorTypeEnum.bot,
+                        entity_type="campaign",
+                        entity_id=campaign_id,
+                    )
+                    for campaign_id in ended
+                ),
+            ],
+        )
+        if activated or ended:
+            self._invalidate_caches(db)
+        return {"activated": activated, "ended": ended}
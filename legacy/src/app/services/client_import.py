@@ -0,0 +1,188 @@
+import csv
+import json
+import random
+import re
+from itertools import islice
+from typing import Iterable
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.db.repositories.loyalty import ClientRepository
+from app.schemas.loyalty import ClientCreate, ClientImportError, ClientImportReport
+
+IDENTIFIER_RE = re.compile(r"^[А-ЯЁ]{2}-[0-9]{3}$")
+INITIALS_RE = re.compile(r"^[А-ЯЁ]{2}$")
+JSON_FIELDS = ("tags", "consents")
+
+
+class ClientImportService:
+    """Loads clients from CSV in chunks with set-based dedup and bulk inserts.
+
+    Each chunk costs three lookups (tg_id, identifier, identifier prefixes
+    not seen yet) and one multi-row INSERT, whatever its size.
+    """
+
+    def __init__(
+        self,
+        client_repository: ClientRepository,
+        chunk_size: int = 5000,
+        max_errors: int | None = None,
+    ):
+        self.client_repository = client_repository
+        self.chunk_size = chunk_size
+        # Row errors kept in the report; the rest are only counted.
+        self.max_errors = max_errors
+
+    def _parse_row(self, raw: dict) -> dict:
+        data = {
+            key: value.strip()
+            for key, value in raw.items()
+            if key and value is not None and value.strip() != ""
+        }
+        for field in JSON_FIELDS:
+            if field in data:
+                data[field] = json.loads(data[field])
+        return data
+
+    def _allocate_identifiers(
+        self,
+        db: Session,
+        rows: list[tuple[int, ClientCreate]],
+        taken: dict[str, set[str]],
+        seen_identifiers: set[str],
+        report: ClientImportReport,
+    ) -> list[tuple[int, ClientCreate]]:
+        allocated = []
+        needed: dict[str, list[tuple[int, ClientCreate]]] = {}
+        for line, client_in in rows:
+            if client_in.identifier:
+                allocated.append((line, client_in))
+                continue
+            initials = (client_in.first_name[0] + client_in.last_name[0]).upper()
+            if not INITIALS_RE.match(initials):
+                self._fail(report, line, "инициалы должны быть кириллическими")
+                continue
+            needed.setdefault(initials, []).append((line, client_in))
+
+        unknown = needed.keys() - taken.keys()
+        if unknown:
+            for prefix in unknown:
+                taken[prefix] = set()
+            for identifier in self.client_repository.get_identifiers_by_prefix(
+                db, prefixes=unknown
+            ):
+                taken[identifier[:2]].add(identifier)
+
+        for prefix, group in needed.items():
+            free = [
+                f"{prefix}-{number:03d}"
+                for number in range(1000)
+                if f"{prefix}-{number:03d}" not in taken[prefix]
+                and f"{prefix}-{number:03d}" not in seen_identifiers
+            ]
+            picked = random.sample(free, min(len(free), len(group)))
+            for (line, client_in), identifier in zip(group, picked):
+                seen_identifiers.add(identifier)
+                allocated.append(
+                    (line, client_in.model_copy(update={"identifier": identifier}))
+                )
+            for line, _ in group[len(picked):]:
+                self._fail(report, line, f"нет свободных идентификаторов {prefix}-XXX")
+        return allocated
+
+    def _add_error(self, report: ClientImportReport, line: int, error: str) -> None:
+        if self.max_errors is not None and len(report.errors) >= self.max_errors:
+            report.errors_omitted += 1
+            return
+        report.errors.append(ClientImportError(line=line, error=error))
+
+    def _fail(self, report: ClientImportReport, line: int, error: str) -> None:
+        report.failed += 1
+        self._add_error(report, line, error)
+
+    def _duplicate(self, report: ClientImportReport, line: int, error: str) -> None:
+        report.duplicates += 1
+        self._add_error(report, line, error)
+
+    def _import_chunk(
+        self,
+        db: Session,
+        chunk: list[tuple[int, dict]],
+        seen_tg_ids: set[int],
+        seen_identifiers: set[str],
+        taken: dict[str, set[str]],
+        report: ClientImportReport,
+    ) -> None:
+        valid: list[tuple[int, ClientCreate]] = []
+        for line, raw in chunk:
+            try:
+                client_in = ClientCreate(**self._parse_row(raw))
+            except (ValidationError, ValueError) as e:
+                self._fail(report, line, str(e).replace("\n", "; "))
+                continue
+            if client_in.identifier and not IDENTIFIER_RE.match(client_in.identifier):
+                self._fail(report, line, "неверный формат идентификатора")
+                continue
+            valid.append((line, client_in))
+
+        existing_tg_ids = self.client_repository.get_existing_tg_ids(
+            db, tg_ids=(c.tg_id for _, c in valid if c.tg_id is not None)
+        )
+        existing_identifiers = self.client_repository.get_existing_identifiers(
+            db, identifiers=(c.identifier for _, c in valid if c.identifier)
+        )
+
+        unique: list[tuple[int, ClientCreate]] = []
+        for line, client_in in valid:
+            if client_in.tg_id is not None:
+                if client_in.tg_id in existing_tg_ids or client_in.tg_id in seen_tg_ids:
+                    self._duplicate(report, line, f"tg_id {client_in.tg_id} уже существует")
+                    continue
+                seen_tg_ids.add(client_in.tg_id)
+            if client_in.identifier:
+                if (
+                    client_in.identifier in existing_identifiers
+                    or client_in.identifier in seen_identifiers
+                ):
+                    self._duplicate(
+                        report, line, f"идентификатор {client_in.identifier} уже существует"
+                    )
+                    continue
+                seen_identifiers.add(client_in.identifier)
+            unique.append((line, client_in))
+
+        rows = self._allocate_identifiers(db, unique, taken, seen_identifiers, report)
+        self.client_repository.bulk_create(
+            db,
+            objs_in=(client_in for _, client_in in rows),
+            chunk_size=self.chunk_size,
+            returning=False,
+        )
+        report.imported += len(rows)
+
+    def import_csv(self, db: Session, *, source: Iterable[str]) -> ClientImportReport:
+        """Import clients from CSV text with a header row of ClientCreate fields.
+
+        Rows already present by ``tg_id`` or ``identifier`` are skipped and
+        reported as duplicates; nothing is committed here. Line numbers in the
+        report refer to the source file, header included. Raises ValueError
+        for text that is not valid CSV, e.g. a field over the csv module's
+        size limit.
+        """
+        report = ClientImportReport()
+        reader = csv.DictReader(source)
+        numbered = ((reader.line_num, row) for row in reader)
+        seen_tg_ids: set[int] = set()
+        seen_identifiers: set[str] = set()
+        # Identifiers stored in the database, loaded once per initials prefix.
+        taken: dict[str, set[str]] = {}
+        try:
+            while chunk := list(islice(numbered, self.chunk_size)):
+                report.total += len(chunk)
+                self._import_chunk(
+                    db, chunk, seen_tg_ids, seen_identifiers, taken, report
+                )
+        except csv.Error as e:
+            raise ValueError(f"Malformed CSV after line {reader.line_num}: {e}") from e
+        return report
@@ -2,12 +2,22 @@ from sqlalchemy.orm import Session
 
 from app.db.models.promotions import CouponTemplate
 from app.db.repositories.promotions import CouponTemplateRepository
-from app.schemas.promotions import CouponTemplateCreate, CouponTemplateUpdate
+from app.schemas.promotions import (
+    CouponTemplateCacheStats,
+    CouponTemplateCreate,
+    CouponTemplateUpdate,
+)
+from app.services.template_cache import CouponTemplateCache, coupon_template_cache
 
 
 class CouponTemplateService:
-    def __init__(self, coupon_template_repository: CouponTemplateRepository):
+    def __init__(
+        self,
+        coupon_template_repository: CouponTemplateRepository,
+        template_cache: CouponTemplateCache = coupon_template_cache,
+    ):
         self.coupon_template_repository = coupon_template_repository
+        self.template_cache = template_cache
 
     def create_coupon_template(
         self, db: Session, *, coupon_template_in: CouponTemplateCreate
@@ -31,11 +41,20 @@ class CouponTemplateService:
         coupon_template: CouponTemplate,
         coupon_template_in: CouponTemplateUpdate,
     ) -> CouponTemplate:
-        return self.coupon_template_repository.update(
+        coupon_template = self.coupon_template_repository.update(
             db, db_obj=coupon_template, obj_in=coupon_template_in
         )
+        self.template_cache.invalidate(db, coupon_template.id)
+        return coupon_template
 
     def remove_coupon_template(
         self, db: Session, *, coupon_template_id: int
     ) -> CouponTemplate:
-        return self.coupon_template_repository.remove(db, id=coupon_template_id)
+        coupon_template = self.coupon_template_repository.remove(
+            db, id=coupon_template_id
+        )
+        self.template_cache.invalidate(db, coupon_template_id)
+        return coupon_template
+
+    def get_cache_stats(self) -> CouponTemplateCacheStats:
+        return self.template_cache.stats()
@@ -8,13 +8,25 @@ from app.db.repositories.promotions import CouponRepository, CouponTemplateRepos
 from app.db.repositories.loyalty import ClientRepository
 from datetime import datetime, timedelta
 
-from app.core.exceptions import CouponConditionsNotMetException
 from app.db.models.loyalty import Client
-from app.db.models.promotions import CouponTemplate
-from app.schemas.promotions import CouponCreate, CouponIssueRequest
+from app.schemas.promotions import (
+    CouponBulkIssueRequest,
+    CouponBulkIssueResult,
+    CouponCreate,
+    CouponIssueRequest,
+    CouponTemplateSnapshot,
+)
 from app.schemas.events import EventCreate
-from app.schemas.enums import ActorTypeEnum, EventNameEnum
+from app.schemas.enums import ActorTypeEnum, CouponStatusEnum, EventNameEnum
+from app.services.campaign_index import active_campaign_index
 from app.services.events import EventService
+from app.services.rules import get_template_rules
+from app.services.template_cache import CouponTemplateCache, coupon_template_cache
+
+# Coupon codes are PREFIX-NNNNN, so one prefix has this many codes.
+CODE_SPACE = 100_000
+# Rounds of fresh codes for clients whose code collided in bulk issuance.
+BULK_CODE_ATTEMPTS = 5
 
 
 class CouponService:
@@ -23,28 +35,20 @@ class CouponService:
         coupon_repository: CouponRepository,
         coupon_template_repository: CouponTemplateRepository,
         client_repository: ClientRepository,
+        template_cache: CouponTemplateCache = coupon_template_cache,
     ):
         self.coupon_repository = coupon_repository
         self.coupon_template_repository = coupon_template_repository
         self.client_repository = client_repository
+        self.template_cache = template_cache
 
-    def _validate_client_for_template(self, client: Client, template: CouponTemplate):
-        conditions = template.conditions
-        if not conditions:
-            return
-
-        if "min_level" in conditions:
-            if not client.level or client.level.order < conditions["min_level"]:
-                raise CouponConditionsNotMetException("уровень клиента слишком низкий")
-
-        if "gender" in conditions:
-            if client.gender.name != conditions["gender"]:
-                raise CouponConditionsNotMetException("пол клиента не соответствует")
-
-        # Further checks for age, tags, etc. can be added here.
+    def _validate_client_for_template(
+        self, client: Client, template: CouponTemplateSnapshot
+    ):
+        get_template_rules(template).check(client)
 
     def _calculate_expiration_date(
-        self, template: CouponTemplate, requested_date: datetime | None
+        self, template: CouponTemplateSnapshot, requested_date: datetime | None
     ) -> datetime | None:
         if requested_date:
             return requested_date
@@ -63,9 +67,7 @@ class CouponService:
     def issue_coupon(
         self, db: Session, *, issue_request: CouponIssueRequest, event_service: EventService
     ) -> Coupon:
-        template = self.coupon_template_repository.get(
-            db, id=issue_request.template_id
-        )
+        template = self.template_cache.get(db, issue_request.template_id)
         if not template:
             raise ValueError("Coupon template not found.")
 
@@ -75,6 +77,11 @@ class CouponService:
         if not client:
             raise ValueError("Client not found.")
 
+        if issue_request.campaign_id and not active_campaign_index.is_active(
+            db, issue_request.campaign_id
+        ):
+            raise ValueError("Campaign is not active.")
+
         self._validate_client_for_template(client, template)
 
         expires_at = self._calculate_expiration_date(template, issue_request.expires_at)
@@ -105,3 +112,105 @@ class CouponService:
         )
 
         return coupon
+
+    def issue_bulk(
+        self,
+        db: Session,
+        *,
+        bulk_request: CouponBulkIssueRequest,
+        event_service: EventService,
+    ) -> CouponBulkIssueResult:
+        """Issue a template's coupon to every eligible client at once.
+
+        Eligibility is the template's compiled conditions evaluated in SQL,
+        minus clients already holding an unredeemed coupon of it. Coupons go
+        out as multi-row INSERT ... ON CONFLICT (code) DO NOTHING; clients
+        whose random code collided get a fresh one in the next round.
+        """
+        template = self.template_cache.get(db, bulk_request.template_id)
+        if not template:
+            raise ValueError("Coupon template not found.")
+        if bulk_request.campaign_id and not active_campaign_index.is_active(
+            db, bulk_request.campaign_id
+        ):
+            raise ValueError("Campaign is not active.")
+
+        client_ids = self.client_repository.get_eligible_ids(
+            db,
+            where=get_template_rules(template).predicate(),
+            template_id=template.id,
+            campaign_id=bulk_request.campaign_id,
+        )
+        if len(client_ids) > CODE_SPACE:
+            raise ValueError("Too many eligible clients for one code prefix.")
+        expires_at = self._calculate_expiration_date(template, bulk_request.expires_at)
+        prefix = template.code_pattern.split("-")[0]
+
+        issued = []
+        pending = client_ids
+        for _ in range(BULK_CODE_ATTEMPTS):
+            if not pending:
+                break
+            numbers = random.sample(range(CODE_SPACE), len(pending))
+            created = self.coupon_repository.upsert(
+                db,
+                objs_in=(
+                    {
+                        "code": f"{prefix}-{number:05d}",
+                        "template_id": template.id,
+                        "client_id": client_id,
+                        "campaign_id": bulk_request.campaign_id,
+                        "status": CouponStatusEnum.issued,
+                        "expires_at": expires_at,
+                    }
+                    for client_id, number in zip(pending, numbers)
+                ),
+                index_elements=["code"],
+                update_fields=[],
+            )
+            issued.extend(created)
+            done = {coupon.client_id for coupon in created}
+            pending = [client_id for client_id in pending if client_id not in done]
+
+        event_service.record_events(
+            db,
+            events_in=(
+                EventCreate(
+                    name=EventNameEnum.COUPON_ISSUED,
+                    actor_type=ActorTypeEnum.admin,
+                    entity_type="coupon",
+                    entity_id=coupon.id,
+                    payload={
+                        "client_id": coupon.client_id,
+                        "campaign_id": coupon.campaign_id,
+                        "template_id": coupon.template_id,
+                    },
+                )
+                for coupon in issued
+            ),
+        )
+        return CouponBulkIssueResult(
+            eligible=len(client_ids), issued=len(issued), failed=len(pending)
+        )
+
+    def expire_overdue_coupons(
+        self, db: Session, *, batch_size: int, event_service: EventService
+    ) -> int:
+        expired = self.coupon_repository.expire_issued(db, limit=batch_size)
+        event_service.record_events(
+            db,
+            events_in=(
+                EventCreate(
+                    name=EventNameEnum.COUPON_EXPIRED,
+                    entity_type="coupon",
+                    entity_id=coupon.id,
+                    payload={
+                        "client_id": coupon.client_id,
+                        "campaign_id": coupon.campaign_id,
+                        "template_id": coupon.template_id,
+                    },
+                )
+                for coupon in expired
+            ),
+        )
+        return len(expired)
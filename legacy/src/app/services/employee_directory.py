@@ -0,0 +1,115 @@
+import logging
+import os
+import threading
+import time
+
+import redis
+from sqlalchemy.orm import Session
+
+from app.db.cache import hot_cache
+from app.db.models.hr import Employee
+from app.db.repositories.hr import EmployeeRepository
+from app.db.session import unit_of_work
+from app.schemas.hr import EmployeeDirectorySnapshot, EmployeeIdentity
+from app.services.invalidation import InvalidationChannel
+
+logger = logging.getLogger(__name__)
+
+# Redis channel on which processes announce that the roster changed.
+INVALIDATION_CHANNEL = "employees:invalidate"
+
+
+class EmployeeDirectory:
+    """Per-process map of Telegram ids to employee identities.
+
+    The whole roster is loaded with one query and kept until a transaction
+    that wrote employees commits, in any process that watches its sessions
+    with the hot cache (announced to the others through Redis), or, as a
+    fallback, until it is ``ttl`` seconds old. Every reload
+    bumps :attr:`version`. Lookups on a loaded directory touch neither the
+    database nor Redis, so the API and the bot handlers it runs can resolve
+    cashiers for free.
+    """
+
+    def __init__(
+        self,
+        employee_repository: EmployeeRepository,
+        ttl: float = 600.0,
+        redis_url: str | None = None,
+    ):
+        self.employee_repository = employee_repository
+        self.ttl = ttl
+        self.version = 0
+        self._by_tg_id: dict[int, EmployeeIdentity] = {}
+        self._loaded_at: float | None = None
+        # Bumped by forget(); a reload that overlapped one is not trusted.
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._channel = InvalidationChannel(
+            INVALIDATION_CHANNEL, redis_url, name="employee-directory"
+        )
+
+    def _is_fresh(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is not None and time.monotonic() - loaded_at < self.ttl
+
+    def _ensure_loaded(self, db: Session) -> None:
+        self._channel.listen(lambda data: self.forget(), self.forget)
+        if self._is_fresh():
+            return
+        with self._lock:
+            # Another thread may have reloaded while we waited.
+            if self._is_fresh():
+                return
+            loaded_at, generation = time.monotonic(), self._generation
+            self._by_tg_id = {
+                row.tg_id: EmployeeIdentity.model_validate(row)
+                for row in self.employee_repository.get_identities(db)
+            }
+            if generation == self._generation:
+                self._loaded_at = loaded_at
+            self.version += 1
+
+    def get(self, db: Session, tg_id: int) -> EmployeeIdentity | None:
+        self._ensure_loaded(db)
+        return self._by_tg_id.get(tg_id)
+
+    def resolve(self, tg_id: int) -> EmployeeIdentity | None:
+        """:meth:`get` for callers without a session, such as bot handlers;
+        only a reload opens one."""
+        if self._is_fresh():
+            return self._by_tg_id.get(tg_id)
+        with unit_of_work() as db:
+            return self.get(db, tg_id)
+
+    def snapshot(self, db: Session) -> EmployeeDirectorySnapshot:
+        self._ensure_loaded(db)
+        with self._lock:
+            return EmployeeDirectorySnapshot(
+                version=self.version, employees=list(self._by_tg_id.values())
+            )
+
+    def forget(self) -> None:
+        """Reload on the next lookup."""
+        self._generation += 1
+        self._loaded_at = None
+
+    def announce(self) -> None:
+        """Reload here and tell other processes to; called once a
+        transaction that wrote employees commits."""
+        self.forget()
+        try:
+            self._channel.publish("*")
+        except redis.RedisError:
+            logger.exception(
+                "Could not announce an employee change; "
+                f"other processes will see it within {self.ttl:.0f}s."
+            )
+
+
+employee_directory = EmployeeDirectory(
+    EmployeeRepository(),
+    ttl=float(os.getenv("EMPLOYEE_DIRECTORY_TTL_SECONDS", "600")),
+    redis_url=os.getenv("REDIS_URL"),
+)
+hot_cache.subscribe(Employee, employee_directory.announce)
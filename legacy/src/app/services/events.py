@@ -1,3 +1,5 @@
+from typing import Iterable
+
 from sqlalchemy.orm import Session
 
 from app.db.repositories.events import AuditLogRepository, EventRepository
@@ -18,3 +20,6 @@ class EventService:
 
     def record_event(self, db: Session, *, event_in: EventCreate):
         self.event_repository.create(db, obj_in=event_in)
+
+    def record_events(self, db: Session, *, events_in: Iterable[EventCreate]):
+        self.event_repository.bulk_create(db, objs_in=events_in, returning=False)
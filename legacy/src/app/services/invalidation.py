@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+from typing import Callable
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Pause before resubscribing after the Redis connection is lost.
+RESUBSCRIBE_DELAY_SECONDS = 5.0
+# Connect and send timeout. publish() runs in after_commit hooks on the
+# request path, so an unreachable Redis must fail it fast.
+REDIS_TIMEOUT_SECONDS = 0.5
+# The listener pings after this long without traffic and resubscribes when
+# twice as long passes without a reply, so a half-open connection is noticed.
+PING_INTERVAL_SECONDS = 15.0
+
+
+class InvalidationChannel:
+    """Redis pub/sub channel on which processes announce changes to data
+    they keep in memory.
+
+    :meth:`listen` starts a daemon thread, once, that passes every
+    announcement to ``on_message`` and calls ``on_resubscribe`` whenever the
+    subscription is (re)established, since anything announced while it was
+    down is lost. A connection that stops answering pings counts as down.
+    Without a Redis URL nothing is sent or received and the caches rely on
+    their TTLs.
+    """
+
+    def __init__(self, channel: str, redis_url: str | None, name: str):
+        self.channel = channel
+        self.redis_url = redis_url
+        self.name = name
+        self._redis: redis.Redis | None = None
+        self._listener: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def _get_redis(self) -> redis.Redis | None:
+        if self._redis is None and self.redis_url:
+            self._redis = redis.Redis.from_url(
+                self.redis_url,
+                socket_connect_timeout=REDIS_TIMEOUT_SECONDS,
+                socket_timeout=REDIS_TIMEOUT_SECONDS,
+            )
+        return self._redis
+
+    def publish(self, message: str) -> None:
+        """Announce ``message``; raises redis.RedisError when Redis fails."""
+        client = self._get_redis()
+        if client is not None:
+            client.publish(self.channel, message)
+
+    def listen(
+        self, on_message: Callable[[str], None], on_resubscribe: Callable[[], None]
+    ) -> None:
+        if self._listener is not None or not self.redis_url:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen,
+                    args=(on_message, on_resubscribe),
+                    name=self.name,
+                    daemon=True,
+                )
+                self._listener.start()
+
+    def _listen(
+        self, on_message: Callable[[str], None], on_resubscribe: Callable[[], None]
+    ) -> None:
+        while True:
+            pubsub = None
+            try:
+                pubsub = self._get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                on_resubscribe()
+                heard_at = time.monotonic()
+                while True:
+                    message = pubsub.get_message(timeout=PING_INTERVAL_SECONDS)
+                    silent_for = time.monotonic() - heard_at
+                    if message is not None:
+                        heard_at = time.monotonic()
+                        if message["type"] == "message":
+                            on_message(message["data"].decode())
+                    elif silent_for > 2 * PING_INTERVAL_SECONDS:
+                        raise redis.ConnectionError(
+                            f"No reply from Redis for {silent_for:.0f}s."
+                        )
+                    elif silent_for >= PING_INTERVAL_SECONDS:
+                        pubsub.ping()
+            except Exception:
+                logger.exception(f"Lost the Redis subscription to {self.channel}.")
+                if pubsub is not None:
+                    pubsub.close()
+                time.sleep(RESUBSCRIBE_DELAY_SECONDS)
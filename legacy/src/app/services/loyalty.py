@@ -18,10 +18,8 @@ class LoyaltyService:
                 break
 
         if new_level and client.level_id != new_level.id:
-            client.level_id = new_level.id
+            client.level = new_level
             db.add(client)
-            db.commit()
-            db.refresh(client)
 
         return client
 
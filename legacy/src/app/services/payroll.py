@@ -1,11 +1,34 @@
 from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
 
 from sqlalchemy import select, and_
 from sqlalchemy.orm import Session
 
 from app.db.models.hr import Employee, Shift, Payroll
-from app.db.repositories.hr import PayrollRepository, ShiftRepository
-from app.schemas.hr import PayrollCreate
+from app.db.repositories.hr import (
+    PayrollAccrualRepository,
+    PayrollRepository,
+    ShiftRepository,
+)
+from app.schemas.enums import ActorTypeEnum
+from app.schemas.events import AuditLogCreate
+from app.schemas.hr import PayrollAccrual, PayrollCreate
+from app.services.events import AuditService
+
+TAX_RATE = Decimal("0.13")  # Placeholder for tax calculation
+CENTS = Decimal("0.01")
+
+
+def month_bounds(month: date) -> tuple[date, date]:
+    start_date = month.replace(day=1)
+    end_date = (start_date + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    return start_date, end_date
+
+
+def compute_pay(total_hours, hourly_rate) -> tuple[Decimal, Decimal, Decimal]:
+    gross = (Decimal(total_hours) * Decimal(hourly_rate)).quantize(CENTS, ROUND_HALF_UP)
+    taxes = (gross * TAX_RATE).quantize(CENTS, ROUND_HALF_UP)
+    return gross, taxes, gross - taxes
 
 
 class PayrollService:
@@ -13,9 +36,11 @@ class PayrollService:
         self,
         payroll_repository: PayrollRepository,
         shift_repository: ShiftRepository,
+        payroll_accrual_repository: PayrollAccrualRepository,
     ):
         self.payroll_repository = payroll_repository
         self.shift_repository = shift_repository
+        self.payroll_accrual_repository = payroll_accrual_repository
 
     def get_all_payrolls(self, db: Session) -> list[Payroll]:
         return self.payroll_repository.get_all(db)
@@ -23,8 +48,7 @@ class PayrollService:
     def calculate_payroll(
         self, db: Session, *, employee: Employee, month: date
     ) -> Payroll:
-        start_date = month.replace(day=1)
-        end_date = (start_date + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+        start_date, end_date = month_bounds(month)
 
         shifts = db.scalars(
             select(Shift).where(
@@ -37,9 +61,7 @@ class PayrollService:
 
         shifts_count = len(shifts)
         total_hours = sum(shift.hours for shift in shifts)
-        gross = total_hours * employee.hourly_rate
-        taxes = gross * 0.13  # Placeholder for tax calculation
-        net = gross - taxes
+        gross, taxes, net = compute_pay(total_hours, employee.hourly_rate)
 
         payroll_in = PayrollCreate(
             employee_id=employee.id,
@@ -49,4 +71,152 @@ class PayrollService:
             taxes=taxes,
             net=net,
         )
-        return self.payroll_repository.create(db, obj_in=payroll_in)
+        # Recalculating a month replaces its row instead of hitting the
+        # unique constraint.
+        return self.payroll_repository.upsert(
+            db,
+            objs_in=[payroll_in],
+            constraint="payroll_employee_id_month_uc",
+            update_fields=["shifts_count", "gross", "taxes", "net"],
+        )[0]
+
+    def get_accruals(
+        self, db: Session, *, month: date, employee_id: int | None = None
+    ) -> list[PayrollAccrual]:
+        """Running totals for the month, read from the ledger without
+        touching shifts."""
+        accruals = []
+        for accrual, hourly_rate in self.payroll_accrual_repository.get_for_month(
+            db, month=month.replace(day=1), employee_id=employee_id
+        ):
+            gross, taxes, net = compute_pay(accrual.hours, hourly_rate)
+            accruals.append(
+                PayrollAccrual(
+                    employee_id=accrual.employee_id,
+                    month=accrual.month,
+                    shifts_count=accrual.shifts_count,
+                    hours=accrual.hours,
+                    approved_hours=accrual.approved_hours,
+                    gross=gross,
+                    taxes=taxes,
+                    net=net,
+                )
+            )
+        return accruals
+
+    def reconcile_accruals(self, db: Session, *, month: date) -> list[dict]:
+        """Compare the ledger with a full recompute from shifts and repair it.
+
+        Must be the first work in its transaction, which it switches to
+        REPEATABLE READ: shift totals and ledger rows are then read from one
+        snapshot, where every committed shift change already has its ledger
+        delta, so a difference is real drift. The repair is applied as a
+        delta too, so increments committed after the snapshot are kept; one
+        that touches a repaired row makes the commit fail with a
+        serialization error, and the caller should retry.
+
+        Returns the rows that had drifted, with the recomputed values.
+        """
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        start_date, end_date = month_bounds(month)
+        expected = {
+            row.employee_id: (row.shifts_count, row.hours, row.approved_hours)
+            for row in self.shift_repository.get_accrual_totals(
+                db, start_date=start_date, end_date=end_date
+            )
+        }
+        actual = {
+            accrual.employee_id: (
+                accrual.shifts_count,
+                accrual.hours,
+                accrual.approved_hours,
+            )
+            for accrual, _ in self.payroll_accrual_repository.get_for_month(
+                db, month=start_date
+            )
+        }
+
+        zero = (0, Decimal(0), Decimal(0))
+        drifted = []
+        deltas = []
+        for employee_id in expected.keys() | actual.keys():
+            totals = expected.get(employee_id, zero)
+            current = actual.get(employee_id, zero)
+            if current != totals:
+                shifts_count, hours, approved_hours = totals
+                drifted.append(
+                    {
+                        "employee_id": employee_id,
+                        "month": start_date,
+                        "shifts_count": shifts_count,
+                        "hours": hours,
+                        "approved_hours": approved_hours,
+                    }
+                )
+                deltas.append(
+                    {
+                        "employee_id": employee_id,
+                        "month": start_date,
+                        "shifts_count": shifts_count - current[0],
+                        "hours": hours - current[1],
+                        "approved_hours": approved_hours - current[2],
+                    }
+                )
+        self.payroll_accrual_repository.apply_deltas(db, deltas=deltas)
+        return drifted
+
+    def run_payroll(
+        self,
+        db: Session,
+        *,
+        month: date,
+        audit_service: AuditService,
+        actor_type: ActorTypeEnum = ActorTypeEnum.admin,
+        actor_id: int | None = None,
+    ) -> list[Payroll]:
+        """Compute the month for every active employee in one pass.
+
+        One grouped query over shifts, one upsert on
+        payroll_employee_id_month_uc and one audit entry for the whole run.
+        """
+        start_date, end_date = month_bounds(month)
+        totals = self.shift_repository.get_totals_by_employee(
+            db, start_date=start_date, end_date=end_date
+        )
+
+        rows = []
+        for total in totals:
+            gross, taxes, net = compute_pay(total.total_hours, total.hourly_rate)
+            rows.append(
+                {
+                    "employee_id": total.employee_id,
+                    "month": start_date,
+                    "shifts_count": total.shifts_count,
+                    "gross": gross,
+                    "taxes": taxes,
+                    "net": net,
+                }
+            )
+        payrolls = self.payroll_repository.upsert(
+            db,
+            objs_in=rows,
+            constraint="payroll_employee_id_month_uc",
+            update_fields=["shifts_count", "gross", "taxes", "net"],
+        )
+
+        audit_service.log_action(
+            db,
+            log_in=AuditLogCreate(
+                actor_type=actor_type,
+                actor_id=actor_id,
+                action="run_payroll",
+                entity_type="payroll",
+                payload={
+                    "month": start_date.isoformat(),
+                    "employees": len(rows),
+                    "gross_total": str(sum((row["gross"] for row in rows), Decimal(0))),
+                    "net_total": str(sum((row["net"] for row in rows), Decimal(0))),
+                },
+            ),
+        )
+        return payrolls
@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from sqlalchemy.orm import Session
 
 from app.db.repositories.loyalty import ClientRepository
@@ -26,22 +28,20 @@ class PurchaseService:
         if not client:
             raise ValueError("Client not found.")
 
-        with db.begin_nested():
-            client.total_spent += purchase_in.amount
-            db.add(client)
-
-            event_service.record_event(
-                db,
-                event_in=EventCreate(
-                    name=EventNameEnum.PURCHASE_RECORDED,
-                    actor_type=ActorTypeEnum.employee,
-                    actor_id=purchase_in.employee_id,
-                    entity_type="client",
-                    entity_id=client.id,
-                    payload={"amount": purchase_in.amount},
-                ),
-            )
-
-            self.loyalty_service.recalculate_level(db, client=client)
-
-            db.commit()
+        client.total_spent += Decimal(str(purchase_in.amount))
+        db.add(client)
+
+        event_service.record_event(
+            db,
+            event_in=EventCreate(
+                name=EventNameEnum.PURCHASE_RECORDED,
+                actor_type=ActorTypeEnum.employee,
+                actor_id=purchase_in.employee_id,
+                entity_type="client",
+                entity_id=client.id,
+                payload={"amount": purchase_in.amount},
+            ),
+        )
+
+        self.loyalty_service.recalculate_level(db, client=client)
+        db.flush()
@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Reserves the next send slot: KEYS[1] holds the time (ms, Redis clock) at
+# which the next send may start and is moved on by ARGV[1] ms per call.
+# Returns how long the caller has to wait for its slot.
+_RESERVE = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + tonumber(now[2]) / 1000
+local slot = tonumber(redis.call('GET', KEYS[1]))
+if not slot or slot < now then slot = now end
+local next_slot = slot + tonumber(ARGV[1])
+redis.call('SET', KEYS[1], string.format('%.3f', next_slot),
+           'PX', math.ceil(next_slot - now) + 1000)
+return string.format('%.3f', slot - now)
+"""
+
+# Pushes the next send slot to at least ARGV[1] ms from now.
+_HOLD = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + tonumber(now[2]) / 1000
+local until_ = now + tonumber(ARGV[1])
+local slot = tonumber(redis.call('GET', KEYS[1]))
+if not slot or slot < until_ then
+  redis.call('SET', KEYS[1], string.format('%.3f', until_),
+             'PX', math.ceil(until_ - now) + 1000)
+end
+return 1
+"""
+
+
+class SendRateLimiter:
+    """Spaces sends out so that all processes together make at most
+    ``rate`` of them per ``period`` seconds.
+
+    Every :meth:`wait` reserves the next free slot in one Redis key, which
+    moves on by ``period / rate`` per send, and sleeps until that slot. The
+    clock is Redis's own, so workers on other hosts agree on it, and sends
+    are spread evenly rather than bursting at window boundaries. Without a
+    Redis URL, or while Redis is unreachable, slots are spaced within this
+    process only.
+    """
+
+    def __init__(
+        self, key: str, rate: float, period: float = 60.0, redis_url: str | None = None
+    ):
+        self.key = key
+        self.interval = period / rate
+        self._redis = (
+            redis.Redis.from_url(redis_url, socket_timeout=0.5) if redis_url else None
+        )
+        if self._redis is not None:
+            self._reserve = self._redis.register_script(_RESERVE)
+            self._hold = self._redis.register_script(_HOLD)
+        self._next_local = 0.0
+        self._lock = threading.Lock()
+
+    def _local_delay(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_local, now)
+            self._next_local = slot + self.interval
+            return slot - now
+
+    def wait(self) -> float:
+        """Sleep until this process may send; returns the seconds slept."""
+        delay = None
+        if self._redis is not None:
+            try:
+                reserved = self._reserve(keys=[self.key], args=[self.interval * 1000])
+                delay = float(reserved) / 1000
+            except redis.RedisError as e:
+                logger.warning(f"Rate limiter {self.key} could not reach Redis: {e}")
+        if delay is None:
+            delay = self._local_delay()
+        if delay > 0:
+            time.sleep(delay)
+        return max(delay, 0.0)
+
+    def hold(self, seconds: float) -> None:
+        """Send nothing for ``seconds``, e.g. when the remote side asks to
+        retry later."""
+        if self._redis is not None:
+            try:
+                self._hold(keys=[self.key], args=[seconds * 1000])
+                return
+            except redis.RedisError as e:
+                logger.warning(f"Rate limiter {self.key} could not reach Redis: {e}")
+        with self._lock:
+            self._next_local = max(self._next_local, time.monotonic() + seconds)
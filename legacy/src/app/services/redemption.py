@@ -1,4 +1,5 @@
-from datetime import datetime
+from datetime import datetime, timezone
+from decimal import Decimal
 from typing import Optional
 
 from sqlalchemy.orm import Session
@@ -7,7 +8,7 @@ from app.core.exceptions import (
     ClientNotFoundException,
     CouponAlreadyRedeemedException,
     CouponClientMismatchException,
-    CouponConditionsNotMetException,
+    CouponException,
     CouponExpiredException,
     CouponInvalidStatusException,
     CouponMinPurchaseNotMetException,
@@ -16,7 +17,7 @@ from app.core.exceptions import (
     CouponUsageLimitExceededException,
 )
 from app.db.models.loyalty import Client
-from app.db.models.promotions import Coupon, CouponTemplate
+from app.db.models.promotions import Coupon
 from app.db.repositories.events import CampaignEventRepository
 from app.db.repositories.loyalty import ClientRepository
 from app.db.repositories.promotions import CouponRepository
@@ -24,12 +25,18 @@ from app.schemas.enums import CouponStatusEnum, DiscountTypeEnum
 from app.schemas.events import EventCreate
 from app.schemas.enums import ActorTypeEnum, EventNameEnum
 from app.schemas.promotions import (
+    CheckoutQuote,
+    CheckoutQuoteRequest,
+    CouponQuote,
     CouponRedeemRequest,
     CouponRedeemResponse,
+    CouponTemplateSnapshot,
     RedemptionResult,
 )
 from app.services.events import EventService
 from app.services.loyalty import LoyaltyService
+from app.services.rules import get_template_rules
+from app.services.template_cache import CouponTemplateCache, coupon_template_cache
 
 
 class RedemptionService:
@@ -39,11 +46,13 @@ class RedemptionService:
         client_repository: ClientRepository,
         campaign_event_repository: CampaignEventRepository,
         loyalty_service: LoyaltyService,
+        template_cache: CouponTemplateCache = coupon_template_cache,
     ):
         self.coupon_repository = coupon_repository
         self.client_repository = client_repository
         self.campaign_event_repository = campaign_event_repository
         self.loyalty_service = loyalty_service
+        self.template_cache = template_cache
 
     def _get_client(self, db: Session, client_ref: str) -> Client:
         client = self.client_repository.get_by_identifier(db, identifier=client_ref)
@@ -58,103 +67,114 @@ class RedemptionService:
         return coupon
 
     def _validate_coupon(
-        self, coupon: Coupon, client: Client, amount: float
+        self,
+        coupon: Coupon,
+        template: CouponTemplateSnapshot,
+        client: Client,
+        amount: float,
     ) -> None:
         if coupon.status == CouponStatusEnum.redeemed:
             raise CouponAlreadyRedeemedException()
-        if coupon.status not_in (CouponStatusEnum.active, CouponStatusEnum.issued):
+        if coupon.status not in (CouponStatusEnum.active, CouponStatusEnum.issued):
             raise CouponInvalidStatusException(status=coupon.status.name)
-        if coupon.expires_at and coupon.expires_at < datetime.utcnow():
+        if coupon.expires_at and coupon.expires_at < datetime.now(timezone.utc):
             raise CouponExpiredException()
         if coupon.client_id and coupon.client_id != client.id:
             raise CouponClientMismatchException()
 
-        template = coupon.template
         if template.min_purchase and amount < template.min_purchase:
             raise CouponMinPurchaseNotMetException(
                 min_purchase=template.min_purchase, amount=amount
             )
 
-        # Basic condition check (can be expanded)
-        if "min_level" in template.conditions:
-            if not client.level or client.level.order < template.conditions["min_level"]:
-                raise CouponConditionsNotMetException("уровень клиента слишком низкий")
+        get_template_rules(template).check(client)
 
-    def _check_usage_limits(self, db: Session, coupon: Coupon, client: Client) -> None:
-        template = coupon.template
-        if not template.usage_limit and not template.per_user_limit:
-            return
+    def _check_usage_counts(
+        self, template: CouponTemplateSnapshot, *, total_usages: int, user_usages: int
+    ) -> None:
+        if template.usage_limit and total_usages >= template.usage_limit:
+            raise CouponUsageLimitExceededException()
+        if template.per_user_limit and user_usages >= template.per_user_limit:
+            raise CouponPerUserLimitExceededException()
 
+    def _check_usage_limits(
+        self,
+        db: Session,
+        coupon: Coupon,
+        template: CouponTemplateSnapshot,
+        client: Client,
+    ) -> None:
+        total_usages = user_usages = 0
         if template.usage_limit:
-            total_usages = (
-                self.campaign_event_repository.get_redeem_count_for_coupon(
-                    db, coupon_id=coupon.id
-                )
+            total_usages = self.campaign_event_repository.get_redeem_count_for_coupon(
+                db, coupon_id=coupon.id
             )
-            if total_usages >= template.usage_limit:
-                raise CouponUsageLimitExceededException()
-
         if template.per_user_limit:
             user_usages = (
                 self.campaign_event_repository.get_redeem_count_for_client_and_template(
                     db, client_id=client.id, template_id=coupon.template_id
                 )
             )
-            if user_usages >= template.per_user_limit:
-                raise CouponPerUserLimitExceededException()
+        self._check_usage_counts(
+            template, total_usages=total_usages, user_usages=user_usages
+        )
 
-    def _calculate_discount(self, template: CouponTemplate, amount: float) -> float:
+    def _calculate_discount(
+        self, template: CouponTemplateSnapshot, amount: float
+    ) -> float:
         if template.discount_type == DiscountTypeEnum.percent:
             return round(amount * template.discount_value / 100, 2)
         if template.discount_type == DiscountTypeEnum.fixed:
             return min(template.discount_value, amount)
         return 0.0
 
+    def _level_discount(self, client: Client, amount: float) -> float:
+        perks = client.level.perks if client.level else None
+        percent = perks.get("percent_discount") if perks else None
+        return round(amount * percent / 100, 2) if percent else 0.0
+
+    def _can_stack(self, client: Client, template: CouponTemplateSnapshot) -> bool:
+        rules = get_template_rules(template).stacking
+        if not rules.allow_sum:
+            return False
+        min_level_required = rules.min_level
+        return not min_level_required or (
+            client.level is not None and client.level.order >= min_level_required
+        )
+
     def _apply_stacking_rules(
         self,
         coupon_discount: float,
         client: Client,
-        template: CouponTemplate,
+        template: CouponTemplateSnapshot,
         amount: float,
     ) -> float:
-        # Currently, only coupon discount is supported.
-        # Level-based discounts are not yet in perks.
-        # This is a placeholder for future stacking logic.
-        total_discount = coupon_discount
-
-        rules = template.stacking_rules
-        if not rules.get("allow_sum", False):
-            return total_discount
-
-        min_level_required = rules.get("min_level")
-        if min_level_required and (not client.level or client.level.order < min_level_required):
-            return total_discount
-
-        # Placeholder for level perks discount
-        level_discount = 0.0
-        # if client.level and "percent_discount" in client.level.perks:
-        #    level_discount = round(amount * client.level.perks["percent_discount"] / 100, 2)
-
-        total_discount += level_discount
-
-        max_discount_percent = rules.get("max_total_discount_percent")
+        """The discount of redeeming one coupon: its own discount plus, when
+        the coupon allows summing, the level perk, capped by the coupon's
+        max_total_discount_percent. Never more than the amount."""
+        if not self._can_stack(client, template):
+            return min(coupon_discount, amount)
+
+        total_discount = coupon_discount + self._level_discount(client, amount)
+        max_discount_percent = get_template_rules(
+            template
+        ).stacking.max_total_discount_percent
         if max_discount_percent:
             max_discount_value = round(amount * max_discount_percent / 100, 2)
             total_discount = min(total_discount, max_discount_value)
-
-        return total_discount
+        return min(total_discount, amount)
 
     def _redeem_one_time_coupon(
         self, db: Session, coupon: Coupon, request: CouponRedeemRequest
     ) -> None:
         coupon.status = CouponStatusEnum.redeemed
-        coupon.redeemed_at = datetime.utcnow()
+        coupon.redeemed_at = datetime.now(timezone.utc)
         coupon.redeemed_by_employee_id = request.employee_id
         coupon.redemption_amount = request.amount
         db.add(coupon)
 
     def _touch_multi_use_coupon(self, db: Session, coupon: Coupon) -> None:
-        coupon.redeemed_at = datetime.utcnow()  # Mark last usage time
+        coupon.redeemed_at = datetime.now(timezone.utc)  # Mark last usage time
         db.add(coupon)
 
     def redeem_coupon(
@@ -166,49 +186,56 @@ class RedemptionService:
     ) -> CouponRedeemResponse:
         client = self._get_client(db, client_ref=redeem_request.client_ref)
 
-        with db.begin_nested():
-            coupon = self._get_coupon_for_update(db, code=redeem_request.code)
-            self._validate_coupon(coupon, client, redeem_request.amount)
-            self._check_usage_limits(db, coupon, client)
+        coupon = self._get_coupon_for_update(db, code=redeem_request.code)
+        template = self.template_cache.get(db, coupon.template_id)
+        self._validate_coupon(coupon, template, client, redeem_request.amount)
+        self._check_usage_limits(db, coupon, template, client)
 
-            coupon_discount = self._calculate_discount(coupon.template, redeem_request.amount)
-            discount = self._apply_stacking_rules(
-                coupon_discount, client, coupon.template, redeem_request.amount
-            )
-            payable = max(redeem_request.amount - discount, 0)
-
-            # Record redemption event
-            event_service.record_event(
-                db,
-                event_in=EventCreate(
-                    name=EventNameEnum.COUPON_REDEEMED,
-                    actor_type=ActorTypeEnum.employee,
-                    actor_id=redeem_request.employee_id,
-                    entity_type="coupon",
-                    entity_id=coupon.id,
-                    payload={
-                        "client_id": client.id,
-                        "amount": redeem_request.amount,
-                        "discount": discount,
-                    },
-                ),
-            )
+        coupon_discount = self._calculate_discount(template, redeem_request.amount)
+        discount = self._apply_stacking_rules(
+            coupon_discount, client, template, redeem_request.amount
+        )
+        payable = max(redeem_request.amount - discount, 0)
+
+        # Record redemption event
+        event_service.record_event(
+            db,
+            event_in=EventCreate(
+                name=EventNameEnum.COUPON_REDEEMED,
+                actor_type=ActorTypeEnum.employee,
+                actor_id=redeem_request.employee_id,
+                entity_type="coupon",
+                entity_id=coupon.id,
+                payload={
+                    "client_id": client.id,
+                    "amount": redeem_request.amount,
+                    "discount": discount,
+                },
+            ),
+        )
+
+        self.campaign_event_repository.record_redemption(
+            db,
+            coupon=coupon,
+            client_id=client.id,
+            amount=redeem_request.amount,
+            discount=discount,
+        )
 
-            # Update coupon status
-            is_one_time = not coupon.template.usage_limit
-            if is_one_time:
-                self._redeem_one_time_coupon(db, coupon, redeem_request)
-            else:
-                self._touch_multi_use_coupon(db, coupon)
+        # Update coupon status
+        is_one_time = not template.usage_limit
+        if is_one_time:
+            self._redeem_one_time_coupon(db, coupon, redeem_request)
+        else:
+            self._touch_multi_use_coupon(db, coupon)
 
-            # Update client's total spent and recalculate level
-            client.total_spent += redeem_request.amount
-            db.add(client)
-            self.loyalty_service.recalculate_level(db, client=client)
+        # Update client's total spent and recalculate level
+        client.total_spent += Decimal(str(redeem_request.amount))
+        db.add(client)
+        self.loyalty_service.recalculate_level(db, client=client)
 
-            db.commit()
+        db.flush()
 
-        db.refresh(client)
         return CouponRedeemResponse(
             result=RedemptionResult(
                 code=coupon.code,
@@ -221,6 +248,62 @@ class RedemptionService:
             client=client,
         )
 
+    def quote(
+        self, db: Session, *, quote_request: CheckoutQuoteRequest
+    ) -> CheckoutQuote:
+        """Price a purchase against one or more coupons without redeeming.
+
+        Runs the same checks and discount rules as :meth:`redeem_coupon` on
+        one unlocked read of the client and coupons plus cached templates,
+        and writes nothing. Each coupon is priced as redeeming it alone
+        would be, since a purchase redeems one coupon; the one with the
+        largest discount is recommended, the first listed on a tie.
+        """
+        amount = quote_request.amount
+        codes = list(dict.fromkeys(quote_request.codes))
+        client, rows = self.coupon_repository.get_for_quote(
+            db, client_ref=quote_request.client_ref, codes=codes
+        )
+        if not client:
+            raise ClientNotFoundException(client_ref=quote_request.client_ref)
+        found = {row[1].code: row for row in rows}
+
+        coupons: list[CouponQuote] = []
+        best_codes: list[str] = []
+        best_discount = 0.0
+        for code in codes:
+            try:
+                if code not in found:
+                    raise CouponNotFoundException(code_or_id=code)
+                _, coupon, coupon_uses, client_uses = found[code]
+                template = self.template_cache.get(db, coupon.template_id)
+                self._validate_coupon(coupon, template, client, amount)
+                self._check_usage_counts(
+                    template, total_usages=coupon_uses, user_usages=client_uses
+                )
+            except CouponException as e:
+                coupons.append(
+                    CouponQuote(
+                        code=code, applicable=False, error_code=e.code, message=e.message
+                    )
+                )
+                continue
+            discount = self._apply_stacking_rules(
+                self._calculate_discount(template, amount), client, template, amount
+            )
+            coupons.append(CouponQuote(code=code, applicable=True, discount=discount))
+            if discount > best_discount:
+                best_discount = discount
+                best_codes = [code]
+
+        return CheckoutQuote(
+            amount=amount,
+            discount=best_discount,
+            payable=max(amount - best_discount, 0),
+            codes=best_codes,
+            coupons=coupons,
+        )
+
     def record_purchase_without_coupon(
         self,
         db: Session,
@@ -231,7 +314,7 @@ class RedemptionService:
         event_service: EventService,
     ) -> Client:
         client = self._get_client(db, client_ref=client_ref)
-        client.total_spent += amount
+        client.total_spent += Decimal(str(amount))
         self.loyalty_service.recalculate_level(db, client=client)
         db.add(client)
 
@@ -247,6 +330,5 @@ class RedemptionService:
             ),
         )
 
-        db.commit()
-        db.refresh(client)
+        db.flush()
         return client
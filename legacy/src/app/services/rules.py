@@ -0,0 +1,170 @@
+import threading
+from datetime import date, datetime
+from typing import Callable
+
+from pydantic import ValidationError
+from sqlalchemy import ColumnElement, and_, select, true
+from sqlalchemy.dialects.postgresql import array
+
+from app.core.exceptions import CouponConditionsNotMetException
+from app.db.models.loyalty import Client, Level
+from app.db.models.promotions import CouponTemplate
+from app.schemas.enums import GenderEnum
+from app.schemas.promotions import (
+    CouponTemplateSnapshot,
+    StackingRules,
+    TemplateConditions,
+)
+
+# Compiled templates kept per process; keys change whenever a template does.
+COMPILED_RULES_CACHE_SIZE = 1024
+
+Check = Callable[[Client, date], bool]
+
+
+def years_before(day: date, years: int) -> date:
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:  # 29 February
+        return day.replace(year=day.year - years, day=28)
+
+
+class CompiledRules:
+    """A template's conditions and stacking rules, parsed and validated once.
+
+    The same rules are available as a Python check for a loaded client
+    (issuance, redemption) and as a SQL predicate over ``clients`` (bulk
+    issuance), with identical semantics.
+    """
+
+    def __init__(self, conditions: TemplateConditions, stacking: StackingRules):
+        self.conditions = conditions
+        self.stacking = stacking
+        genders = conditions.gender
+        if isinstance(genders, GenderEnum):
+            genders = [genders]
+        self._genders = set(genders) if genders else None
+        self._checks = self._compile_checks()
+
+    def _compile_checks(self) -> list[tuple[Check, str]]:
+        c = self.conditions
+        checks: list[tuple[Check, str]] = []
+        if c.min_level is not None:
+            checks.append(
+                (
+                    lambda client, today: client.level is not None
+                    and client.level.order >= c.min_level,
+                    "уровень клиента слишком низкий",
+                )
+            )
+        if self._genders:
+            checks.append(
+                (
+                    lambda client, today: client.gender in self._genders,
+                    "пол клиента не соответствует",
+                )
+            )
+        if c.min_age is not None:
+            checks.append(
+                (
+                    lambda client, today: client.birth_date is not None
+                    and client.birth_date <= years_before(today, c.min_age),
+                    "клиент слишком молод",
+                )
+            )
+        if c.max_age is not None:
+            checks.append(
+                (
+                    lambda client, today: client.birth_date is not None
+                    and client.birth_date > years_before(today, c.max_age + 1),
+                    "клиент старше допустимого возраста",
+                )
+            )
+        if c.tags:
+            checks.append(
+                (
+                    lambda client, today: all(
+                        tag in (client.tags or {}) for tag in c.tags
+                    ),
+                    "у клиента нет нужных тегов",
+                )
+            )
+        if c.consents:
+            checks.append(
+                (
+                    lambda client, today: all(
+                        (client.consents or {}).get(consent) is True
+                        for consent in c.consents
+                    ),
+                    "нет согласия клиента",
+                )
+            )
+        if c.subscribed is not None:
+            checks.append(
+                (
+                    lambda client, today: client.is_subscribed == c.subscribed,
+                    "статус подписки не соответствует",
+                )
+            )
+        return checks
+
+    def check(self, client: Client, *, today: date | None = None) -> None:
+        """Raise CouponConditionsNotMetException on the first unmet condition."""
+        today = today or date.today()
+        for passes, reason in self._checks:
+            if not passes(client, today):
+                raise CouponConditionsNotMetException(reason)
+
+    def predicate(self, *, today: date | None = None) -> ColumnElement[bool]:
+        """The conditions as a WHERE clause over Client."""
+        today = today or date.today()
+        c = self.conditions
+        clauses = []
+        if c.min_level is not None:
+            clauses.append(
+                Client.level_id.in_(select(Level.id).where(Level.order >= c.min_level))
+            )
+        if self._genders:
+            clauses.append(Client.gender.in_(self._genders))
+        if c.min_age is not None:
+            clauses.append(Client.birth_date <= years_before(today, c.min_age))
+        if c.max_age is not None:
+            clauses.append(Client.birth_date > years_before(today, c.max_age + 1))
+        if c.tags:
+            clauses.append(Client.tags.has_all(array(c.tags)))
+        if c.consents:
+            clauses.append(
+                Client.consents.contains({consent: True for consent in c.consents})
+            )
+        if c.subscribed is not None:
+            clauses.append(Client.is_subscribed.is_(c.subscribed))
+        return and_(*clauses) if clauses else true()
+
+
+def compile_rules(conditions: dict, stacking_rules: dict) -> CompiledRules:
+    try:
+        return CompiledRules(
+            TemplateConditions.model_validate(conditions or {}),
+            StackingRules.model_validate(stacking_rules or {}),
+        )
+    except ValidationError as e:
+        raise ValueError(f"Invalid coupon template rules: {e}") from e
+
+
+_compiled: dict[tuple[int, datetime], CompiledRules] = {}
+_compiled_lock = threading.Lock()
+
+
+def get_template_rules(
+    template: CouponTemplate | CouponTemplateSnapshot,
+) -> CompiledRules:
+    """Compiled rules of a template, cached by (id, updated_at)."""
+    key = (template.id, template.updated_at)
+    rules = _compiled.get(key)
+    if rules is None:
+        rules = compile_rules(template.conditions, template.stacking_rules)
+        with _compiled_lock:
+            if len(_compiled) >= COMPILED_RULES_CACHE_SIZE:
+                _compiled.pop(next(iter(_compiled)))
+            _compiled[key] = rules
+    return rules
@@ -43,3 +43,15 @@ class SegmentationService:
 
         query = select(Client.id).where(self._build_query(audience_filter))
         return db.scalars(query).all()
+
+    def get_chat_ids(self, db: Session, *, audience_filter: dict) -> list[int]:
+        """Telegram chat ids of the matching clients that have one."""
+        if not audience_filter:
+            return []
+
+        query = (
+            select(Client.tg_id)
+            .where(self._build_query(audience_filter), Client.tg_id.is_not(None))
+            .order_by(Client.id)
+        )
+        return db.scalars(query).all()
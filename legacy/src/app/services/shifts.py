@@ -1,19 +1,159 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
 from sqlalchemy.orm import Session
 
 from app.db.models.hr import Shift
-from app.db.repositories.hr import ShiftRepository
-from app.schemas.hr import ShiftCreate, ShiftUpdate
+from app.db.repositories.hr import PayrollAccrualRepository, ShiftRepository
+from app.schemas.enums import ShiftStatusEnum
+from app.schemas.hr import (
+    ShiftConflict,
+    ShiftCreate,
+    ShiftScheduleCreate,
+    ShiftScheduleReport,
+    ShiftUpdate,
+)
+
+# Upper bound on shifts expanded from one rota request.
+MAX_SCHEDULE_SHIFTS = 10000
 
 
 class ShiftService:
-    def __init__(self, shift_repository: ShiftRepository):
+    def __init__(
+        self,
+        shift_repository: ShiftRepository,
+        payroll_accrual_repository: PayrollAccrualRepository,
+    ):
         self.shift_repository = shift_repository
+        self.payroll_accrual_repository = payroll_accrual_repository
+
+    def _accrue(self, db: Session, shift: Shift, sign: int) -> None:
+        # Every write goes through here twice (out with the old state, in with
+        # the new), so the ledger follows employee, date, hours and status.
+        hours = sign * shift.hours
+        self.payroll_accrual_repository.apply_delta(
+            db,
+            employee_id=shift.employee_id,
+            month=shift.date.replace(day=1),
+            shifts_count=sign,
+            hours=hours,
+            approved_hours=hours if shift.status == ShiftStatusEnum.approved else 0,
+        )
 
     def create_shift(self, db: Session, *, shift_in: ShiftCreate) -> Shift:
-        return self.shift_repository.create(db, obj_in=shift_in)
+        shift = self.shift_repository.create(db, obj_in=shift_in)
+        self._accrue(db, shift, 1)
+        return shift
+
+    def _expand_rota(
+        self, schedule_in: ShiftScheduleCreate, report: ShiftScheduleReport
+    ) -> dict[tuple[int, date], float]:
+        planned: dict[tuple[int, date], float] = {}
+        for entry in schedule_in.entries:
+            if entry.end_date < entry.start_date:
+                raise ValueError("Rota entry ends before it starts.")
+            if any(day < 1 or day > 7 for day in entry.weekdays):
+                raise ValueError("Weekdays must be between 1 and 7.")
+            weekdays = set(entry.weekdays)
+            day = entry.start_date
+            while day <= entry.end_date:
+                if day.isoweekday() in weekdays:
+                    for employee_id in entry.employee_ids:
+                        report.requested += 1
+                        if report.requested > MAX_SCHEDULE_SHIFTS:
+                            raise ValueError(
+                                f"Rota expands to more than {MAX_SCHEDULE_SHIFTS} shifts."
+                            )
+                        if (employee_id, day) in planned:
+                            report.conflicts.append(
+                                ShiftConflict(
+                                    employee_id=employee_id,
+                                    date=day,
+                                    reason="duplicate in request",
+                                )
+                            )
+                            continue
+                        planned[(employee_id, day)] = entry.hours
+                day += timedelta(days=1)
+        return planned
+
+    def schedule_shifts(
+        self, db: Session, *, schedule_in: ShiftScheduleCreate
+    ) -> ShiftScheduleReport:
+        """Create every shift of a rota that does not clash with an existing one.
 
-    def get_shift(self, db: Session, shift_id: int) -> Shift | None:
-        return self.shift_repository.get(db, id=shift_id)
+        Conflicts are found with a single lookup over the whole date range and
+        the remaining shifts go out as one multi-row INSERT; rows taken by a
+        concurrent writer in between are reported as conflicts as well.
+        """
+        report = ShiftScheduleReport()
+        planned = self._expand_rota(schedule_in, report)
+        if not planned:
+            return report
+
+        dates = [day for _, day in planned]
+        occupied = self.shift_repository.get_occupied_dates(
+            db,
+            employee_ids={employee_id for employee_id, _ in planned},
+            start_date=min(dates),
+            end_date=max(dates),
+        )
+        rows = []
+        for (employee_id, day), hours in planned.items():
+            if employee_id not in occupied:
+                reason = "employee not found"
+            elif day in occupied[employee_id]:
+                reason = "shift already exists"
+            else:
+                rows.append({"employee_id": employee_id, "date": day, "hours": hours})
+                continue
+            report.conflicts.append(
+                ShiftConflict(employee_id=employee_id, date=day, reason=reason)
+            )
+
+        created = self.shift_repository.upsert(
+            db,
+            objs_in=rows,
+            constraint="shifts_employee_id_date_uc",
+            update_fields=[],
+        )
+        report.created = len(created)
+        if len(created) < len(rows):
+            inserted = {(shift.employee_id, shift.date) for shift in created}
+            report.conflicts.extend(
+                ShiftConflict(
+                    employee_id=row["employee_id"],
+                    date=row["date"],
+                    reason="shift already exists",
+                )
+                for row in rows
+                if (row["employee_id"], row["date"]) not in inserted
+            )
+
+        deltas: dict[tuple[int, date], dict] = {}
+        for shift in created:
+            month = shift.date.replace(day=1)
+            delta = deltas.setdefault(
+                (shift.employee_id, month),
+                {
+                    "employee_id": shift.employee_id,
+                    "month": month,
+                    "shifts_count": 0,
+                    "hours": Decimal(0),
+                    "approved_hours": Decimal(0),
+                },
+            )
+            delta["shifts_count"] += 1
+            delta["hours"] += Decimal(shift.hours)
+        self.payroll_accrual_repository.apply_deltas(db, deltas=list(deltas.values()))
+        return report
+
+    def get_shift(
+        self, db: Session, shift_id: int, *, for_update: bool = False
+    ) -> Shift | None:
+        """Pass ``for_update`` to lock a shift before updating or approving
+        it, so concurrent changes do not subtract the same old hours twice."""
+        return self.shift_repository.get(db, id=shift_id, for_update=for_update)
 
     def get_all_shifts(self, db: Session) -> list[Shift]:
         return self.shift_repository.get_all(db)
@@ -21,7 +161,26 @@ class ShiftService:
     def update_shift(
         self, db: Session, *, shift: Shift, shift_in: ShiftUpdate
     ) -> Shift:
-        return self.shift_repository.update(db, db_obj=shift, obj_in=shift_in)
+        self._accrue(db, shift, -1)
+        shift = self.shift_repository.update(db, db_obj=shift, obj_in=shift_in)
+        self._accrue(db, shift, 1)
+        return shift
+
+    def approve_shift(self, db: Session, *, shift: Shift) -> Shift:
+        if shift.status == ShiftStatusEnum.approved:
+            return shift
+        self._accrue(db, shift, -1)
+        shift.status = ShiftStatusEnum.approved
+        db.add(shift)
+        db.flush()
+        self._accrue(db, shift, 1)
+        return shift
 
-    def remove_shift(self, db: Session, *, shift_id: int) -> Shift:
+    def remove_shift(self, db: Session, *, shift_id: int) -> Shift | None:
+        """Delete a shift; None if it no longer exists, e.g. removed by a
+        concurrent request."""
+        shift = self.shift_repository.get(db, id=shift_id, for_update=True)
+        if not shift:
+            return None
+        self._accrue(db, shift, -1)
         return self.shift_repository.remove(db, id=shift_id)
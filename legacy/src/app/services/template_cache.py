@@ -0,0 +1,143 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+from pydantic import ValidationError
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.db.repositories.promotions import CouponTemplateRepository
+from app.schemas.promotions import CouponTemplateCacheStats, CouponTemplateSnapshot
+from app.services.invalidation import InvalidationChannel
+
+logger = logging.getLogger(__name__)
+
+# Redis channel on which processes announce changed templates; the message
+# is a template id, or "*" for all of them.
+INVALIDATION_CHANNEL = "coupon_templates:invalidate"
+ALL_TEMPLATES = "*"
+
+
+class CouponTemplateCache:
+    """Per-process read-through LRU of coupon template snapshots with a TTL.
+
+    Writes invalidate the entry in this process at once and, after their
+    transaction commits, in every other process through a Redis channel.
+    Processes listen on the channel from their first lookup on; while Redis
+    is unreachable they fall back to the TTL and drop everything on
+    reconnect, since announcements may have been missed.
+    """
+
+    def __init__(
+        self,
+        coupon_template_repository: CouponTemplateRepository,
+        max_size: int = 256,
+        ttl: float = 300.0,
+        redis_url: str | None = None,
+    ):
+        self.coupon_template_repository = coupon_template_repository
+        self.max_size = max_size
+        self.ttl = ttl
+        self._channel = InvalidationChannel(
+            INVALIDATION_CHANNEL, redis_url, name="coupon-template-cache"
+        )
+        self._entries: OrderedDict[int, tuple[float, CouponTemplateSnapshot]] = (
+            OrderedDict()
+        )
+        # Bumped by _forget(); a load that overlapped one is not stored.
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, db: Session, template_id: int) -> CouponTemplateSnapshot | None:
+        self._channel.listen(self._on_announcement, lambda: self._forget(None))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(template_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(template_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        template = self.coupon_template_repository.get(db, id=template_id)
+        if not template:
+            return None
+        try:
+            snapshot = CouponTemplateSnapshot.model_validate(template)
+        except ValidationError as e:
+            raise ValueError(f"Invalid coupon template rules: {e}") from e
+
+        with self._lock:
+            if generation != self._generation:
+                return snapshot
+            self._entries[template_id] = (now + self.ttl, snapshot)
+            self._entries.move_to_end(template_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return snapshot
+
+    def invalidate(self, db: Session, template_id: int | None = None) -> None:
+        """Forget a template (all when None) now and again once ``db``
+        commits, at which point other processes are told to forget it too.
+
+        The second local drop covers snapshots of the old row that other
+        threads loaded between the flush and the commit.
+        """
+        self._forget(template_id)
+        self.invalidations += 1
+
+        def announce(session: Session) -> None:
+            self._forget(template_id)
+            self._publish(template_id)
+
+        event.listen(db, "after_commit", announce, once=True)
+
+    def stats(self) -> CouponTemplateCacheStats:
+        lookups = self.hits + self.misses
+        return CouponTemplateCacheStats(
+            size=len(self._entries),
+            max_size=self.max_size,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            invalidations=self.invalidations,
+            hit_rate=round(self.hits / lookups, 4) if lookups else None,
+        )
+
+    def _forget(self, template_id: int | None) -> None:
+        with self._lock:
+            self._generation += 1
+            if template_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(template_id, None)
+
+    def _on_announcement(self, data: str) -> None:
+        self._forget(None if data == ALL_TEMPLATES else int(data))
+
+    def _publish(self, template_id: int | None) -> None:
+        message = ALL_TEMPLATES if template_id is None else str(template_id)
+        try:
+            self._channel.publish(message)
+        except redis.RedisError:
+            logger.exception(
+                f"Could not announce coupon template {message} change; "
+                f"other processes will see it within {self.ttl:.0f}s."
+            )
+
+
+coupon_template_cache = CouponTemplateCache(
+    CouponTemplateRepository(),
+    max_size=int(os.getenv("COUPON_TEMPLATE_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("COUPON_TEMPLATE_CACHE_TTL_SECONDS", "300")),
+    redis_url=os.getenv("REDIS_URL"),
+)
@@ -0,0 +1,81 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+ACCEPTED = "accepted"
+DUPLICATE = "duplicate"
+
+
+class UpdateIdWindow:
+    """The last ``size`` update_ids one bot received.
+
+    Telegram redelivers an update until the webhook answers, so a slow
+    webhook sees the same update_id again. Ids are kept in insertion order
+    with O(1) membership, and only membership counts: ids are not compared,
+    since Telegram restarts numbering at a random value after a week
+    without updates. With a Redis URL, ids are also claimed in a per-bot
+    sorted set scored by arrival time and trimmed to the same size, so a
+    redelivery reaching another API process is caught; while Redis is
+    unreachable only the local window applies. Both checks may block on
+    Redis, so async callers run them in a thread.
+    """
+
+    def __init__(self, bot: str, size: int = 1000, redis_url: str | None = None):
+        self.bot = bot
+        self.size = size
+        self.redis_key = f"webhook_updates:{bot}"
+        self._redis = (
+            redis.Redis.from_url(redis_url, socket_timeout=0.5) if redis_url else None
+        )
+        self._ids: OrderedDict[int, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, update_id: int) -> str:
+        """Record ``update_id``; returns ACCEPTED or DUPLICATE."""
+        with self._lock:
+            if update_id in self._ids:
+                return DUPLICATE
+            self._ids[update_id] = None
+            if len(self._ids) > self.size:
+                self._ids.popitem(last=False)
+        if self._redis is None:
+            return ACCEPTED
+        try:
+            pipeline = self._redis.pipeline(transaction=False)
+            pipeline.zadd(self.redis_key, {str(update_id): time.time()}, nx=True)
+            pipeline.zremrangebyrank(self.redis_key, 0, -self.size - 1)
+            added, _ = pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(
+                f"Update dedup for the {self.bot} bot could not reach Redis: {e}"
+            )
+            return ACCEPTED
+        return ACCEPTED if added else DUPLICATE
+
+    def forget(self, update_id: int) -> None:
+        """Let ``update_id`` through again, e.g. after its handling failed."""
+        with self._lock:
+            self._ids.pop(update_id, None)
+        if self._redis is not None:
+            try:
+                self._redis.zrem(self.redis_key, str(update_id))
+            except redis.RedisError as e:
+                logger.warning(
+                    f"Update dedup for the {self.bot} bot could not reach Redis: {e}"
+                )
+
+
+update_windows = {
+    bot: UpdateIdWindow(
+        bot,
+        size=int(os.getenv("WEBHOOK_UPDATE_WINDOW", "1000")),
+        redis_url=os.getenv("REDIS_URL"),
+    )
+    for bot in ("client", "worker")
+}
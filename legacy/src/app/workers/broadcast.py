@@ -1,49 +1,220 @@
+"""Broadcast delivery.
+
+:func:`send_broadcast` snapshots the audience once and fans it out as a
+chord of :func:`send_broadcast_chunk` tasks, which any worker consuming the
+broadcasts queue picks up. All chunks draw send slots from one limiter in
+Redis, so the total rate stays within Telegram's limits however many
+workers run. Each chunk records its counts in Redis when it finishes, so a
+chunk message the broker redelivers is not sent again.
+:func:`finish_broadcast` sums the chunks' counts and marks the broadcast
+done; :func:`fail_broadcast` marks it failed if a chunk dies or the chord
+cannot be dispatched.
+"""
 import asyncio
+import os
+
+import redis
+from celery import chord
 from celery.utils.log import get_task_logger
-from sqlalchemy.orm import Session
 
-from app.celery_app import celery_app
-from app.db.session import SessionLocal
-from app.db.repositories.broadcasts import BroadcastRepository
+from app.celery_app import BROKER_VISIBILITY_TIMEOUT, REDIS_URL, celery_app
+from app.core import metrics
+from app.db.repositories.events import BroadcastRepository
+from app.db.session import unit_of_work
+from app.schemas.enums import BroadcastStatusEnum
+from app.services.rate_limit import SendRateLimiter
 from app.services.segmentation import SegmentationService
-from bots.bot import client_bot
 
 logger = get_task_logger(__name__)
 
+BROADCAST_RATE_PER_MINUTE = float(os.getenv("DEFAULT_BROADCAST_RATE_PER_MINUTE", "100"))
+# Worker processes consuming the broadcasts queue, across all hosts. Every
+# chunk in flight draws from the one rate limit, so with this many running at
+# once a chunk of n recipients takes about n * concurrency / rate minutes.
+BROADCAST_WORKER_CONCURRENCY = int(os.getenv("BROADCAST_WORKER_CONCURRENCY", "8"))
+# Recipients per chunk task: as many as fit in a sixth of the broker's
+# visibility timeout at full concurrency, so a chunk is acked long before the
+# broker would redeliver it.
+BROADCAST_CHUNK_SIZE = max(
+    1,
+    int(
+        BROADCAST_RATE_PER_MINUTE
+        * BROKER_VISIBILITY_TIMEOUT
+        / 6
+        / 60
+        / BROADCAST_WORKER_CONCURRENCY
+    ),
+)
+# Attempts per recipient when Telegram answers "retry after".
+SEND_ATTEMPTS = 3
+# How long finished chunks are remembered for redelivered chunk messages.
+CHUNK_RESULTS_TTL_SECONDS = 7 * 24 * 3600
+
+broadcast_rate = SendRateLimiter(
+    "broadcast_rate",
+    rate=BROADCAST_RATE_PER_MINUTE,
+    period=60.0,
+    redis_url=REDIS_URL,
+)
+chunk_results = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5)
+
+
+def _chunk_results_key(broadcast_id: int) -> str:
+    return f"broadcast:{broadcast_id}:chunks"
+
+
+def _finished_chunk(broadcast_id: int, index: int) -> list[int] | None:
+    """``[sent, failed]`` of a chunk that already ran to the end, if any."""
+    try:
+        recorded = chunk_results.hget(_chunk_results_key(broadcast_id), index)
+    except redis.RedisError as e:
+        logger.warning(f"Could not read chunk results of broadcast {broadcast_id}: {e}")
+        return None
+    if recorded is None:
+        return None
+    sent, failed = recorded.decode().split(":")
+    return [int(sent), int(failed)]
+
+
+def _record_chunk(broadcast_id: int, index: int, sent: int, failed: int) -> None:
+    key = _chunk_results_key(broadcast_id)
+    try:
+        pipe = chunk_results.pipeline()
+        pipe.hset(key, index, f"{sent}:{failed}")
+        pipe.expire(key, CHUNK_RESULTS_TTL_SECONDS)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(
+            f"Could not record chunk results of broadcast {broadcast_id}: {e}"
+        )
 
-from app.db.models.loyalty import Client
-from app.db.repositories.loyalty import ClientRepository
 
 @celery_app.task
 def send_broadcast(broadcast_id: int):
     logger.info(f"Starting broadcast {broadcast_id}")
-    db: Session = SessionLocal()
-    broadcast_repo = BroadcastRepository()
-    broadcast = broadcast_repo.get(db, id=broadcast_id)
-    if not broadcast:
-        logger.error(f"Broadcast {broadcast_id} not found.")
-        return
+    with unit_of_work() as db:
+        broadcast = BroadcastRepository().claim_for_sending(db, id=broadcast_id)
+        if not broadcast:
+            # Missing, or already taken by another delivery of this task.
+            logger.info(f"Broadcast {broadcast_id} not found or already started.")
+            return
 
-    segmentation_service = SegmentationService()
-    client_ids = segmentation_service.get_client_ids(
-        db, audience_filter=broadcast.audience_filter
+        chat_ids = SegmentationService().get_chat_ids(
+            db, audience_filter=broadcast.audience_filter
+        )
+        text = broadcast.content["text"]
+        if not chat_ids:
+            broadcast.status = BroadcastStatusEnum.done
+            db.add(broadcast)
+
+    if not chat_ids:
+        logger.info(f"Broadcast {broadcast_id} has no recipients.")
+        return
+    # Results of an earlier run belong to a different audience snapshot.
+    try:
+        chunk_results.delete(_chunk_results_key(broadcast_id))
+    except redis.RedisError as e:
+        logger.warning(
+            f"Could not reset chunk results of broadcast {broadcast_id}: {e}"
+        )
+    chunks = [
+        send_broadcast_chunk.s(
+            broadcast_id,
+            index,
+            chat_ids[start : start + BROADCAST_CHUNK_SIZE],
+            text,
+        )
+        for index, start in enumerate(range(0, len(chat_ids), BROADCAST_CHUNK_SIZE))
+    ]
+    try:
+        chord(chunks)(
+            finish_broadcast.s(broadcast_id).on_error(fail_broadcast.si(broadcast_id))
+        )
+    except Exception:
+        # Nothing will finish the broadcast, and a re-run skips one that is
+        # sending; failed lets it be started again.
+        fail_broadcast(broadcast_id)
+        raise
+    logger.info(
+        f"Broadcast {broadcast_id}: {len(chat_ids)} recipients, {len(chunks)} chunks."
     )
 
-    clients = db.query(Client).filter(Client.id.in_(client_ids)).all()
 
-    loop = asyncio.get_event_loop()
-    for client in clients:
+def _send(bot, loop, chat_id: int, text: str) -> bool:
+    from aiogram.exceptions import TelegramRetryAfter
+
+    for _ in range(SEND_ATTEMPTS):
+        broadcast_rate.wait()
         try:
-            loop.run_until_complete(
-                client_bot.send_message(
-                    chat_id=client.tg_id, text=broadcast.content["text"]
-                )
-            )
-            broadcast.sent_count += 1
+            loop.run_until_complete(bot.send_message(chat_id=chat_id, text=text))
+            return True
+        except TelegramRetryAfter as e:
+            # Flood control applies to the bot, so every worker backs off.
+            metrics.BROADCAST_MESSAGES.labels("throttled").inc()
+            broadcast_rate.hold(e.retry_after)
+            error = e
         except Exception as e:
-            logger.error(f"Failed to send message to {client.tg_id}: {e}")
-            broadcast.fail_count += 1
+            error = e
+            break
+    logger.error(f"Failed to send message to {chat_id}: {error}")
+    return False
+
+
+@celery_app.task
+def send_broadcast_chunk(
+    broadcast_id: int, index: int, chat_ids: list[int], text: str
+) -> list[int]:
+    """Send ``text`` to ``chat_ids``; returns ``[sent, failed]``. Nothing is
+    sent once the broadcast is canceled, and a redelivered chunk that already
+    finished returns its recorded counts."""
+    finished = _finished_chunk(broadcast_id, index)
+    if finished is not None:
+        logger.info(f"Broadcast {broadcast_id} chunk {index} already sent, skipping.")
+        return finished
+    with unit_of_work() as db:
+        broadcast = BroadcastRepository().get(db, id=broadcast_id)
+        if not broadcast or broadcast.status == BroadcastStatusEnum.canceled:
+            return [0, 0]
+
+    # aiogram is imported by the first broadcast, not at worker boot.
+    from bots.bot import get_client_bot
+
+    client_bot = get_client_bot()
+    loop = asyncio.get_event_loop()
+    sent = failed = 0
+    for chat_id in chat_ids:
+        if _send(client_bot, loop, chat_id, text):
+            sent += 1
+        else:
+            failed += 1
+    _record_chunk(broadcast_id, index, sent, failed)
+    metrics.BROADCAST_MESSAGES.labels("sent").inc(sent)
+    metrics.BROADCAST_MESSAGES.labels("failed").inc(failed)
+    return [sent, failed]
+
+
+@celery_app.task
+def finish_broadcast(results: list[list[int]], broadcast_id: int):
+    sent = sum(result[0] for result in results)
+    failed = sum(result[1] for result in results)
+    with unit_of_work() as db:
+        broadcast = BroadcastRepository().get(db, id=broadcast_id)
+        if not broadcast:
+            logger.error(f"Broadcast {broadcast_id} not found.")
+            return
+        broadcast.sent_count = sent
+        broadcast.fail_count = failed
+        if broadcast.status == BroadcastStatusEnum.sending:
+            broadcast.status = BroadcastStatusEnum.done
+        db.add(broadcast)
+    logger.info(f"Broadcast {broadcast_id} finished: {sent} sent, {failed} failed.")
+
 
-    broadcast_repo.update(db, db_obj=broadcast, obj_in={})
-    db.close()
-    logger.info(f"Broadcast {broadcast_id} finished.")
+@celery_app.task
+def fail_broadcast(broadcast_id: int):
+    with unit_of_work() as db:
+        broadcast = BroadcastRepository().get(db, id=broadcast_id)
+        if broadcast and broadcast.status == BroadcastStatusEnum.sending:
+            broadcast.status = BroadcastStatusEnum.failed
+            db.add(broadcast)
+    logger.error(f"Broadcast {broadcast_id} failed before all chunks completed.")
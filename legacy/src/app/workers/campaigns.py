@@ -0,0 +1,47 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+from celery.utils.log import get_task_logger
+
+from app.celery_app import celery_app
+from app.db.repositories.events import CampaignEventRepository, EventRepository
+from app.db.repositories.loyalty import ClientRepository
+from app.db.repositories.promotions import CampaignRepository
+from app.db.session import unit_of_work
+from app.services.attribution import AttributionService
+from app.services.campaigns import CampaignService
+from app.services.events import EventService
+
+logger = get_task_logger(__name__)
+
+
+@celery_app.task
+def attribute_redemptions(lookback_hours: int | None = None) -> int:
+    """Credit recent coupon redemptions to the campaign clicks that led to them.
+
+    Scans redemptions from the last ``lookback_hours``; the window overlaps
+    between runs and already attributed redemptions are skipped.
+    """
+    lookback_hours = lookback_hours or int(
+        os.getenv("CAMPAIGN_ATTRIBUTION_LOOKBACK_HOURS", "24")
+    )
+    since = datetime.now(timezone.utc) - timedelta(hours=lookback_hours)
+    attribution_service = AttributionService(
+        CampaignEventRepository(), ClientRepository()
+    )
+    with unit_of_work() as db:
+        attributed = attribution_service.attribute_redemptions(db, since=since)
+    logger.info(f"Attributed {attributed} redemptions to campaign clicks.")
+    return attributed
+
+
+@celery_app.task
+def transition_campaigns() -> dict:
+    """Activate campaigns whose start_at has come and end those past end_at."""
+    campaign_service = CampaignService(CampaignRepository())
+    event_service = EventService(EventRepository())
+    with unit_of_work() as db:
+        transitions = campaign_service.transition_due(db, event_service=event_service)
+    if transitions["activated"] or transitions["ended"]:
+        logger.info(f"Campaign transitions: {transitions}")
+    return transitions
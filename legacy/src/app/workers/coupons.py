@@ -0,0 +1,47 @@
+import os
+import time
+
+from celery.utils.log import get_task_logger
+
+from app.celery_app import celery_app
+from app.db.repositories.events import EventRepository
+from app.db.repositories.loyalty import ClientRepository
+from app.db.repositories.promotions import CouponRepository, CouponTemplateRepository
+from app.db.session import unit_of_work
+from app.services.coupons import CouponService
+from app.services.events import EventService
+
+logger = get_task_logger(__name__)
+
+
+@celery_app.task
+def expire_coupons(batch_size: int | None = None, max_batches: int | None = None) -> dict:
+    """Expire overdue issued coupons in bounded batches, one transaction each."""
+    batch_size = batch_size or int(os.getenv("COUPON_EXPIRY_BATCH_SIZE", "1000"))
+    max_batches = max_batches or int(os.getenv("COUPON_EXPIRY_MAX_BATCHES", "100"))
+    coupon_service = CouponService(
+        CouponRepository(), CouponTemplateRepository(), ClientRepository()
+    )
+    event_service = EventService(EventRepository())
+
+    started = time.perf_counter()
+    expired = batches = 0
+    while batches < max_batches:
+        with unit_of_work() as db:
+            count = coupon_service.expire_overdue_coupons(
+                db, batch_size=batch_size, event_service=event_service
+            )
+        batches += 1
+        expired += count
+        if count < batch_size:
+            break
+    elapsed = time.perf_counter() - started
+
+    stats = {
+        "expired": expired,
+        "batches": batches,
+        "seconds": round(elapsed, 3),
+        "per_second": round(expired / elapsed, 1) if elapsed else 0.0,
+    }
+    logger.info(f"Coupon expiry run finished: {stats}")
+    return stats
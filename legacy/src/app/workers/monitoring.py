@@ -0,0 +1,94 @@
+"""Metrics and trace propagation for Celery tasks.
+
+Imported by app.celery_app, so publishers (the API) inject the caller's
+trace context into task headers and workers continue it.
+"""
+import os
+import time
+
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_process_init,
+    worker_process_shutdown,
+    worker_ready,
+)
+from opentelemetry import context, trace
+from opentelemetry.propagate import extract, inject
+from opentelemetry.propagators.textmap import Getter
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from prometheus_client import start_http_server
+
+from app.core import metrics
+from app.core.tracing import setup_tracing, shutdown_tracing, tracer
+
+# Port of the worker's own /metrics; unset disables it. With the prefork
+# pool, PROMETHEUS_MULTIPROC_DIR must be set so child processes' samples
+# reach the main process that serves it.
+CELERY_METRICS_PORT = os.getenv("CELERY_METRICS_PORT")
+
+_started: dict[str, tuple[float, trace.Span, object]] = {}
+
+
+class _RequestGetter(Getter):
+    """Reads propagated headers, which Celery exposes on task.request."""
+
+    def get(self, carrier, key):
+        value = getattr(carrier, key, None)
+        return [value] if value is not None else None
+
+    def keys(self, carrier):
+        return []
+
+
+@before_task_publish.connect
+def _propagate_trace(headers=None, **kwargs):
+    if headers is not None:
+        inject(headers)
+
+
+@task_prerun.connect
+def _task_started(task_id=None, task=None, **kwargs):
+    span = tracer.start_span(
+        f"celery.run {task.name}",
+        context=extract(task.request, getter=_RequestGetter()),
+        kind=SpanKind.CONSUMER,
+        attributes={"celery.task_id": task_id},
+    )
+    token = context.attach(trace.set_span_in_context(span))
+    _started[task_id] = (time.perf_counter(), span, token)
+
+
+@task_postrun.connect
+def _task_finished(task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if started is None:
+        return
+    started_at, span, token = started
+    metrics.TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(
+        time.perf_counter() - started_at
+    )
+    span.set_attribute("celery.state", state or "UNKNOWN")
+    if state == "FAILURE":
+        span.set_status(Status(StatusCode.ERROR))
+    context.detach(token)
+    span.end()
+
+
+@worker_process_init.connect
+def _start_tracing(**kwargs):
+    setup_tracing("worker")
+
+
+@worker_ready.connect
+def _serve_metrics(**kwargs):
+    if not CELERY_METRICS_PORT:
+        return
+    start_http_server(int(CELERY_METRICS_PORT), registry=metrics.scrape_registry())
+
+
+@worker_process_shutdown.connect
+def _retire_process(pid=None, **kwargs):
+    shutdown_tracing()
+    metrics.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,66 @@
+from datetime import date
+
+from celery.utils.log import get_task_logger
+from sqlalchemy.exc import DBAPIError
+
+from app.celery_app import celery_app
+from app.db.repositories.events import AuditLogRepository
+from app.db.repositories.hr import (
+    PayrollAccrualRepository,
+    PayrollRepository,
+    ShiftRepository,
+)
+from app.db.session import unit_of_work
+from app.schemas.enums import ActorTypeEnum
+from app.services.events import AuditService
+from app.services.payroll import PayrollService
+
+logger = get_task_logger(__name__)
+
+# SQLSTATE of a REPEATABLE READ transaction that lost a write race.
+SERIALIZATION_FAILURE = "40001"
+
+
+@celery_app.task
+def run_payroll(month: str | None = None) -> int:
+    """Run payroll for all active employees; ``month`` is an ISO date, default today."""
+    month_date = date.fromisoformat(month) if month else date.today()
+    payroll_service = PayrollService(
+        PayrollRepository(), ShiftRepository(), PayrollAccrualRepository()
+    )
+    audit_service = AuditService(AuditLogRepository())
+    with unit_of_work() as db:
+        payrolls = payroll_service.run_payroll(
+            db,
+            month=month_date,
+            audit_service=audit_service,
+            actor_type=ActorTypeEnum.bot,
+        )
+    logger.info(f"Payroll for {month_date:%Y-%m} computed for {len(payrolls)} employees.")
+    return len(payrolls)
+
+
+@celery_app.task(bind=True, max_retries=5)
+def reconcile_payroll_accruals(self, month: str | None = None) -> int:
+    """Repair drift between the accrual ledger and the shifts of a month.
+
+    Runs nightly for the current month; the number of repaired rows should
+    normally be zero. Retried when a shift change races the repair.
+    """
+    month_date = date.fromisoformat(month) if month else date.today()
+    payroll_service = PayrollService(
+        PayrollRepository(), ShiftRepository(), PayrollAccrualRepository()
+    )
+    try:
+        with unit_of_work() as db:
+            drifted = payroll_service.reconcile_accruals(db, month=month_date)
+    except DBAPIError as e:
+        if getattr(e.orig, "pgcode", None) != SERIALIZATION_FAILURE:
+            raise
+        raise self.retry(exc=e, countdown=5)
+    for row in drifted:
+        logger.warning(
+            f"Payroll accrual drift for employee {row['employee_id']} "
+            f"in {month_date:%Y-%m}, repaired."
+        )
+    return len(drifted)
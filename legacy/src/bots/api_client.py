@@ -2,8 +2,11 @@ import os
 from typing import Any
 
 import aiohttp
+from opentelemetry.propagate import inject
+from opentelemetry.trace import SpanKind
 
-from app.core.security import create_hmac_signature
+from app.core.security import bot_signer
+from app.core.tracing import tracer
 
 
 class ApiClient:
@@ -20,14 +23,21 @@ class ApiClient:
             import json as json_lib
             body = json_lib.dumps(json, sort_keys=True).encode("utf-8")
             headers["Content-Type"] = "application/json"
-            headers["X-Signature"] = create_hmac_signature(body)
-
-        async with aiohttp.ClientSession() as session:
-            async with session.request(
-                method, url, json=json, headers=headers
-            ) as response:
-                response.raise_for_status()
-                return await response.json()
+            headers["X-Signature"] = bot_signer.sign(body)
+
+        with tracer.start_as_current_span(
+            f"api {method}",
+            kind=SpanKind.CLIENT,
+            attributes={"http.method": method, "http.url": url},
+        ) as span:
+            inject(headers)
+            async with aiohttp.ClientSession() as session:
+                async with session.request(
+                    method, url, json=json, headers=headers
+                ) as response:
+                    span.set_attribute("http.status_code", response.status)
+                    response.raise_for_status()
+                    return await response.json()
 
     async def post(self, path: str, json: dict) -> Any:
         return await self._request("POST", path, json=json)
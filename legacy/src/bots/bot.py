@@ -1,4 +1,6 @@
 import os
+from functools import lru_cache
+
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 
@@ -12,8 +14,17 @@ def get_dispatcher() -> Dispatcher:
     return Dispatcher(storage=storage)
 
 
-client_bot = get_bot(os.getenv("TELEGRAM_MAIN_BOT_TOKEN", ""))
-worker_bot = get_bot(os.getenv("TELEGRAM_AUTH_BOT_TOKEN", ""))
+# Bots are built on first use, so importing this module neither reads the
+# tokens nor validates them.
+@lru_cache(maxsize=None)
+def get_client_bot() -> Bot:
+    return get_bot(os.getenv("TELEGRAM_MAIN_BOT_TOKEN", ""))
+
+
+@lru_cache(maxsize=None)
+def get_worker_bot() -> Bot:
+    return get_bot(os.getenv("TELEGRAM_AUTH_BOT_TOKEN", ""))
+
 
 client_dp = get_dispatcher()
 worker_dp = get_dispatcher()
@@ -1,27 +1,34 @@
+from aiohttp import ClientResponseError
 from aiogram import types
 from aiogram.filters import CommandStart, Command
 from aiogram.fsm.context import FSMContext
-from bots.bot import client_bot, client_dp
+from bots.bot import client_dp
 from bots.api_client import api_client
 from .states import RegisterClient
 
 @client_dp.message(CommandStart())
 async def send_welcome(message: types.Message):
     args = message.text.split()
-    if len(args) > 1 and args[1].startswith("cmp_"):
-        campaign_id = args[1].replace("cmp_", "")
+    if len(args) > 1:
         try:
-            client = await api_client.get(f"/clients/by-tg-id/{message.from_user.id}")
-            campaign = await api_client.get(f"/campaigns/{campaign_id}")
-            await api_client.post(
-                "/coupons/issue",
-                json={
-                    "client_ref": client["identifier"],
-                    "campaign_id": int(campaign_id),
-                    "template_id": campaign["template_id"],
-                },
+            result = await api_client.post(
+                "/campaigns/start",
+                json={"ref": args[1], "tg_id": message.from_user.id},
             )
-            await message.reply("You have received a new coupon!")
+            if result["coupon"]:
+                await message.reply("You have received a new coupon!")
+            else:
+                await message.reply(
+                    "Welcome to the Loyalty Program! Use /register to start."
+                )
+        except ClientResponseError as e:
+            # Not a campaign ref: greet as a plain /start would.
+            if e.status != 404:
+                await message.reply(f"Failed to get coupon: {e}")
+            else:
+                await message.reply(
+                    "Welcome to the Loyalty Program! Use /register to start."
+                )
         except Exception as e:
             await message.reply(f"Failed to get coupon: {e}")
     else:
@@ -58,22 +65,17 @@ async def my_level(message: types.Message):
 @client_dp.message(Command(commands=["my_coupons"]))
 async def my_coupons(message: types.Message):
     try:
-        client = await api_client.get(f"/clients/by-tg-id/{message.from_user.id}")
-        if client:
-            coupons = await api_client.get(f"/clients/{client['id']}/coupons")
-            if coupons:
-                coupon_list = "\n".join(
-                    [
-                        f"- `{coupon['code']}` (expires: {coupon.get('expires_at', 'N/A')})"
-                        for coupon in coupons
-                        if coupon["status"] == "issued"
-                    ]
-                )
-                await message.reply(f"Your active coupons:\n{coupon_list}")
-            else:
-                await message.reply("You have no active coupons.")
+        coupons = await api_client.get(f"/clients/by-tg-id/{message.from_user.id}/coupons")
+        if coupons:
+            coupon_list = "\n".join(
+                [
+                    f"- `{coupon['code']}` (expires: {coupon['expires_at'] or 'N/A'})"
+                    for coupon in coupons
+                ]
+            )
+            await message.reply(f"Your active coupons:\n{coupon_list}")
         else:
-            await message.reply("Could not retrieve your information.")
+            await message.reply("You have no active coupons.")
     except Exception as e:
         await message.reply(f"An error occurred: {e}")
 
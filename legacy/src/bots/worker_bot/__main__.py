@@ -1,10 +1,25 @@
+import asyncio
+
 from aiogram import types
 from aiogram.filters import CommandStart, Command
 from aiogram.fsm.context import FSMContext
-from bots.bot import worker_bot, worker_dp
+from app.schemas.hr import EmployeeIdentity
+from app.services.employee_directory import employee_directory
+from bots.bot import worker_dp
 from bots.api_client import api_client
 from .states import RedeemCoupon, RecordPurchase
 
+
+async def current_employee(message: types.Message) -> EmployeeIdentity | None:
+    """The active employee writing ``message``, from the in-process employee
+    directory; replies and returns None for anyone else."""
+    employee = await asyncio.to_thread(employee_directory.resolve, message.from_user.id)
+    if employee is None or not employee.active:
+        await message.reply("You are not registered as an active employee.")
+        return None
+    return employee
+
+
 @worker_dp.message(CommandStart())
 async def send_welcome(message: types.Message):
     await message.reply("Welcome to the Worker Bot! Use /redeem to start.")
@@ -27,7 +42,9 @@ async def redeem_amount_entered(message: types.Message, state: FSMContext):
     amount = float(message.text)
 
     try:
-        employee = await api_client.get(f"/employees/by-tg-id/{message.from_user.id}")
+        employee = await current_employee(message)
+        if employee is None:
+            return
         coupon = await api_client.get(f"/coupons/by-code/{code}")
         client = await api_client.get(f"/clients/{coupon['client_id']}")
 
@@ -37,7 +54,7 @@ async def redeem_amount_entered(message: types.Message, state: FSMContext):
                 "code": code,
                 "client_ref": client["identifier"],
                 "amount": amount,
-                "employee_id": employee["id"],
+                "employee_id": employee.id,
             },
         )
         await message.reply(
@@ -70,13 +87,15 @@ async def purchase_amount_entered(message: types.Message, state: FSMContext):
     amount = float(message.text)
 
     try:
-        employee = await api_client.get(f"/employees/by-tg-id/{message.from_user.id}")
+        employee = await current_employee(message)
+        if employee is None:
+            return
         await api_client.post(
             "/purchases/",
             json={
                 "client_ref": client_ref,
                 "amount": amount,
-                "employee_id": employee["id"],
+                "employee_id": employee.id,
             },
         )
         await message.reply("Purchase recorded successfully!")
@@ -89,18 +108,16 @@ async def purchase_amount_entered(message: types.Message, state: FSMContext):
 @worker_dp.message(Command(commands=["my_schedule"]))
 async def my_schedule(message: types.Message):
     try:
-        employee = await api_client.get(f"/employees/by-tg-id/{message.from_user.id}")
-        if employee:
-            shifts = await api_client.get(f"/employees/{employee['id']}/shifts")
-            if shifts:
-                schedule = "\n".join(
-                    [f"- {shift['date']}: {shift['hours']} hours" for shift in shifts]
-                )
-                await message.reply(f"Your upcoming shifts:\n{schedule}")
-            else:
-                await message.reply("You have no upcoming shifts.")
+        if await current_employee(message) is None:
+            return
+        shifts = await api_client.get(f"/employees/by-tg-id/{message.from_user.id}/shifts")
+        if shifts:
+            schedule = "\n".join(
+                [f"- {shift['date']}: {shift['hours']} hours" for shift in shifts]
+            )
+            await message.reply(f"Your upcoming shifts:\n{schedule}")
         else:
-            await message.reply("Could not retrieve your information.")
+            await message.reply("You have no upcoming shifts.")
     except Exception as e:
         await message.reply(f"An error occurred: {e}")
 